@@ -0,0 +1,23 @@
+"""
+Analysis pipeline for the nitrogen-water instability images
+
+The scenes in `scenes/` illustrate these steps; the functions here are the
+executable versions used to process experiment frames.
+"""
+
+from .binning import BinIndex, BinStats, angular_bin_indices, bin_means, bin_statistics
+from .circle import CircleFit, calculate_circle_from_points, fit_circle, hough_circle
+from .detection import Detection, detect_circle, fit_rim, rim_points
+from .images import decode, load_gray, load_level, load_preview
+from .instrument import span, traced
+from .peaks import Peaks, find_periodic_peaks
+from .polar_strip import (
+    StripGeometry,
+    extract_strip,
+    get_annulus_geometry,
+    get_strip_geometry,
+)
+from .polar_unwrap import PolarImage, PolarMap, get_polar_map, polar_unwrap
+from .radial_profile import RadialProfile, radial_angular_profile
+from .spectrum import ModeSpectrum, count_fingers, mode_spectrum
+from .tracking import CenterTracker
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Batch analysis of a directory of experiment frames
+
+Frames are named `d{run}_T{temp}_{n}.JPG` (for example `data/d4_T20_1.JPG`).
+Frames of a run are split into short segments of consecutive frames. Each
+segment is analyzed in a worker process that decodes its own images, tracks
+the container from frame to frame (see tracking.CenterTracker) and appends
+the profiles to the ResultsStore through its own chunk writer. Frames already
+in the store with the same analysis options are skipped, so a crashed run
+resumes where it stopped; other options are stored under their own keys.
+
+Usage:
+    python -m analysis.batch data/ --out results/ --workers 8
+"""
+
+import argparse
+import multiprocessing.util
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .detection import load_run_params, save_run_params
+from .images import load_gray, load_level
+from .instrument import span
+from .pipeline import analyze_frame
+from .store import ResultsStore
+from .tracking import CenterTracker
+
+FRAME_PATTERN = re.compile(
+    r"^d(?P<run>\d+)_T(?P<temp>-?\d+(?:\.\d+)?)_(?P<index>\d+)$", re.IGNORECASE
+)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff")
+
+# Pyramid level of the coarse detection stage (1/8 size)
+COARSE_LEVEL = 3
+
+# Consecutive frames tracked by one worker task; short enough to keep all
+# workers busy on a single run, long enough that most frames are tracked
+SEGMENT_FRAMES = 16
+
+# Analysis options of analyze_frame used when none are given
+DEFAULT_OPTIONS = {
+    "n_bins": 360,
+    "radius_fraction": 0.8,
+    "strip_width": 10,
+    "circle": None,
+}
+
+
+def parse_frame_name(path):
+    """
+    Run number, temperature and frame index encoded in a frame filename
+
+    Args:
+        path: Path to a frame such as `data/d4_T20_1.JPG`
+
+    Returns:
+        Dict with 'run', 'temp' and 'index', or None if the name does not match
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = FRAME_PATTERN.match(stem)
+    if match is None:
+        return None
+    return {
+        "run": int(match["run"]),
+        "temp": float(match["temp"]),
+        "index": int(match["index"]),
+    }
+
+
+def discover_frames(root):
+    """
+    All experiment frames below `root`, ordered by run, temperature and index
+
+    Returns:
+        List of (path, info) tuples where info comes from parse_frame_name
+    """
+    frames = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            info = parse_frame_name(path)
+            if info is not None:
+                frames.append((path, info))
+    frames.sort(key=lambda item: (item[1]["run"], item[1]["temp"], item[1]["index"]))
+    return frames
+
+
+def analysis_options(**options):
+    """DEFAULT_OPTIONS updated with the given analysis options"""
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise TypeError(f"Unknown analysis option(s): {', '.join(sorted(unknown))}")
+    return {**DEFAULT_OPTIONS, **options}
+
+
+def options_tag(options=None):
+    """
+    Key suffix of profiles analyzed with the given options
+
+    Empty for DEFAULT_OPTIONS, '@b3600_f0.8_w10' (plus '_c{x},{y},{r}' for a
+    fixed circle) otherwise, so profiles of different settings never stand
+    in for each other.
+    """
+    options = analysis_options(**(options or {}))
+    if options == DEFAULT_OPTIONS:
+        return ""
+    tag = f"b{options['n_bins']}_f{options['radius_fraction']:g}_w{options['strip_width']:g}"
+    if options["circle"] is not None:
+        (x, y), r = options["circle"]
+        tag += f"_c{x:g},{y:g},{r:g}"
+    return f"@{tag}"
+
+
+def frame_key(info, options=None):
+    """
+    Store key of a frame analyzed with the given options
+
+    Frames analyzed with DEFAULT_OPTIONS keep the plain key ('d4_T20_1');
+    other options append their options_tag ('d4_T20_1@b3600_f0.8_w10').
+    """
+    return f"d{info['run']}_T{info['temp']:g}_{info['index']}{options_tag(options)}"
+
+
+# Chunk writer of the current worker process, one per store directory
+_writers = {}
+
+
+def _close_writers():
+    """Release the chunk writers of this process"""
+    for writer in _writers.values():
+        writer.close()
+    _writers.clear()
+
+
+def _init_worker():
+    # Pool workers exit through multiprocessing, which runs this finalizer
+    multiprocessing.util.Finalize(None, _close_writers, exitpriority=10)
+
+
+def _store_result(out_dir, path, info, result, options):
+    writer = _writers.get(out_dir)
+    if writer is None:
+        writer = _writers[out_dir] = ResultsStore(out_dir).writer()
+    detection = result.detection
+    writer.append(
+        frame_key(info, options),
+        result.profile,
+        fields={
+            "run": info["run"],
+            "temp": info["temp"],
+            "frame": info["index"],
+            "radius": result.radius,
+        },
+        path=path,
+        center=list(result.center),
+        container_radius=result.container_radius,
+        method=result.method,
+        confidence=None if detection is None else detection.confidence,
+        options=options,
+    )
+
+
+def _analyze_segment(paths, out_dir, options):
+    """
+    Worker: decode, analyze and store consecutive frames of one run
+
+    Runs in a child process. The container is tracked from frame to frame,
+    starting from the last good circle saved for the run directory.
+
+    Returns:
+        List of (path, error) with error None for stored frames
+    """
+    run_dir = os.path.dirname(paths[0])
+    tracker = None
+    if options["circle"] is None:
+        tracker = CenterTracker(load_run_params(run_dir))
+
+    results = []
+    last_detection = None
+    for path in paths:
+        info = parse_frame_name(path)
+        with span("frame", path=path):
+            try:
+                image_gray = load_gray(path)
+                coarse_image = None
+                if tracker is not None and tracker.circle is None:
+                    # DCT-domain 1/8 decode, cached on disk for reruns
+                    coarse_image = load_level(path, COARSE_LEVEL)
+                result = analyze_frame(image_gray, coarse_image=coarse_image,
+                                       tracker=tracker, **options)
+                _store_result(out_dir, path, info, result, options)
+            except Exception as exc:
+                # A failed frame (decode, analysis or store write) is reported
+                # as that frame's error; the rest of the segment goes on
+                results.append((path, f"{type(exc).__name__}: {exc}"))
+                continue
+        results.append((path, None))
+        last_detection = result.detection or last_detection
+
+    if last_detection is not None:
+        save_run_params(run_dir, last_detection)
+    return results
+
+
+def _segments(frames, size):
+    """Split (path, info) frames into runs of at most `size` consecutive paths"""
+    segments = []
+    current, current_run = [], None
+    for path, info in frames:
+        run = (os.path.dirname(path), info["run"], info["temp"])
+        if current and (run != current_run or len(current) == size):
+            segments.append(current)
+            current = []
+        current.append(path)
+        current_run = run
+    if current:
+        segments.append(current)
+    return segments
+
+
+def analyze_frames(paths, out_dir, **options):
+    """
+    Analyze frames in this process and append them to the store
+
+    Args:
+        paths: Frame files (names as parsed by parse_frame_name)
+        out_dir: ResultsStore directory
+        **options: n_bins, radius_fraction, strip_width, circle (see
+            analyze_frame); missing ones come from DEFAULT_OPTIONS
+
+    Returns:
+        List of (path, error) with error None for stored frames
+    """
+    options = analysis_options(**options)
+    frames = [(path, parse_frame_name(path)) for path in paths]
+    results = []
+    try:
+        for segment in _segments(frames, SEGMENT_FRAMES):
+            results += _analyze_segment(segment, out_dir, options)
+    finally:
+        _close_writers()
+    return results
+
+
+def run_batch(root, out_dir, workers=None, **options):
+    """
+    Analyze every frame below `root` that is not yet in the store
+
+    A frame counts as analyzed only with the same options (see frame_key).
+
+    Args:
+        root: Directory searched recursively for frames
+        out_dir: ResultsStore directory
+        workers: Number of worker processes (defaults to the CPU count)
+        **options: n_bins, radius_fraction, strip_width, circle (see
+            analyze_frame); missing ones come from DEFAULT_OPTIONS
+
+    Returns:
+        (n_done, n_failed, n_skipped)
+    """
+    options = analysis_options(**options)
+    store = ResultsStore(out_dir)
+    frames = discover_frames(root)
+    todo = [(path, info) for path, info in frames if frame_key(info, options) not in store]
+    n_skipped = len(frames) - len(todo)
+
+    print(f"Found {len(frames)} frame(s), {n_skipped} already analyzed, {len(todo)} to do")
+    if not todo:
+        return 0, 0, n_skipped
+
+    workers = workers or os.cpu_count() or 1
+    pending_segments = iter(_segments(todo, SEGMENT_FRAMES))
+    n_done = n_failed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Keep a bounded number of segments in flight so results are written
+        # (and become resumable) as soon as they are ready
+        in_flight = set()
+
+        def submit_next():
+            for paths in pending_segments:
+                in_flight.add(pool.submit(_analyze_segment, paths, out_dir, options))
+                return
+
+        for _ in range(2 * workers):
+            submit_next()
+
+        while in_flight:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for path, error in future.result():
+                    if error is None:
+                        n_done += 1
+                    else:
+                        n_failed += 1
+                        print(f"\n  ❌ {path}: {error}")
+
+                count = n_done + n_failed
+                rate = count / (time.perf_counter() - start)
+                print(f"  [{count}/{len(todo)}] {rate:.1f} frames/s", end="\r")
+                submit_next()
+
+    print()
+    return n_done, n_failed, n_skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory of experiment frames")
+    parser.add_argument("root", help="Directory containing d{run}_T{temp}_{n}.JPG frames")
+    parser.add_argument("--out", default="results", help="Results store directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--bins", type=int, default=DEFAULT_OPTIONS["n_bins"],
+                        help="Number of angular bins")
+    parser.add_argument("--radius-fraction", type=float, default=DEFAULT_OPTIONS["radius_fraction"],
+                        help="Strip radius as a fraction of the container radius")
+    parser.add_argument("--strip-width", type=float, default=DEFAULT_OPTIONS["strip_width"],
+                        help="Strip width in pixels")
+    parser.add_argument("--circle", type=float, nargs=3, metavar=("X", "Y", "R"),
+                        help="Use a fixed container circle instead of detecting it")
+    args = parser.parse_args(argv)
+
+    circle = None
+    if args.circle:
+        x, y, r = args.circle
+        circle = ((x, y), r)
+
+    n_done, n_failed, n_skipped = run_batch(
+        args.root, args.out,
+        workers=args.workers,
+        n_bins=args.bins,
+        radius_fraction=args.radius_fraction,
+        strip_width=args.strip_width,
+        circle=circle,
+    )
+    print(f"✅ {n_done} analyzed, {n_failed} failed, {n_skipped} skipped")
+    return 1 if n_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
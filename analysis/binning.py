@@ -0,0 +1,179 @@
+"""
+Angular binning engine built on integer bin indices and np.bincount
+
+PolarTransformScene averages the strip pixels per angular bin with
+`scipy.stats.binned_statistic`. That call searches the bin edges for every
+pixel and allocates several intermediates for what is a weighted histogram.
+Here the bin of every pixel is an integer computed once (and cached with the
+strip geometry), and all statistics come from bincount/reduceat passes.
+"""
+
+import numpy as np
+
+from .instrument import traced
+
+
+class BinIndex:
+    """
+    Precomputed assignment of samples to bins
+
+    The grouping sort is only done the first time `order`, `starts` or
+    `nonempty` is needed (min/max statistics); mean/std callers never pay
+    for it. Reusing one across frames with the same geometry makes every
+    later `bin_statistics` call sort-free.
+
+    Attributes:
+        bins: Bin index of every sample, values in [0, n_bins)
+        n_bins: Number of bins
+        count: Number of samples per bin
+        order: Permutation that groups the samples by bin
+        starts: Offset of each non-empty bin in the grouped order
+        nonempty: Boolean mask of the bins holding at least one sample
+    """
+
+    def __init__(self, bins, n_bins):
+        self.bins = np.asarray(bins, dtype=np.intp)
+        self.n_bins = int(n_bins)
+        self.count = np.bincount(self.bins, minlength=self.n_bins)
+        self.nonempty = self.count > 0
+        self._order = None
+        self._starts = None
+
+    def __len__(self):
+        return len(self.bins)
+
+    @property
+    def order(self):
+        if self._order is None:
+            self._order = np.argsort(self.bins, kind="stable")
+        return self._order
+
+    @property
+    def starts(self):
+        if self._starts is None:
+            offsets = np.concatenate(([0], np.cumsum(self.count)[:-1]))
+            self._starts = offsets[self.nonempty]
+        return self._starts
+
+    @property
+    def nbytes(self):
+        grouped = [array.nbytes for array in (self._order, self._starts) if array is not None]
+        return self.bins.nbytes + self.count.nbytes + self.nonempty.nbytes + sum(grouped)
+
+
+class BinStats:
+    """
+    Per-bin statistics; empty bins have count 0 and NaN everywhere else
+
+    Attributes:
+        mean, std, min, max: Float arrays of length n_bins
+        count: Integer array of length n_bins
+    """
+
+    def __init__(self, mean, count, std, min, max):
+        self.mean = mean
+        self.count = count
+        self.std = std
+        self.min = min
+        self.max = max
+
+
+def angular_bin_indices(theta_deg, n_bins):
+    """
+    Bin index of every angle for `n_bins` equal bins over [0, 360)
+
+    Args:
+        theta_deg: Angles in degrees, in [0, 360)
+        n_bins: Number of bins
+
+    Returns:
+        Integer array with values in [0, n_bins)
+    """
+    bins = (np.asarray(theta_deg) * (n_bins / 360.0)).astype(np.intp)
+    np.clip(bins, 0, n_bins - 1, out=bins)
+    return bins
+
+
+@traced("bin_statistics")
+def bin_statistics(values, bins, n_bins=None, minmax=True):
+    """
+    Mean, count, standard deviation, min and max of `values` per bin
+
+    Args:
+        values: 1D array of samples
+        bins: BinIndex, or an integer array with the bin of every sample
+        n_bins: Number of bins (required when `bins` is a plain array)
+        minmax: Also compute per-bin min and max (needs the grouped order)
+
+    Returns:
+        BinStats; `min` and `max` are None when `minmax` is False
+    """
+    if not isinstance(bins, BinIndex):
+        if n_bins is None:
+            raise ValueError("n_bins is required when bins is not a BinIndex")
+        if minmax:
+            bins = BinIndex(bins, n_bins)
+        else:
+            bins = np.asarray(bins, dtype=np.intp)
+
+    if isinstance(bins, BinIndex):
+        idx, n_bins, count = bins.bins, bins.n_bins, bins.count
+    else:
+        idx = bins
+        count = np.bincount(idx, minlength=n_bins)
+
+    values = np.asarray(values)
+    if len(values) != len(idx):
+        raise ValueError(f"Got {len(values)} values for {len(idx)} bin indices")
+    weights = values.astype(np.float64, copy=False)
+
+    sums = np.bincount(idx, weights=weights, minlength=n_bins)
+    sq_sums = np.bincount(idx, weights=weights * weights, minlength=n_bins)
+
+    empty = count == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / count
+        var = sq_sums / count - mean * mean
+    np.maximum(var, 0, out=var)
+    std = np.sqrt(var)
+    mean[empty] = np.nan
+    std[empty] = np.nan
+
+    bin_min = bin_max = None
+    if minmax:
+        grouped = weights[bins.order]
+        bin_min = np.full(n_bins, np.nan)
+        bin_max = np.full(n_bins, np.nan)
+        if len(grouped):
+            bin_min[bins.nonempty] = np.minimum.reduceat(grouped, bins.starts)
+            bin_max[bins.nonempty] = np.maximum.reduceat(grouped, bins.starts)
+
+    return BinStats(mean, count, std, bin_min, bin_max)
+
+
+def bin_means(values, bins, n_bins=None):
+    """Mean of `values` per bin (NaN for empty bins)"""
+    return bin_statistics(values, bins, n_bins, minmax=False).mean
+
+
+@traced("batch_bin_means")
+def batch_bin_means(values, bins):
+    """
+    Mean per bin for many frames that share one bin assignment
+
+    Args:
+        values: (frames, n_samples) array, e.g. the strip pixels of a chunk
+            of video frames
+        bins: BinIndex of the n_samples samples
+
+    Returns:
+        (frames, n_bins) array of means, NaN for empty bins
+    """
+    values = np.asarray(values)
+    n_frames = values.shape[0]
+    # Give every frame its own block of bins so one bincount covers the chunk
+    idx = bins.bins[None, :] + (bins.n_bins * np.arange(n_frames))[:, None]
+    sums = np.bincount(idx.ravel(), weights=values.ravel().astype(np.float64),
+                       minlength=n_frames * bins.n_bins).reshape(n_frames, bins.n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / bins.count
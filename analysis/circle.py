@@ -0,0 +1,263 @@
+"""
+Finding the container circle (the pattern center) in an experiment frame
+
+CircleDetectionScene presents two methods: automatic Hough circle detection
+and a geometric fallback that computes the circle through three points
+clicked on the container rim. Both are implemented here, together with a
+least-squares fit that uses any number of rim points and works on stacks of
+frames at once.
+"""
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # OpenCV is only needed for automatic detection
+    cv2 = None
+
+from .instrument import traced
+
+
+def calculate_circle_from_points(points):
+    """
+    Circle through three non-collinear points (circumcircle)
+
+    Args:
+        points: Three (x, y) points on the circle
+
+    Returns:
+        center: (x, y) center of the circle
+        radius: Radius of the circle
+    """
+    p1, p2, p3 = points
+
+    D = 2 * (p1[0] * (p2[1] - p3[1]) +
+             p2[0] * (p3[1] - p1[1]) +
+             p3[0] * (p1[1] - p2[1]))
+    if D == 0:
+        raise ValueError("The three points are collinear")
+
+    ux = ((p1[0]**2 + p1[1]**2) * (p2[1] - p3[1]) +
+          (p2[0]**2 + p2[1]**2) * (p3[1] - p1[1]) +
+          (p3[0]**2 + p3[1]**2) * (p1[1] - p2[1])) / D
+
+    uy = ((p1[0]**2 + p1[1]**2) * (p3[0] - p2[0]) +
+          (p2[0]**2 + p2[1]**2) * (p1[0] - p3[0]) +
+          (p3[0]**2 + p3[1]**2) * (p2[0] - p1[0])) / D
+
+    center = (float(ux), float(uy))
+    radius = float(np.sqrt((p1[0] - ux)**2 + (p1[1] - uy)**2))
+
+    return center, radius
+
+
+class CircleFit:
+    """
+    Result of a (batched) circle fit
+
+    Attributes:
+        center: (..., 2) array of (x, y) centers
+        radius: (...) array of radii
+        residual: (...) RMS distance of the used points from the circle
+        inliers: (..., N) boolean mask of the points used, or None
+    """
+
+    def __init__(self, center, radius, residual, inliers=None):
+        self.center = center
+        self.radius = radius
+        self.residual = residual
+        self.inliers = inliers
+
+
+def _algebraic_fit(points, weights=None):
+    """
+    Least-squares (Kasa) circle fit on the last two axes of `points`
+
+    Solves x^2 + y^2 = 2ax + 2by + c in coordinates centered on the point
+    mean, which keeps the 3x3 normal equations well conditioned.
+    """
+    if weights is None:
+        weights = np.ones(points.shape[:-1])
+    w = weights.astype(np.float64)
+    w_sum = np.maximum(w.sum(axis=-1, keepdims=True), 1e-12)
+
+    mean = (points * w[..., None]).sum(axis=-2) / w_sum
+    u = points - mean[..., None, :]
+    A = np.stack([u[..., 0], u[..., 1], np.ones_like(u[..., 0])], axis=-1)
+    b = u[..., 0]**2 + u[..., 1]**2
+
+    Aw = A * w[..., None]
+    normal = np.einsum("...ni,...nj->...ij", Aw, A)
+    rhs = np.einsum("...ni,...n->...i", Aw, b)
+    # Degenerate point sets (fewer than three distinct points) give a
+    # singular system; a tiny ridge keeps the batch solvable and they are
+    # reported through a NaN radius below
+    solution = np.linalg.solve(normal + 1e-12 * np.eye(3), rhs[..., None])[..., 0]
+
+    a = solution[..., 0] / 2
+    b_ = solution[..., 1] / 2
+    r_sq = solution[..., 2] + a**2 + b_**2
+    center = mean + np.stack([a, b_], axis=-1)
+    with np.errstate(invalid="ignore"):
+        radius = np.sqrt(np.where(r_sq > 0, r_sq, np.nan))
+    return center, radius
+
+
+def _rms_residual(points, center, radius, weights=None):
+    distance = np.linalg.norm(points - center[..., None, :], axis=-1)
+    error = (distance - radius[..., None])**2
+    if weights is None:
+        return np.sqrt(error.mean(axis=-1))
+    w_sum = np.maximum(weights.sum(axis=-1), 1)
+    return np.sqrt((error * weights).sum(axis=-1) / w_sum)
+
+
+@traced("fit_circle")
+def fit_circle(points, weights=None, robust=False, threshold=None, n_iter=200,
+               rng=None):
+    """
+    Least-squares circle through N rim points, for one or many frames
+
+    Args:
+        points: (N, 2) array of (x, y) rim points, or a stacked
+            (frames, N, 2) array fitted in one call
+        weights: Optional (..., N) weights, e.g. 0 for padding points
+        robust: Refine with RANSAC to ignore outlier points
+        threshold: RANSAC inlier distance in pixels, defaults to 1% of the
+            least-squares radius (at least 1 px)
+        n_iter: Number of RANSAC hypotheses per frame
+        rng: Seed or numpy Generator for RANSAC sampling
+
+    Returns:
+        CircleFit with arrays shaped like the leading axes of `points`
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim < 2 or points.shape[-1] != 2:
+        raise ValueError(f"Expected points of shape (..., N, 2), got {points.shape}")
+    if points.shape[-2] < 3:
+        raise ValueError("At least three points are needed to fit a circle")
+    if weights is not None:
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), points.shape[:-1])
+
+    center, radius = _algebraic_fit(points, weights)
+    if not robust:
+        return CircleFit(center, radius, _rms_residual(points, center, radius, weights))
+
+    if threshold is None:
+        threshold = np.maximum(0.01 * np.nan_to_num(radius), 1.0)
+    inliers = _ransac_inliers(points, weights, threshold, n_iter, rng)
+    center, radius = _algebraic_fit(points, inliers)
+    residual = _rms_residual(points, center, radius, inliers)
+    return CircleFit(center, radius, residual, inliers.astype(bool))
+
+
+def _ransac_inliers(points, weights, threshold, n_iter, rng, max_elements=2**23):
+    """
+    Inlier mask of the best three-point hypothesis for every frame
+
+    Hypotheses are drawn and scored for a chunk of frames at a time so the
+    (frames, hypotheses, points) distance array stays within `max_elements`.
+    """
+    rng = np.random.default_rng(rng)
+    batch_shape = points.shape[:-2]
+    n_points = points.shape[-2]
+    flat_points = points.reshape(-1, n_points, 2)
+    n_frames = flat_points.shape[0]
+    flat_weights = None if weights is None else weights.reshape(-1, n_points)
+    threshold = np.broadcast_to(np.asarray(threshold, dtype=np.float64), batch_shape).reshape(-1)
+
+    inliers = np.zeros((n_frames, n_points))
+    chunk = max(1, max_elements // (n_iter * n_points))
+    for start in range(0, n_frames, chunk):
+        stop = min(start + chunk, n_frames)
+        pts = flat_points[start:stop]
+        n = stop - start
+
+        # Three distinct points per hypothesis: the smallest of random keys
+        keys = rng.random((n, n_iter, n_points))
+        if flat_weights is not None:
+            # Draw only among points with positive weight
+            keys += ~(flat_weights[start:stop] > 0)[:, None, :]
+        sample = np.argpartition(keys, 2, axis=-1)[..., :3]
+        triples = np.take_along_axis(pts[:, None, :, :], sample[..., None], axis=2)
+        center, radius = _circumcircle(triples)
+
+        distance = np.linalg.norm(pts[:, None, :, :] - center[..., None, :], axis=-1)
+        close = np.abs(distance - radius[..., None]) <= threshold[start:stop, None, None]
+        if flat_weights is not None:
+            close &= flat_weights[start:stop, None, :] > 0
+        score = np.where(np.isfinite(radius), close.sum(axis=-1), -1)
+        best = score.argmax(axis=-1)
+        inliers[start:stop] = close[np.arange(n), best]
+
+    return inliers.reshape(batch_shape + (n_points,))
+
+
+def _circumcircle(triples):
+    """Vectorized circumcircle of (..., 3, 2) point triples (NaN if collinear)"""
+    p1, p2, p3 = triples[..., 0, :], triples[..., 1, :], triples[..., 2, :]
+    sq1 = (p1**2).sum(axis=-1)
+    sq2 = (p2**2).sum(axis=-1)
+    sq3 = (p3**2).sum(axis=-1)
+
+    D = 2 * (p1[..., 0] * (p2[..., 1] - p3[..., 1]) +
+             p2[..., 0] * (p3[..., 1] - p1[..., 1]) +
+             p3[..., 0] * (p1[..., 1] - p2[..., 1]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ux = (sq1 * (p2[..., 1] - p3[..., 1]) +
+              sq2 * (p3[..., 1] - p1[..., 1]) +
+              sq3 * (p1[..., 1] - p2[..., 1])) / D
+        uy = (sq1 * (p3[..., 0] - p2[..., 0]) +
+              sq2 * (p1[..., 0] - p3[..., 0]) +
+              sq3 * (p2[..., 0] - p1[..., 0])) / D
+    center = np.stack([ux, uy], axis=-1)
+    radius = np.linalg.norm(p1 - center, axis=-1)
+    radius = np.where(np.abs(D) > 1e-12, radius, np.nan)
+    return center, radius
+
+
+@traced("hough_circle")
+def hough_circle(image_gray, dp=1, min_dist=50, param1=100, param2=30,
+                 min_radius=None, max_radius=None, blur=5, downscale=1):
+    """
+    Strongest circle found by OpenCV's Hough gradient method
+
+    Args:
+        image_gray: 2D uint8 grayscale image
+        dp, min_dist, param1, param2: Passed to cv2.HoughCircles
+        min_radius, max_radius: Radius search range in full-resolution
+            pixels, defaults to a quarter and a half of the smaller image side
+        blur: Median blur kernel size applied before detection (0 disables)
+        downscale: Integer factor the image is shrunk by before detection.
+            The container rim is a soft edge spread over many pixels in the
+            full-size photos, which Canny only picks up at reduced resolution
+
+    Returns:
+        (center, radius) of the best circle, or None if nothing was found
+    """
+    if cv2 is None:
+        raise ImportError("Hough circle detection requires opencv-python")
+
+    short_side = min(image_gray.shape[:2])
+    if min_radius is None:
+        min_radius = short_side // 4
+    if max_radius is None:
+        max_radius = short_side // 2
+
+    if downscale > 1:
+        image_gray = cv2.resize(image_gray, None, fx=1 / downscale, fy=1 / downscale,
+                                interpolation=cv2.INTER_AREA)
+
+    blurred_image = cv2.medianBlur(image_gray, blur) if blur else image_gray
+    circles = cv2.HoughCircles(
+        blurred_image,
+        cv2.HOUGH_GRADIENT,
+        dp=dp, minDist=min_dist,
+        param1=param1, param2=param2,
+        minRadius=int(min_radius / downscale), maxRadius=int(max_radius / downscale)
+    )
+    if circles is None:
+        return None
+
+    x, y, r = circles[0, 0] * downscale
+    return (float(x), float(y)), float(r)
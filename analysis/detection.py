@@ -0,0 +1,231 @@
+"""
+Coarse-to-fine container detection
+
+Hough detection at full resolution with a wide radius range is the slowest
+stage on large frames (and the soft container rim is not even picked up by
+Canny at that scale). Detection therefore runs in three steps:
+
+1. Hough on a downsampled pyramid level, which is cheap and robust
+2. Refinement at full resolution: rim points are found along rays in a
+   narrow radial window around the coarse circle and fitted by least squares
+3. If Hough finds nothing, the same rim search runs over a wide window from
+   the image center, which is the automatic version of the 3-point method
+
+The last good circle of every run directory is remembered on disk, so later
+frames of the same run only search a small neighborhood of it.
+"""
+
+import json
+import os
+
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+from .circle import cv2, fit_circle, hough_circle
+from .instrument import traced
+from .polar_unwrap import polar_unwrap
+
+RUN_PARAMS_FILE = ".circle_params.json"
+
+
+class Detection:
+    """
+    Detected container circle
+
+    Attributes:
+        center: (x, y) center in full-resolution pixels
+        radius: Radius in full-resolution pixels
+        residual: RMS distance of the rim inliers from the circle
+        inlier_fraction: Fraction of rim rays that agree with the circle
+        method: 'cached', 'hough', 'rim-fit' or 'tracked'
+        edge_strength: Median radial gradient at the rim points
+        confidence: Score in [0, 1] set by CenterTracker, None otherwise
+    """
+
+    def __init__(self, center, radius, residual, inlier_fraction, method,
+                 edge_strength=None, confidence=None):
+        self.center = center
+        self.radius = radius
+        self.residual = residual
+        self.inlier_fraction = inlier_fraction
+        self.method = method
+        self.edge_strength = edge_strength
+        self.confidence = confidence
+
+    @property
+    def circle(self):
+        """(center, radius) tuple as used by the rest of the pipeline"""
+        return self.center, self.radius
+
+
+def rim_points(image_gray, center, r_min, r_max, n_rays=360, sigma=2,
+               return_strength=False):
+    """
+    Strongest radial edge along each of `n_rays` rays from `center`
+
+    Args:
+        image_gray: 2D grayscale image
+        center: (x, y) origin of the rays
+        r_min, r_max: Radial search window in pixels
+        n_rays: Number of rays over 360 degrees
+        sigma: Gaussian smoothing (in radial samples) of the derivative
+        return_strength: Also return the gradient magnitude at every point
+
+    Returns:
+        (n_rays, 2) array of (x, y) rim points; rays leaving the image are NaN.
+        With `return_strength`, a (points, strength) tuple.
+    """
+    polar = polar_unwrap(image_gray, center, r_min=r_min, r_max=r_max, n_theta=n_rays)
+    edge = np.abs(gaussian_filter1d(polar.data, sigma, axis=0, order=1))
+    valid = ~np.isnan(edge).any(axis=0)
+    edge = np.nan_to_num(edge, nan=-1)
+
+    peak = edge.argmax(axis=0)
+    radius = polar.radii[peak]
+    theta = np.radians(polar.theta_deg)
+    points = np.stack([center[0] + radius * np.cos(theta),
+                       center[1] + radius * np.sin(theta)], axis=-1)
+    points[~valid] = np.nan
+    if return_strength:
+        strength = edge[peak, np.arange(edge.shape[1])]
+        strength[~valid] = np.nan
+        return points, strength
+    return points
+
+
+@traced("fit_rim")
+def fit_rim(image_gray, center, r_min, r_max, n_rays=360, rng=0):
+    """
+    Robust circle fit to the rim points found in [r_min, r_max] around `center`
+
+    The edge strength tells whether the rim is inside the window at all: when
+    it is not, every ray still has a strongest gradient, just a weak one.
+
+    Returns:
+        (center, radius, residual, inlier_fraction, edge_strength), or None
+        if fewer than three rays stayed inside the image
+    """
+    points, strength = rim_points(image_gray, center, max(r_min, 0), r_max, n_rays,
+                                  return_strength=True)
+    usable = ~np.isnan(points).any(axis=-1)
+    if usable.sum() < 3:
+        return None
+    fit = fit_circle(np.nan_to_num(points), weights=usable, robust=True, rng=rng)
+    if not np.isfinite(fit.radius):
+        return None
+    inlier_fraction = float(fit.inliers.sum() / usable.sum())
+    return (float(fit.center[0]), float(fit.center[1])), float(fit.radius), \
+        float(fit.residual), inlier_fraction, float(np.median(strength[usable]))
+
+
+def _downscale(image_gray, factor):
+    if factor == 1:
+        return image_gray
+    if cv2 is not None:
+        return cv2.resize(image_gray, None, fx=1 / factor, fy=1 / factor,
+                          interpolation=cv2.INTER_AREA)
+    height = image_gray.shape[0] // factor * factor
+    width = image_gray.shape[1] // factor * factor
+    blocks = image_gray[:height, :width].reshape(height // factor, factor, width // factor, factor)
+    return blocks.mean(axis=(1, 3)).astype(image_gray.dtype)
+
+
+@traced("detect_circle")
+def detect_circle(image_gray, hint=None, level=3, hint_window=20,
+                  min_inlier_fraction=0.5, hough_params=None, coarse_image=None):
+    """
+    Container circle of a frame, coarse-to-fine
+
+    Args:
+        image_gray: 2D uint8 grayscale image
+        hint: Optional (center, radius) known to be close, e.g. the last good
+            circle of the run; only a `hint_window` neighborhood is searched
+        level: Pyramid level used for Hough (the image is shrunk by 2**level)
+        hint_window: Radial half-width in pixels of the search around `hint`
+        min_inlier_fraction: Minimum fraction of rim rays that must agree
+            with a circle for it to be accepted
+        hough_params: Extra keyword arguments for hough_circle
+        coarse_image: The frame already decoded at pyramid `level` (see
+            images.load_level), which saves downscaling `image_gray`
+
+    Returns:
+        Detection, or None if no acceptable circle was found
+    """
+    def accept(fit, method):
+        if fit is None or fit[3] < min_inlier_fraction:
+            return None
+        return Detection(*fit[:4], method, edge_strength=fit[4])
+
+    if hint is not None:
+        (center, radius) = hint
+        detection = accept(
+            fit_rim(image_gray, center, radius - hint_window, radius + hint_window),
+            "cached",
+        )
+        if detection is not None:
+            return detection
+
+    small = coarse_image if coarse_image is not None else _downscale(image_gray, 2**level)
+    scale = image_gray.shape[0] / small.shape[0]
+    # A coarse circle is off by about one pyramid pixel, so the full
+    # resolution window only needs to cover a few of them
+    window = 4 * scale
+
+    if cv2 is not None:
+        coarse = hough_circle(small, **(hough_params or {}))
+        if coarse is not None:
+            (x, y), radius = coarse
+            detection = accept(
+                fit_rim(image_gray, (x * scale, y * scale),
+                        (radius - 4) * scale, (radius + 4) * scale),
+                "hough",
+            )
+            if detection is not None:
+                return detection
+
+    # Fallback: search the whole plausible radius range from the image center
+    # on the pyramid level, then refine at full resolution
+    short_side = min(small.shape)
+    center = (small.shape[1] / 2, small.shape[0] / 2)
+    coarse = fit_rim(small, center, 0.2 * short_side, 0.5 * short_side - 1)
+    if coarse is None or coarse[3] < min_inlier_fraction:
+        return None
+    center = (coarse[0][0] * scale, coarse[0][1] * scale)
+    radius = coarse[1] * scale
+    return accept(
+        fit_rim(image_gray, center, radius - window, radius + window), "rim-fit"
+    )
+
+
+def load_run_params(directory):
+    """
+    Last good circle remembered for a run directory
+
+    Returns:
+        (center, radius), or None if nothing has been saved yet
+    """
+    path = os.path.join(directory, RUN_PARAMS_FILE)
+    try:
+        with open(path) as f:
+            params = json.load(f)
+        return tuple(params["center"]), params["radius"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_run_params(directory, detection):
+    """Remember `detection` as the last good circle of a run directory"""
+    path = os.path.join(directory, RUN_PARAMS_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    params = {
+        "center": list(detection.center),
+        "radius": detection.radius,
+        "residual": detection.residual,
+    }
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(params, f)
+        # Atomic, so concurrent workers of the same run never see a partial file
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Read-only data directories just don't get the speed-up
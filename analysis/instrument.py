@@ -0,0 +1,279 @@
+"""
+Lightweight timing and memory spans written as a Chrome trace
+
+Wrap a stage in a span to record its wall time, CPU time and the growth of
+the process's peak RSS:
+
+    from analysis.instrument import span, traced
+
+    with span("decode", path=path):
+        image = load_gray(path)
+
+    @traced("detect_circle")
+    def detect_circle(...):
+        ...
+
+Tracing is off unless the SC_TRACE environment variable is set to the trace
+file (`SC_TRACE=trace.json`, or `SC_TRACE=1` for `trace.json`). When off, a
+span is a shared no-op context manager and a traced function costs one
+global lookup per call. With SC_TRACE_MEMORY=1 every span also records the
+peak of Python allocations (tracemalloc), which slows allocation-heavy code
+down noticeably.
+
+The file uses the Chrome trace-event format; open it in chrome://tracing or
+https://ui.perfetto.dev. Events of all processes, such as the batch
+workers, are appended to the same file, one line per event. The trace-event
+format allows the closing bracket to be missing, so a trace of a crashed run
+can still be opened.
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_NULL_SPAN = contextlib.nullcontext()
+
+# Owner-process marker, inherited by worker processes through the environment
+_OWNER_ENV = "SC_TRACE_OWNER"
+
+_tracer = None
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return 0
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _Tracer:
+    """Collects complete ('X') events and appends them to the trace file"""
+
+    def __init__(self, path, memory):
+        self.path = path
+        self.memory = memory
+        self.pid = os.getpid()
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+        owner = os.environ.get(_OWNER_ENV)
+        self.owner = owner is None or owner == str(self.pid)
+        if self.owner:
+            os.environ[_OWNER_ENV] = str(self.pid)
+            with open(path, "w") as f:
+                f.write("[\n")
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self._name_process()
+
+    def _name_process(self):
+        name = os.path.basename(sys.argv[0]) if sys.argv else ""
+        if name in ("", "-c", "-m"):
+            name = "python"
+        self.events.append({"name": "process_name", "ph": "M", "pid": self.pid,
+                            "tid": 0, "args": {"name": f"{name} ({self.pid})"}})
+
+    def reset_after_fork(self):
+        # The child shares the file but not the parent's buffered events
+        self.pid = os.getpid()
+        self.owner = False
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self._name_process()
+
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def add(self, event, top_level):
+        with self.lock:
+            self.events.append(event)
+            # Pool workers exit without running atexit handlers, so they
+            # write every finished top-level span right away
+            if len(self.events) >= 256 or (top_level and not self.owner):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.events:
+            return
+        data = "".join(json.dumps(event) + ",\n" for event in self.events)
+        self.events = []
+        # One O_APPEND write per flush, so processes never interleave lines
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode())
+        finally:
+            os.close(fd)
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        if self.owner:
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"name": "trace_end", "ph": "i", "s": "g",
+                                    "pid": self.pid, "tid": 0,
+                                    "ts": time.perf_counter_ns() / 1e3}) + "]\n")
+
+
+class _Span:
+    """Context manager recording one complete event"""
+
+    __slots__ = ("tracer", "name", "category", "args", "start", "cpu_start",
+                 "rss_start", "mem_start", "child_peak")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        tracer = self.tracer
+        tracer.stack().append(self)
+        self.child_peak = 0
+        if tracer.memory:
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.rss_start = _peak_rss_kb()
+        self.cpu_start = time.thread_time_ns()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        cpu = time.thread_time_ns() - self.cpu_start
+        tracer = self.tracer
+        stack = tracer.stack()
+        stack.pop()
+
+        args = dict(self.args)
+        args["cpu_ms"] = round(cpu / 1e6, 3)
+        args["peak_rss_growth_kb"] = _peak_rss_kb() - self.rss_start
+        if tracer.memory:
+            # Nested spans reset the tracemalloc peak, so take theirs into account
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            args["alloc_peak_kb"] = round((peak - self.mem_start) / 1024, 1)
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+
+        tracer.add({
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self.start / 1e3,
+            "dur": (end - self.start) / 1e3,
+            "pid": tracer.pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }, top_level=not stack)
+        return False
+
+
+def enable(path="trace.json", memory=False):
+    """
+    Start writing spans to `path`
+
+    Args:
+        path: Trace file (Chrome trace-event JSON)
+        memory: Also record tracemalloc peaks per span
+    """
+    global _tracer
+    if _tracer is not None:
+        disable()
+    _tracer = _Tracer(path, memory)
+
+
+def disable():
+    """Stop tracing and finish the trace file"""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def enabled():
+    """Whether spans are being recorded"""
+    return _tracer is not None
+
+
+def flush():
+    """Write buffered events now (they are also written at exit)"""
+    if _tracer is not None:
+        _tracer.flush()
+
+
+def span(name, category="analysis", **args):
+    """
+    Context manager timing the enclosed block
+
+    Args:
+        name: Event name shown in the trace viewer
+        category: Event category, e.g. 'analysis' or 'render'
+        **args: JSON-serializable details stored with the event
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, category, args)
+
+
+def traced(name=None, category="analysis"):
+    """
+    Decorator recording every call of a function as a span
+
+    Args:
+        name: Event name, defaults to the function's qualified name
+        category: Event category
+    """
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _Span(_tracer, label, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _after_fork_in_child():
+    if _tracer is not None:
+        _tracer.reset_after_fork()
+
+
+def _enable_from_environment():
+    path = os.environ.get("SC_TRACE")
+    if not path or path == "0":
+        return
+    if path == "1":
+        path = "trace.json"
+    enable(os.path.abspath(path), memory=os.environ.get("SC_TRACE_MEMORY") == "1")
+    atexit.register(disable)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+_enable_from_environment()
@@ -0,0 +1,101 @@
+"""
+Least-recently-used cache bounded by memory instead of entry count
+
+Geometry tables (pixel indices, angle bins, interpolation maps) are large
+NumPy arrays, so the caches in this package are limited by the total number
+of bytes they hold rather than by how many entries they have.
+
+Cached geometries may grow after insertion (bin indices are added lazily), so
+sizes are re-measured whenever the cache changes. The caches hold a handful
+of entries, which keeps that cheap.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def _nbytes(value):
+    """Size of a cached value in bytes (objects expose an `nbytes` attribute)"""
+    return int(getattr(value, "nbytes", 0))
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a total size budget
+
+    Args:
+        max_bytes: Upper bound for the summed size of all cached values
+        sizeof: Function returning the size of a value in bytes
+    """
+
+    def __init__(self, max_bytes, sizeof=_nbytes):
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @property
+    def nbytes(self):
+        """Total size of the cached values in bytes"""
+        return self._total
+
+    def get(self, key, default=None):
+        """Return the cached value for `key` and mark it as recently used"""
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`, evicting the least recently used entries
+
+        Values larger than the whole budget are not stored.
+        """
+        if self._sizeof(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            self._evict()
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for `key`, building it with `factory()` on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def resize(self, max_bytes):
+        """Change the budget, evicting entries if the cache is now too large"""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock
+        sizes = {key: self._sizeof(value) for key, value in self._items.items()}
+        self._total = sum(sizes.values())
+        while self._total > self.max_bytes and self._items:
+            old_key, _ = self._items.popitem(last=False)
+            self._total -= sizes.pop(old_key)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._items.clear()
+            self._total = 0
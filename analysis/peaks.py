@@ -0,0 +1,159 @@
+"""
+Vectorized peak detection for periodic angular profiles
+
+A profile covers 0-360 degrees, so its first and last bins are neighbors and
+a finger that straddles 0 degrees must be found exactly once. Every step
+here works on whole (profiles x bins) arrays with circular indexing:
+
+1. Local maxima against both circular neighbors
+2. Minimum angular spacing: a peak must be the maximum of its circular
+   window of +- `min_distance_deg`
+3. Minimum prominence: the height of a peak above the higher of the two
+   valleys separating it from its neighboring peaks. Failing peaks are
+   removed lowest-first, so a small bump on the shoulder of a large finger
+   never hides the large one
+4. Sub-bin position and height by parabolic interpolation
+"""
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+
+from .instrument import traced
+from .spectrum import fill_empty_bins
+
+
+class Peaks:
+    """
+    Peaks of a batch of profiles, ordered by profile and then by position
+
+    Attributes:
+        row: Profile index of every peak
+        index: Bin index of every peak
+        position: Sub-bin position in bins, in [0, n_bins)
+        angle_deg: Peak angle in degrees
+        height: Interpolated peak height
+        prominence: Height above the higher neighboring valley
+        counts: Number of peaks per profile
+    """
+
+    def __init__(self, row, index, position, angle_deg, height, prominence, n_rows):
+        self.row = row
+        self.index = index
+        self.position = position
+        self.angle_deg = angle_deg
+        self.height = height
+        self.prominence = prominence
+        self.counts = np.bincount(row, minlength=n_rows)
+        self._offsets = np.concatenate(([0], np.cumsum(self.counts)))
+
+    def __len__(self):
+        return len(self.row)
+
+    def for_row(self, i):
+        """Slice of the peak arrays that belongs to profile `i`"""
+        return slice(self._offsets[i], self._offsets[i + 1])
+
+
+def _valleys(profiles, is_peak):
+    """
+    Left and right valley depth of every peak, plus the neighbor peak indices
+
+    Each row is rotated so its first peak sits at bin 0, which makes every
+    stretch between consecutive peaks a contiguous run in the flattened
+    array; a single minimum.reduceat then gives all the valleys.
+    """
+    n_bins = profiles.shape[-1]
+    rows = np.flatnonzero(is_peak.any(axis=-1))
+    first = is_peak[rows].argmax(axis=-1)
+    rotation = (first[:, None] + np.arange(n_bins)) % n_bins
+
+    rotated = np.take_along_axis(profiles[rows], rotation, axis=-1)
+    rotated_peaks = np.take_along_axis(is_peak[rows], rotation, axis=-1)
+    starts = np.flatnonzero(rotated_peaks.ravel())
+
+    # Valley between each peak and the next one of the same row (the last
+    # peak's run wraps round to the row's first peak)
+    right = np.minimum.reduceat(rotated.ravel(), starts)
+
+    peak_row = starts // n_bins
+    first_of_row = np.flatnonzero(np.r_[True, peak_row[1:] != peak_row[:-1]])
+    last_of_row = np.r_[first_of_row[1:] - 1, len(starts) - 1]
+
+    next_peak = np.arange(1, len(starts) + 1)
+    next_peak[last_of_row] = first_of_row
+    prev_peak = np.arange(-1, len(starts) - 1)
+    prev_peak[first_of_row] = last_of_row
+    left = right[prev_peak]
+
+    # Map the rotated positions back to (row, bin) in the original arrays
+    peak_bin = (starts % n_bins + first[peak_row]) % n_bins
+    return rows[peak_row], peak_bin, left, right, prev_peak, next_peak
+
+
+@traced("find_periodic_peaks")
+def find_periodic_peaks(profiles, min_prominence=0.0, min_distance_deg=0.0,
+                        bin_centers=True):
+    """
+    Peaks of one or many periodic angular profiles
+
+    Args:
+        profiles: (n_bins,) or (profiles, n_bins) array over 360 degrees;
+            NaN bins are filled with the profile mean
+        min_prominence: Minimum height of a peak above its higher valley
+        min_distance_deg: Minimum angular spacing between peaks in degrees
+        bin_centers: Bins are [i, i+1) * 360 / n_bins wide (angles refer to
+            their centers); use False for profiles sampled at i * 360 / n_bins
+
+    Returns:
+        Peaks
+    """
+    profiles = np.atleast_2d(fill_empty_bins(profiles))
+    n_rows, n_bins = profiles.shape
+
+    left = np.roll(profiles, 1, axis=-1)
+    right = np.roll(profiles, -1, axis=-1)
+    # '>' on the left and '>=' on the right keeps one sample of a plateau
+    is_peak = (profiles > left) & (profiles >= right)
+
+    half_window = int(np.ceil(min_distance_deg * n_bins / 360.0))
+    if half_window > 0:
+        size = min(2 * half_window + 1, n_bins)
+        window_max = maximum_filter1d(profiles, size=size, axis=-1, mode="wrap")
+        is_peak &= profiles >= window_max
+
+    while True:
+        if not is_peak.any():
+            peak_row = peak_bin = np.zeros(0, dtype=np.intp)
+            prominence = np.zeros(0)
+            break
+        peak_row, peak_bin, left_valley, right_valley, prev_peak, next_peak = \
+            _valleys(profiles, is_peak)
+        height = profiles[peak_row, peak_bin]
+        prominence = height - np.maximum(left_valley, right_valley)
+
+        failing = prominence < min_prominence
+        if not failing.any():
+            break
+        # Remove a failing peak only if the neighbor behind its key valley is
+        # higher, so lower peaks go first and valleys merge correctly
+        key_neighbor = np.where(right_valley >= left_valley, next_peak, prev_peak)
+        drop = failing & (height[key_neighbor] > height)
+        if not drop.any():
+            drop = failing
+        is_peak[peak_row[drop], peak_bin[drop]] = False
+
+    # Parabolic interpolation through the peak and its circular neighbors
+    y0 = profiles[peak_row, (peak_bin - 1) % n_bins]
+    y1 = profiles[peak_row, peak_bin]
+    y2 = profiles[peak_row, (peak_bin + 1) % n_bins]
+    curvature = y0 - 2 * y1 + y2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = np.where(curvature < 0, 0.5 * (y0 - y2) / curvature, 0.0)
+    delta = np.clip(delta, -0.5, 0.5)
+    height = y1 - 0.25 * (y0 - y2) * delta
+    position = (peak_bin + delta) % n_bins
+
+    offset = 0.5 if bin_centers else 0.0
+    angle_deg = ((position + offset) * (360.0 / n_bins)) % 360
+
+    return Peaks(peak_row, peak_bin, position, angle_deg, height, prominence, n_rows)
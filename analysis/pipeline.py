@@ -0,0 +1,83 @@
+"""
+Single-frame analysis: detection, polar strip extraction and angular binning
+
+This is the pipeline the presentation walks through, applied to one image:
+find the container circle, sample a circular strip at a fraction of its
+radius and average the strip intensities in angular bins.
+"""
+
+from .binning import bin_statistics
+from .detection import detect_circle
+from .images import load_gray  # noqa: F401  (re-exported for the batch and scene code)
+from .instrument import traced
+from .polar_strip import get_strip_geometry
+
+
+class FrameResult:
+    """
+    Angular intensity profile of one frame
+
+    Attributes:
+        center: (x, y) container center in pixels
+        container_radius: Detected container radius in pixels
+        radius: Radius the strip was sampled at in pixels
+        profile: Mean intensity per angular bin (NaN for empty bins)
+        stats: BinStats with count, std, min and max per bin
+        method: How the circle was obtained ('cached', 'hough', 'rim-fit'
+            or 'manual')
+        detection: The Detection, or None for a manual circle
+    """
+
+    def __init__(self, center, container_radius, radius, stats, method, detection=None):
+        self.center = center
+        self.container_radius = container_radius
+        self.radius = radius
+        self.profile = stats.mean
+        self.stats = stats
+        self.method = method
+        self.detection = detection
+
+
+@traced("analyze_frame")
+def analyze_frame(image_gray, n_bins=360, radius_fraction=0.8, strip_width=10,
+                  circle=None, hint=None, coarse_image=None, tracker=None):
+    """
+    Angular intensity profile of one grayscale frame
+
+    Args:
+        image_gray: 2D uint8 grayscale image
+        n_bins: Number of angular bins over 360 degrees
+        radius_fraction: Strip radius as a fraction of the container radius
+        strip_width: Full width of the sampled strip in pixels
+        circle: Optional known (center, radius) of the container, which
+            skips detection
+        hint: Optional (center, radius) close to the container, which
+            restricts detection to its neighborhood
+        coarse_image: Optional reduced-resolution decode of the frame used
+            for the coarse detection stage
+        tracker: Optional CenterTracker carrying the circle of the previous
+            frame; used instead of a fresh detection
+
+    Returns:
+        FrameResult for the frame
+    """
+    detection = None
+    if circle is None:
+        if tracker is not None:
+            detection = tracker.update(image_gray, coarse_image=coarse_image)
+        else:
+            detection = detect_circle(image_gray, hint=hint, coarse_image=coarse_image)
+        if detection is None:
+            raise RuntimeError("No container circle found")
+        circle = detection.circle
+        method = detection.method
+    else:
+        method = "manual"
+    center, container_radius = circle
+
+    radius = radius_fraction * container_radius
+    geometry = get_strip_geometry(image_gray.shape, center, radius, strip_width)
+    intensity_strip = geometry.gather(image_gray)
+    stats = bin_statistics(intensity_strip, geometry.angle_bins(n_bins))
+
+    return FrameResult(center, container_radius, radius, stats, method, detection)
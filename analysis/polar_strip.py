@@ -0,0 +1,208 @@
+"""
+Circular strip extraction with cached polar geometry
+
+PolarTransformScene shows the per-image transform: build `np.indices` for the
+whole image, convert every pixel to (r, theta) and keep the ones inside a thin
+annulus. For a fixed camera the result only depends on the image shape, the
+center, the radius and the strip width, so it is computed once per geometry
+and kept in a memory-bounded LRU cache. Every later frame with the same
+geometry is a single fancy-index gather.
+"""
+
+import numpy as np
+
+from .binning import BinIndex, angular_bin_indices
+from .instrument import traced
+from .lru import LRUCache
+
+# 256 MB holds the strip tables of several 20+ MP frames at once
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+_geometry_cache = LRUCache(DEFAULT_CACHE_BYTES)
+
+
+class StripGeometry:
+    """
+    Pixels of an annulus r_min <= r <= r_max around a center
+
+    Attributes:
+        shape: (height, width) of the images this geometry applies to
+        center: (x, y) center of the annulus in pixels
+        r_min, r_max: Inner and outer radius of the annulus in pixels
+        flat_index: Indices of the strip pixels into the flattened image
+        theta_deg: Angle of each strip pixel in degrees, in [0, 360)
+        radius: Distance of each strip pixel from the center
+    """
+
+    @traced("strip_geometry")
+    def __init__(self, shape, center, r_min, r_max):
+        self.shape = tuple(int(n) for n in shape[:2])
+        self.center = (float(center[0]), float(center[1]))
+        self.r_min = float(r_min)
+        self.r_max = float(r_max)
+
+        height, width = self.shape
+        cx, cy = self.center
+
+        # Only the bounding box of the annulus can contain strip pixels, and
+        # the trig is evaluated for the selected pixels only
+        y0 = max(int(np.floor(cy - self.r_max)), 0)
+        y1 = min(int(np.ceil(cy + self.r_max)) + 1, height)
+        x0 = max(int(np.floor(cx - self.r_max)), 0)
+        x1 = min(int(np.ceil(cx + self.r_max)) + 1, width)
+
+        dy = np.arange(y0, y1, dtype=np.float64)[:, None] - cy
+        dx = np.arange(x0, x1, dtype=np.float64)[None, :] - cx
+        r_sq = dx**2 + dy**2
+        strip_mask = (r_sq >= self.r_min**2) & (r_sq <= self.r_max**2)
+
+        rows, cols = np.nonzero(strip_mask)
+        self.flat_index = (rows + y0) * width + (cols + x0)
+
+        dx_strip = dx[0, cols]
+        dy_strip = dy[rows, 0]
+        theta = np.arctan2(dy_strip, dx_strip)
+        self.theta_deg = (np.degrees(theta) + 360) % 360
+        self.radius = np.sqrt(r_sq[rows, cols]).astype(np.float32)
+
+        self._angle_bins = {}
+        self._radial_bins = {}
+
+    def __len__(self):
+        return len(self.flat_index)
+
+    @property
+    def nbytes(self):
+        """Memory held by the geometry tables, including cached bin indices"""
+        total = self.flat_index.nbytes + self.theta_deg.nbytes + self.radius.nbytes
+        total += sum(bins.nbytes for bins in self._angle_bins.values())
+        return total + sum(bins.nbytes for bins in self._radial_bins.values())
+
+    def angle_bins(self, n_bins):
+        """
+        Angular bin assignment of the strip pixels
+
+        Args:
+            n_bins: Number of equal bins covering [0, 360)
+
+        Returns:
+            BinIndex, computed once per bin count
+        """
+        bins = self._angle_bins.get(n_bins)
+        if bins is None:
+            bins = BinIndex(angular_bin_indices(self.theta_deg, n_bins), n_bins)
+            self._angle_bins[n_bins] = bins
+        return bins
+
+    def radial_bins(self, n_r, n_theta):
+        """
+        Joint (radius, angle) bin assignment of the annulus pixels
+
+        Radius bins split [r_min, r_max] evenly; the flat bin of a pixel is
+        `radius_bin * n_theta + angle_bin`.
+
+        Returns:
+            BinIndex with n_r * n_theta bins, computed once per grid
+        """
+        key = (n_r, n_theta)
+        bins = self._radial_bins.get(key)
+        if bins is None:
+            span = max(self.r_max - self.r_min, 1e-12)
+            r_bins = ((self.radius - self.r_min) * (n_r / span)).astype(np.intp)
+            np.clip(r_bins, 0, n_r - 1, out=r_bins)
+            t_bins = angular_bin_indices(self.theta_deg, n_theta)
+            bins = BinIndex(r_bins * n_theta + t_bins, n_r * n_theta)
+            self._radial_bins[key] = bins
+        return bins
+
+    @traced("strip_gather")
+    def gather(self, image):
+        """
+        Intensities of the strip pixels of one image
+
+        Args:
+            image: 2D array with this geometry's shape
+
+        Returns:
+            1D array aligned with `flat_index`, `theta_deg` and `radius`
+        """
+        if image.shape[:2] != self.shape or image.ndim != 2:
+            raise ValueError(
+                f"Expected a 2D image of shape {self.shape}, got {image.shape}"
+            )
+        return np.ravel(image)[self.flat_index]
+
+
+def _geometry_key(shape, center, r_min, r_max):
+    # Sub-pixel jitter below 1e-3 px does not change which pixels are selected
+    return (
+        int(shape[0]),
+        int(shape[1]),
+        round(float(center[0]), 3),
+        round(float(center[1]), 3),
+        round(float(r_min), 3),
+        round(float(r_max), 3),
+    )
+
+
+def get_annulus_geometry(shape, center, r_min, r_max):
+    """
+    Cached geometry of the annulus r_min <= r <= r_max
+
+    Args:
+        shape: Image shape (height, width)
+        center: (x, y) center in pixels
+        r_min, r_max: Radial extent of the annulus in pixels
+
+    Returns:
+        StripGeometry shared with every other caller using the same geometry
+    """
+    key = _geometry_key(shape, center, r_min, r_max)
+    return _geometry_cache.get_or_create(
+        key, lambda: StripGeometry(shape, center, r_min, r_max)
+    )
+
+
+def get_strip_geometry(shape, center, radius, strip_width):
+    """
+    Cached geometry of a circular strip of `strip_width` pixels around `radius`
+
+    Args:
+        shape: Image shape (height, width)
+        center: (x, y) center in pixels
+        radius: Radius of the middle of the strip in pixels
+        strip_width: Full width of the strip in pixels
+
+    Returns:
+        StripGeometry for the strip
+    """
+    half_width = strip_width / 2
+    return get_annulus_geometry(shape, center, radius - half_width, radius + half_width)
+
+
+def extract_strip(image_gray, center, radius, strip_width):
+    """
+    Angles and intensities of the pixels inside a circular strip
+
+    Args:
+        image_gray: 2D grayscale image
+        center: (x, y) center of the pattern in pixels
+        radius: Radius of the middle of the strip in pixels
+        strip_width: Full width of the strip in pixels
+
+    Returns:
+        theta_strip: Pixel angles in degrees, in [0, 360)
+        intensity_strip: Pixel intensities, same order as `theta_strip`
+    """
+    geometry = get_strip_geometry(image_gray.shape, center, radius, strip_width)
+    return geometry.theta_deg, geometry.gather(image_gray)
+
+
+def set_cache_budget(max_bytes):
+    """Change the memory budget of the geometry cache"""
+    _geometry_cache.resize(max_bytes)
+
+
+def clear_cache():
+    """Drop every cached strip geometry"""
+    _geometry_cache.clear()
@@ -0,0 +1,203 @@
+"""
+Full-image polar unwrap onto a regular (radius x angle) grid
+
+The strip extraction keeps the pixels of one thin annulus and throws away the
+rest of the image. Here the image is resampled once onto a regular grid of
+radii and angles with bilinear interpolation, so every radius is a row of the
+result and the angular profile at any radius is a slice.
+
+The sampling coordinates only depend on the image shape, the center and the
+grid, so they are precomputed and cached like the strip geometry.
+"""
+
+import numpy as np
+
+from .instrument import traced
+from .lru import LRUCache
+
+# The coordinate maps cost 12 bytes per output sample
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+_map_cache = LRUCache(DEFAULT_CACHE_BYTES)
+
+
+class PolarMap:
+    """
+    Bilinear sampling coordinates of a (radius x angle) grid
+
+    Each output sample stores the flat index of the top-left source pixel and
+    the fractional offsets to it; the other three corners are at +1, +width
+    and +width+1.
+
+    Attributes:
+        shape: (height, width) of the source images
+        center: (x, y) center in pixels
+        radii: Radius of every output row in pixels
+        theta_deg: Angle of every output column in degrees
+        index: Flat index of the top-left source pixel, shape (n_r, n_theta)
+        fx, fy: Fractional x and y offsets, shape (n_r, n_theta)
+        valid: Samples that fall inside the image, or None if all do
+    """
+
+    @traced("polar_map")
+    def __init__(self, shape, center, r_min, r_max, n_r, n_theta):
+        self.shape = tuple(int(n) for n in shape[:2])
+        self.center = (float(center[0]), float(center[1]))
+        height, width = self.shape
+
+        self.radii = np.linspace(r_min, r_max, n_r)
+        self.theta_deg = np.arange(n_theta) * (360.0 / n_theta)
+
+        # Same angle convention as the strip: arctan2(y - cy, x - cx) in image
+        # coordinates, measured in [0, 360)
+        theta = np.radians(self.theta_deg)
+        x = self.center[0] + self.radii[:, None] * np.cos(theta)[None, :]
+        y = self.center[1] + self.radii[:, None] * np.sin(theta)[None, :]
+
+        valid = (x >= 0) & (x <= width - 1) & (y >= 0) & (y <= height - 1)
+        self.valid = None if valid.all() else valid
+
+        x0 = np.clip(np.floor(x), 0, max(width - 2, 0))
+        y0 = np.clip(np.floor(y), 0, max(height - 2, 0))
+        index_dtype = np.int32 if height * width < 2**31 else np.int64
+        self.index = (y0 * width + x0).astype(index_dtype)
+        self.fx = np.clip(x - x0, 0, 1).astype(np.float32)
+        self.fy = np.clip(y - y0, 0, 1).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        total = self.index.nbytes + self.fx.nbytes + self.fy.nbytes
+        total += self.radii.nbytes + self.theta_deg.nbytes
+        if self.valid is not None:
+            total += self.valid.nbytes
+        return total
+
+    def sample(self, image, dtype=np.float32):
+        """
+        Resample one image onto the polar grid
+
+        Args:
+            image: 2D array with this map's shape
+            dtype: Floating point output type
+
+        Returns:
+            Array of shape (n_r, n_theta); samples outside the image are NaN
+        """
+        if image.ndim != 2 or image.shape != self.shape:
+            raise ValueError(
+                f"Expected a 2D image of shape {self.shape}, got {image.shape}"
+            )
+        flat = np.ravel(image)
+        width = self.shape[1]
+
+        top_left = flat[self.index].astype(dtype)
+        top_right = flat[self.index + 1].astype(dtype)
+        bottom_left = flat[self.index + width].astype(dtype)
+        bottom_right = flat[self.index + (width + 1)].astype(dtype)
+
+        fx = self.fx.astype(dtype, copy=False)
+        fy = self.fy.astype(dtype, copy=False)
+        top = top_left + fx * (top_right - top_left)
+        bottom = bottom_left + fx * (bottom_right - bottom_left)
+        result = top + fy * (bottom - top)
+
+        if self.valid is not None:
+            result[~self.valid] = np.nan
+        return result
+
+
+class PolarImage:
+    """
+    Image resampled onto a (radius x angle) grid
+
+    Attributes:
+        data: Array of shape (n_r, n_theta)
+        radii: Radius of every row in pixels
+        theta_deg: Angle of every column in degrees
+    """
+
+    def __init__(self, data, radii, theta_deg):
+        self.data = data
+        self.radii = radii
+        self.theta_deg = theta_deg
+
+    def row_at(self, radius):
+        """Index of the row closest to `radius`"""
+        return int(np.abs(self.radii - radius).argmin())
+
+    def profile_at(self, radius):
+        """
+        Angular profile at the grid radius closest to `radius`
+
+        Returns:
+            View into `data` (no copy) of length n_theta
+        """
+        return self.data[self.row_at(radius)]
+
+    def profiles_between(self, r_min, r_max):
+        """Rows with r_min <= radius <= r_max, as a view"""
+        start = int(np.searchsorted(self.radii, r_min, side="left"))
+        stop = int(np.searchsorted(self.radii, r_max, side="right"))
+        return self.data[start:stop]
+
+
+def get_polar_map(shape, center, r_min, r_max, n_r=None, n_theta=360):
+    """
+    Cached bilinear sampling map for a polar grid
+
+    Args:
+        shape: Image shape (height, width)
+        center: (x, y) center in pixels
+        r_min, r_max: Radial extent of the grid in pixels
+        n_r: Number of radii, defaults to one per pixel of radial extent
+        n_theta: Number of angles over [0, 360)
+
+    Returns:
+        PolarMap shared with every other caller using the same grid
+    """
+    if n_r is None:
+        n_r = int(round(r_max - r_min)) + 1
+    key = (
+        int(shape[0]), int(shape[1]),
+        round(float(center[0]), 3), round(float(center[1]), 3),
+        round(float(r_min), 3), round(float(r_max), 3),
+        int(n_r), int(n_theta),
+    )
+    return _map_cache.get_or_create(
+        key, lambda: PolarMap(shape, center, r_min, r_max, n_r, n_theta)
+    )
+
+
+@traced("polar_unwrap")
+def polar_unwrap(image_gray, center, r_min=0, r_max=None, n_r=None, n_theta=360,
+                 dtype=np.float32):
+    """
+    Resample an image onto a regular (radius x angle) grid
+
+    Only the annulus [r_min, r_max] is resampled, so cropping the radial range
+    also cuts the work.
+
+    Args:
+        image_gray: 2D grayscale image
+        center: (x, y) center of the pattern in pixels
+        r_min, r_max: Radial extent in pixels, r_max defaults to the distance
+            from the center to the nearest image edge
+        n_r: Number of radii, defaults to one per pixel of radial extent
+        n_theta: Number of angles over [0, 360)
+        dtype: Floating point output type (float32 halves the memory)
+
+    Returns:
+        PolarImage
+    """
+    if r_max is None:
+        height, width = image_gray.shape[:2]
+        cx, cy = center
+        r_max = min(cx, cy, width - 1 - cx, height - 1 - cy)
+    polar_map = get_polar_map(image_gray.shape, center, r_min, r_max, n_r, n_theta)
+    data = polar_map.sample(image_gray, dtype=dtype)
+    return PolarImage(data, polar_map.radii, polar_map.theta_deg)
+
+
+def clear_cache():
+    """Drop every cached polar map"""
+    _map_cache.clear()
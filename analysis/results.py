@@ -0,0 +1,161 @@
+"""
+Lazily loaded profile, peaks, mode spectrum and finger count of a frame or a run
+
+ResultsScene shows the analysis of one frame (`d4_T20_1`) or the mean
+profile of a run (`d4_T20`). The profiles come from the ResultsStore written
+by `analysis.batch`. A frame missing from the store is analyzed the way the
+batch does it and appended, so every later render only reads a
+memory-mapped row. Nothing is loaded or computed before the first attribute
+access.
+"""
+
+import os
+import re
+
+import numpy as np
+
+from .batch import analysis_options, analyze_frames, discover_frames, frame_key
+from .peaks import find_periodic_peaks
+from .spectrum import fill_empty_bins, mode_spectrum
+from .store import ResultsStore
+
+RESULTS_DIR = os.environ.get("SC_RESULTS_DIR", "results")
+DATA_DIR = os.environ.get("SC_DATA_DIR", "data")
+
+RESULT_ID_PATTERN = re.compile(
+    r"^d(?P<run>\d+)_T(?P<temp>-?\d+(?:\.\d+)?)(?:_(?P<index>\d+))?$", re.IGNORECASE
+)
+
+
+def parse_result_id(result_id):
+    """
+    Run, temperature and optional frame index of a frame or run ID
+
+    Args:
+        result_id: Frame ID such as 'd4_T20_1' or run ID such as 'd4_T20'
+
+    Returns:
+        Dict with 'run', 'temp' and 'index' (None for a run)
+    """
+    match = RESULT_ID_PATTERN.match(result_id)
+    if match is None:
+        raise ValueError(f"Not a frame or run ID: {result_id!r} (expected e.g. d4_T20_1 or d4_T20)")
+    return {
+        "run": int(match["run"]),
+        "temp": float(match["temp"]),
+        "index": None if match["index"] is None else int(match["index"]),
+    }
+
+
+class ProfileResult:
+    """
+    Angular profile of a frame or a run, read from the results store on first use
+
+    Args:
+        result_id: Frame ID ('d4_T20_1') or run ID ('d4_T20', mean over its frames)
+        store_dir: ResultsStore directory
+        data_dir: Directory searched for frames that are not in the store
+        min_prominence: Minimum peak prominence, defaults to the standard
+            deviation of the profile
+        min_mode: Lowest azimuthal mode considered for the dominant mode
+        **options: Analysis options (see analysis.batch.DEFAULT_OPTIONS);
+            only profiles analyzed with the same options are used
+    """
+
+    def __init__(self, result_id, store_dir=RESULTS_DIR, data_dir=DATA_DIR, min_prominence=None,
+                 min_mode=2, **options):
+        self.result_id = result_id
+        self.info = parse_result_id(result_id)
+        self.store_dir = store_dir
+        self.data_dir = data_dir
+        self.options = analysis_options(**options)
+        self._min_prominence = min_prominence
+        self.min_mode = min_mode
+        self._profile = None
+        self._peaks = None
+        self._spectrum = None
+
+    @property
+    def profile(self):
+        """Mean intensity per angular bin; empty bins hold the profile mean"""
+        if self._profile is None:
+            self._profile = fill_empty_bins(self._load())
+        return self._profile
+
+    @property
+    def angles(self):
+        """Center angle of every bin in degrees"""
+        n_bins = len(self.profile)
+        return (np.arange(n_bins) + 0.5) * (360.0 / n_bins)
+
+    @property
+    def value_range(self):
+        """(min, max) of the profile"""
+        return float(self.profile.min()), float(self.profile.max())
+
+    @property
+    def min_prominence(self):
+        if self._min_prominence is None:
+            return float(self.profile.std())
+        return self._min_prominence
+
+    @property
+    def peaks(self):
+        """Peaks of the periodic profile (a finger at 0/360 degrees counts once)"""
+        if self._peaks is None:
+            self._peaks = find_periodic_peaks(self.profile, min_prominence=self.min_prominence)
+        return self._peaks
+
+    @property
+    def spectrum(self):
+        """Azimuthal mode spectrum of the profile"""
+        if self._spectrum is None:
+            self._spectrum = mode_spectrum(self.profile, min_mode=self.min_mode)
+        return self._spectrum
+
+    @property
+    def dominant_mode(self):
+        """Strongest azimuthal mode (spectrum.count_fingers of the profile)"""
+        return int(self.spectrum.dominant_mode)
+
+    @property
+    def n_fingers(self):
+        """Number of fingers: the marked peaks of the profile"""
+        return len(self.peaks)
+
+    def _load(self):
+        store = ResultsStore(self.store_dir)
+        if self.info["index"] is not None:
+            key = frame_key(self.info, self.options)
+            if key not in store:
+                self._analyze(store, [key])
+            return np.array(store.load(key), dtype=np.float64)
+
+        # A run: analyze the frames of the run the store does not have yet
+        keys = [frame_key(info, self.options) for _, info in self._frames()]
+        missing = [key for key in keys if key not in store]
+        if missing:
+            self._analyze(store, missing)
+        keys = [key for key in keys if key in store]
+        if not keys:
+            raise LookupError(f"No frames of run {self.result_id} in {self.store_dir} "
+                              f"or {self.data_dir}")
+        profiles = np.stack([store.load(key) for key in keys]).astype(np.float64)
+        return np.nanmean(profiles, axis=0)
+
+    def _frames(self):
+        """(path, info) of the frames in the data directory this result covers"""
+        return [(path, info) for path, info in discover_frames(self.data_dir)
+                if info["run"] == self.info["run"]
+                and np.isclose(info["temp"], self.info["temp"])
+                and self.info["index"] in (None, info["index"])]
+
+    def _analyze(self, store, keys):
+        """Analyze the frames with the given keys and append them to the store"""
+        paths = [path for path, info in self._frames() if frame_key(info, self.options) in keys]
+        if not paths:
+            raise LookupError(f"{self.result_id} is neither in {self.store_dir} nor in {self.data_dir}")
+        for path, error in analyze_frames(paths, self.store_dir, **self.options):
+            if error is not None:
+                raise RuntimeError(f"Analysis of {path} failed: {error}")
+        store.refresh()
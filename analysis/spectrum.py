@@ -0,0 +1,98 @@
+"""
+Azimuthal mode spectrum and finger counting for angular profiles
+
+An angular profile is periodic over 360 degrees, so the number of fingers is
+the dominant azimuthal mode of its Fourier series. One real FFT along the
+last axis of a (frames x bins) array gives the spectrum of every frame at
+once.
+"""
+
+import numpy as np
+
+from .instrument import traced
+
+
+class ModeSpectrum:
+    """
+    Fourier modes of one or many angular profiles
+
+    A profile is I(theta) ~ mean + sum_m amplitude[m] * cos(m * theta + phase[m]).
+
+    Attributes:
+        modes: Mode numbers 0 .. n_bins // 2
+        amplitude: (..., n_modes) amplitude per mode
+        phase: (..., n_modes) phase per mode in radians
+        dominant_mode: (...) strongest mode within the searched range
+        dominant_amplitude: (...) amplitude of the dominant mode
+        dominant_phase: (...) phase of the dominant mode in radians
+    """
+
+    def __init__(self, modes, amplitude, phase, dominant_mode):
+        self.modes = modes
+        self.amplitude = amplitude
+        self.phase = phase
+        self.dominant_mode = dominant_mode
+        index = dominant_mode[..., None]
+        self.dominant_amplitude = np.take_along_axis(amplitude, index, axis=-1)[..., 0]
+        self.dominant_phase = np.take_along_axis(phase, index, axis=-1)[..., 0]
+
+
+def fill_empty_bins(profiles):
+    """
+    Replace NaN bins (empty angular bins) by the mean of their profile
+
+    Returns:
+        The profiles as float64, copied only if they contain NaNs
+    """
+    profiles = np.asarray(profiles, dtype=np.float64)
+    missing = np.isnan(profiles)
+    if not missing.any():
+        return profiles
+    row_mean = np.nanmean(np.where(missing.all(axis=-1, keepdims=True), 0, profiles),
+                          axis=-1, keepdims=True)
+    return np.where(missing, row_mean, profiles)
+
+
+@traced("mode_spectrum")
+def mode_spectrum(profiles, min_mode=2, max_mode=None):
+    """
+    Azimuthal mode spectrum of a batch of angular profiles
+
+    Args:
+        profiles: (n_bins,) or (frames, n_bins) array of equally spaced bins
+            over 360 degrees; NaN bins are filled with the profile mean
+        min_mode: Lowest mode considered for the dominant mode. Mode 0 is the
+            mean and mode 1 mostly reflects an off-center or tilted image
+        max_mode: Highest mode considered, defaults to the Nyquist mode
+
+    Returns:
+        ModeSpectrum
+    """
+    profiles = fill_empty_bins(profiles)
+    n_bins = profiles.shape[-1]
+    nyquist = n_bins // 2
+    if max_mode is None:
+        max_mode = nyquist
+    if not 0 <= min_mode <= max_mode <= nyquist:
+        raise ValueError(f"Need 0 <= min_mode <= max_mode <= {nyquist}")
+
+    coefficients = np.fft.rfft(profiles, axis=-1)
+    amplitude = np.abs(coefficients) * (2.0 / n_bins)
+    amplitude[..., 0] /= 2
+    if n_bins % 2 == 0:
+        amplitude[..., nyquist] /= 2
+    phase = np.angle(coefficients)
+
+    dominant_mode = amplitude[..., min_mode:max_mode + 1].argmax(axis=-1) + min_mode
+    return ModeSpectrum(np.arange(nyquist + 1), amplitude, phase, dominant_mode)
+
+
+def count_fingers(profiles, min_mode=2, max_mode=None):
+    """
+    Number of fingers (dominant azimuthal mode) of one or many profiles
+
+    Returns:
+        int for a single profile, integer array for a batch
+    """
+    dominant_mode = mode_spectrum(profiles, min_mode, max_mode).dominant_mode
+    return int(dominant_mode) if dominant_mode.ndim == 0 else dominant_mode
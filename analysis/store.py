@@ -0,0 +1,331 @@
+"""
+Memory-mapped, chunked store for angular profiles
+
+Profiles are appended to preallocated chunks of `.npy` files:
+
+    chunks/<writer>-<seq>.npy        (capacity, n_bins) float32 profiles
+    chunks/<writer>-<seq>.fields.npy (capacity,) run, temp, frame, radius, n_bins
+    chunks/<writer>-<seq>.meta.jsonl One JSON line per row: key and extras
+    chunks/<writer>-<seq>.json       Number of committed rows
+
+Every writer (one per process) only ever appends to its own chunks, so
+worker processes write in parallel without locks and existing chunks are
+never rewritten. A writer's first chunk holds just the rows of its first
+append and every following chunk doubles in capacity up to `chunk_rows`, so
+a writer that stores one profile leaves a one-row chunk while long runs
+still end up in large chunks. A row counts as stored once the chunk's `.json` says so,
+which is updated atomically after the row is written; rows of a crashed
+writer beyond that count are ignored, so interrupted runs resume cleanly.
+
+Readers memory-map the chunks. Selections by run, temperature, frame range,
+radius or bin count come back as views into the chunks whenever the matching
+rows are contiguous (a time range of a streamed video, for example).
+"""
+
+import glob
+import json
+import os
+import uuid
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from .instrument import traced
+
+FIELDS_DTYPE = np.dtype([
+    ("run", np.int32),
+    ("temp", np.float32),
+    ("frame", np.int64),
+    ("radius", np.float32),
+    ("n_bins", np.int32),
+])
+
+DEFAULT_CHUNK_ROWS = 4096
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class ChunkWriter:
+    """
+    Append-only writer owning its own chunk files
+
+    Args:
+        chunk_dir: Directory holding the chunks
+        chunk_rows: Maximum capacity of a chunk in rows; chunks start at
+            the size of the first append and double up to it
+    """
+
+    def __init__(self, chunk_dir, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.chunk_dir = chunk_dir
+        self.chunk_rows = int(chunk_rows)
+        self.writer_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._seq = 0
+        self._capacity = 0
+        self._chunk = None
+
+    def _open_chunk(self, n_bins, n_rows):
+        # Double the capacity of a full chunk; a new bin count starts over
+        if self._chunk is None or self._chunk["n_bins"] != n_bins:
+            self._capacity = 0
+        self.close()
+        base = os.path.join(self.chunk_dir, f"{self.writer_id}-{self._seq:05d}")
+        self._seq += 1
+        self._capacity = min(self.chunk_rows, max(n_rows, 2 * self._capacity))
+        self._chunk = {
+            "base": base,
+            "n_bins": n_bins,
+            "count": 0,
+            "capacity": self._capacity,
+            "profiles": open_memmap(base + ".npy", mode="w+", dtype=np.float32,
+                                    shape=(self._capacity, n_bins)),
+            "fields": open_memmap(base + ".fields.npy", mode="w+", dtype=FIELDS_DTYPE,
+                                  shape=(self._capacity,)),
+            "meta": open(base + ".meta.jsonl", "a"),
+        }
+        self._commit()
+
+    def _commit(self):
+        chunk = self._chunk
+        chunk["meta"].flush()
+        _write_json_atomic(chunk["base"] + ".json", {
+            "count": chunk["count"],
+            "n_bins": chunk["n_bins"],
+            "capacity": chunk["capacity"],
+        })
+
+    @traced("store_write")
+    def append_many(self, keys, profiles, fields=None, metadata=None):
+        """
+        Append several profiles with the same bin count
+
+        Args:
+            keys: Unique key of every row
+            profiles: (rows, n_bins) array
+            fields: Optional list of dicts with run, temp, frame and radius
+            metadata: Optional list of dicts with JSON-serializable extras
+
+        Returns:
+            List of (chunk base path, row) locations
+        """
+        profiles = np.atleast_2d(np.asarray(profiles))
+        n_rows, n_bins = profiles.shape
+        fields = fields or [{}] * n_rows
+        metadata = metadata or [{}] * n_rows
+        locations = []
+
+        start = 0
+        while start < n_rows:
+            chunk = self._chunk
+            if chunk is None or chunk["n_bins"] != n_bins or chunk["count"] == chunk["capacity"]:
+                self._open_chunk(n_bins, n_rows - start)
+                chunk = self._chunk
+            row = chunk["count"]
+            stop = min(n_rows, start + chunk["capacity"] - row)
+
+            chunk["profiles"][row:row + stop - start] = profiles[start:stop]
+            for i in range(start, stop):
+                values = fields[i]
+                chunk["fields"][row + i - start] = (
+                    values.get("run", -1),
+                    values.get("temp", np.nan),
+                    values.get("frame", -1),
+                    values.get("radius", np.nan),
+                    n_bins,
+                )
+                entry = {"key": keys[i], "row": row + i - start, **metadata[i]}
+                chunk["meta"].write(json.dumps(entry) + "\n")
+                locations.append((chunk["base"], row + i - start))
+
+            chunk["count"] = row + stop - start
+            self._commit()
+            start = stop
+        return locations
+
+    def append(self, key, profile, fields=None, **metadata):
+        """Append a single profile; see append_many"""
+        return self.append_many([key], [profile], [fields or {}], [metadata])[0]
+
+    def close(self):
+        """Flush and release the current chunk"""
+        if self._chunk is None:
+            return
+        chunk = self._chunk
+        chunk["profiles"].flush()
+        chunk["fields"].flush()
+        self._commit()
+        chunk["meta"].close()
+        self._chunk = None
+
+
+class ResultsStore:
+    """
+    Directory of chunked, memory-mapped angular profiles
+
+    Args:
+        directory: Store location, created if it does not exist
+        chunk_rows: Maximum capacity of new chunks in rows
+    """
+
+    def __init__(self, directory, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.directory = directory
+        self.chunk_dir = os.path.join(directory, "chunks")
+        self.chunk_rows = chunk_rows
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        self._writer = None
+        self._written = set()
+        self.refresh()
+
+    # ----- Reading -----
+
+    def refresh(self):
+        """Pick up rows committed by any writer since the store was opened"""
+        self._chunks = []
+        for info_path in sorted(glob.glob(os.path.join(self.chunk_dir, "*.json"))):
+            base = info_path[:-len(".json")]
+            try:
+                with open(info_path) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if info["count"]:
+                self._chunks.append({"base": base, **info})
+        self._arrays = {}
+        self._index = None
+
+    def _open(self, base):
+        arrays = self._arrays.get(base)
+        if arrays is None:
+            arrays = (np.load(base + ".npy", mmap_mode="r"),
+                      np.load(base + ".fields.npy", mmap_mode="r"))
+            self._arrays[base] = arrays
+        return arrays
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        self._index = {}
+        for chunk in self._chunks:
+            with open(chunk["base"] + ".meta.jsonl") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Truncated line of an interrupted writer
+                    if entry["row"] < chunk["count"]:
+                        self._index[entry["key"]] = (chunk["base"], entry)
+        return self._index
+
+    def __contains__(self, key):
+        return key in self._written or key in self._load_index()
+
+    def __len__(self):
+        return sum(chunk["count"] for chunk in self._chunks)
+
+    def keys(self):
+        """Keys of all stored profiles"""
+        return list(self._load_index())
+
+    def metadata(self, key):
+        """Key fields and extras recorded with a profile"""
+        base, entry = self._load_index()[key]
+        fields = self._open(base)[1][entry["row"]]
+        return {**{name: fields[name].item() for name in FIELDS_DTYPE.names}, **entry}
+
+    def load(self, key):
+        """Profile stored under `key` (a read-only view into its chunk)"""
+        base, entry = self._load_index()[key]
+        return self._open(base)[0][entry["row"]]
+
+    def select(self, run=None, temp=None, frames=None, radius=None, n_bins=None):
+        """
+        Profiles matching all given key fields, chunk by chunk
+
+        Args:
+            run, temp, radius, n_bins: Exact values to match
+            frames: (first, stop) frame range, stop exclusive
+
+        Returns:
+            List of (fields, profiles) pairs, one per chunk with matches.
+            They are views into the memory-mapped chunks (no copy) when the
+            matching rows of a chunk are contiguous.
+        """
+        selections = []
+        for chunk in self._chunks:
+            if n_bins is not None and chunk["n_bins"] != n_bins:
+                continue
+            profiles, fields = self._open(chunk["base"])
+            profiles = profiles[:chunk["count"]]
+            fields = fields[:chunk["count"]]
+
+            mask = np.ones(len(fields), dtype=bool)
+            if run is not None:
+                mask &= fields["run"] == run
+            if temp is not None:
+                mask &= np.isclose(fields["temp"], temp)
+            if radius is not None:
+                mask &= np.isclose(fields["radius"], radius)
+            if frames is not None:
+                mask &= (fields["frame"] >= frames[0]) & (fields["frame"] < frames[1])
+
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                continue
+            if rows[-1] - rows[0] + 1 == len(rows):
+                rows = slice(rows[0], rows[-1] + 1)
+            selections.append((fields[rows], profiles[rows]))
+        return selections
+
+    def stack(self, sort_by="frame", **filters):
+        """
+        Selected profiles as one array, ordered by a key field
+
+        Unlike `select` this copies whenever more than one chunk matches.
+
+        Returns:
+            (fields, profiles)
+        """
+        selections = self.select(**filters)
+        if not selections:
+            return np.empty(0, dtype=FIELDS_DTYPE), np.empty((0, 0), dtype=np.float32)
+        if len(selections) == 1:
+            fields, profiles = selections[0]
+        else:
+            fields = np.concatenate([s[0] for s in selections])
+            profiles = np.concatenate([s[1] for s in selections])
+        if sort_by is not None and not np.all(np.diff(fields[sort_by]) >= 0):
+            order = np.argsort(fields[sort_by], kind="stable")
+            fields, profiles = fields[order], profiles[order]
+        return fields, profiles
+
+    # ----- Writing -----
+
+    def writer(self):
+        """New append-only writer with its own chunks (one per process)"""
+        return ChunkWriter(self.chunk_dir, self.chunk_rows)
+
+    def append(self, key, profile, fields=None, **metadata):
+        """
+        Store one profile through this store's own writer
+
+        Args:
+            key: Unique key
+            profile: 1D array of bin means
+            fields: Dict with any of run, temp, frame and radius
+            **metadata: JSON-serializable extras
+        """
+        if self._writer is None:
+            self._writer = self.writer()
+        self._writer.append(key, profile, fields, **metadata)
+        # Rows become readable after refresh(); membership is tracked now
+        self._written.add(key)
+
+    def close(self):
+        """Close this store's writer, if it has one"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
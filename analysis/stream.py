@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Streaming analysis of experiment videos
+
+High-frame-rate recordings are too large to decode into memory. Here frames
+are decoded in chunks by one thread, analyzed by a second one and written by
+the caller, with bounded queues in between so that at most a few chunks are
+alive at any time and decoding, analysis and writing overlap.
+
+The container is detected on the first frame and then tracked on the first
+frame of every chunk (see tracking.CenterTracker); the strip is only moved
+when the container has moved by more than half a pixel. Every frame is a
+gather through the cached strip geometry plus one bincount for the whole
+chunk, and each chunk of profiles is appended to a ResultsStore as soon as it
+is ready. Selecting the run from the store gives the space-time
+(frame x angle) diagram.
+
+Usage:
+    python -m analysis.stream experiment.mp4 --out results/ --chunk 64
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .batch import FRAME_PATTERN, analysis_options, options_tag
+from .binning import batch_bin_means
+from .circle import cv2
+from .instrument import span
+from .polar_strip import get_strip_geometry
+from .store import ResultsStore
+from .tracking import CenterTracker
+
+_DONE = object()
+
+# Container movement (pixels) below which the strip geometry is kept
+RESAMPLE_TOLERANCE = 0.5
+
+
+def iter_video_chunks(path, chunk_size=64):
+    """
+    Decode a video in chunks of grayscale frames
+
+    Args:
+        path: Video file readable by OpenCV
+        chunk_size: Number of frames per chunk
+
+    Yields:
+        (first_frame_index, frames) with frames a (k, height, width) uint8 array
+    """
+    if cv2 is None:
+        raise ImportError("Video decoding requires opencv-python")
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise OSError(f"Cannot open video {path}")
+    try:
+        index = 0
+        while True:
+            chunk = []
+            with span("decode_chunk", first=index):
+                while len(chunk) < chunk_size:
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    chunk.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            if chunk:
+                yield index, np.stack(chunk)
+                index += len(chunk)
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        capture.release()
+
+
+def video_fps(path):
+    """Frame rate stored in a video file (0 if unknown)"""
+    if cv2 is None:
+        return 0.0
+    capture = cv2.VideoCapture(path)
+    try:
+        return float(capture.get(cv2.CAP_PROP_FPS) or 0.0)
+    finally:
+        capture.release()
+
+
+def _put(out_queue, item, stop):
+    """Put `item` into `out_queue` unless `stop` is set first; True if it was put"""
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _producer(source, out_queue, stop):
+    """Thread body: move items from `source` into `out_queue` until exhausted"""
+    try:
+        for item in source:
+            if not _put(out_queue, item, stop):
+                return
+    except BaseException as exc:
+        _put(out_queue, exc, stop)
+        return
+    finally:
+        # Release the source (e.g. the video capture) in the thread running it
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+    _put(out_queue, _DONE, stop)
+
+
+def _consume(in_queue, stop):
+    """Yield items of a queue filled by _producer, re-raising its errors"""
+    while not stop.is_set():
+        try:
+            item = in_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def stream_profile_chunks(chunks, n_bins=360, radius_fraction=0.8, strip_width=10,
+                          circle=None, queue_size=2):
+    """
+    Angular profiles of a stream of frame chunks, one array per chunk
+
+    Decoding (pulling from `chunks`) and analysis run in background threads
+    connected by queues of `queue_size` chunks, so memory stays bounded no
+    matter how long the stream is.
+
+    Args:
+        chunks: Iterable of (first_frame_index, frames) as from iter_video_chunks
+        n_bins, radius_fraction, strip_width: See pipeline.analyze_frame
+        circle: Optional known (center, radius); tracked from the first
+            frame otherwise
+        queue_size: Maximum number of chunks waiting between stages
+
+    Yields:
+        (first_frame_index, profiles, circle, confidence) for every chunk, in
+        order; confidence is the tracker's score for the chunk's first frame
+        (None for a fixed circle)
+    """
+    stop = threading.Event()
+    decoded = queue.Queue(maxsize=queue_size)
+    analyzed = queue.Queue(maxsize=queue_size)
+
+    def analyze_chunks():
+        tracker = CenterTracker() if circle is None else None
+        sampled = circle
+        confidence = None
+        for first, frames in _consume(decoded, stop):
+            with span("analyze_chunk", first=first, frames=len(frames)):
+                if tracker is not None:
+                    detection = tracker.update(frames[0])
+                    if detection is None:
+                        if sampled is None:
+                            raise RuntimeError("No container circle found in the first frame")
+                        confidence = 0.0
+                    else:
+                        confidence = detection.confidence
+                        if sampled is None or _moved(sampled, detection.circle) > RESAMPLE_TOLERANCE:
+                            sampled = detection.circle
+                center, container_radius = sampled
+
+                geometry = get_strip_geometry(
+                    frames.shape[1:], center, radius_fraction * container_radius, strip_width
+                )
+                pixels = frames.reshape(len(frames), -1)[:, geometry.flat_index]
+                profiles = batch_bin_means(pixels, geometry.angle_bins(n_bins))
+            yield first, profiles, sampled, confidence
+
+    threads = [
+        threading.Thread(target=_producer, args=(iter(chunks), decoded, stop), daemon=True),
+        threading.Thread(target=_producer, args=(analyze_chunks(), analyzed, stop), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        yield from _consume(analyzed, stop)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        # Drop chunks nobody will read
+        for q in (decoded, analyzed):
+            while not q.empty():
+                q.get_nowait()
+
+
+def _moved(circle, new_circle):
+    """Largest change of center or radius between two circles in pixels"""
+    (x, y), radius = circle
+    (new_x, new_y), new_radius = new_circle
+    return max(abs(new_x - x), abs(new_y - y), abs(new_radius - radius))
+
+
+def stream_profiles(chunks, **options):
+    """
+    Angular profiles of a stream of frame chunks, one frame at a time
+
+    Yields:
+        (frame_index, profile, circle, confidence) for every frame, in order
+    """
+    for first, profiles, circle, confidence in stream_profile_chunks(chunks, **options):
+        for offset, profile in enumerate(profiles):
+            yield first + offset, profile, circle, confidence
+
+
+def parse_video_name(path):
+    """
+    Run and temperature of a video named like the frames, e.g. `d4_T20.mp4`
+
+    Returns:
+        Dict with 'run' and 'temp', or an empty dict if the name does not match
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = FRAME_PATTERN.match(stem + "_0") or FRAME_PATTERN.match(stem)
+    if match is None:
+        return {}
+    return {"run": int(match["run"]), "temp": float(match["temp"])}
+
+
+def stream_video(path, out_dir, chunk_size=64, queue_size=2, run=None, temp=None,
+                 **options):
+    """
+    Analyze a video and append its profiles to a ResultsStore chunk by chunk
+
+    Frames already in the store with the same options are not written again,
+    so an interrupted run can be restarted (the video is still decoded from
+    the start). Keys carry the options like batch keys do
+    ('d4_T20_f000012@b720_f0.8_w10'), so a run with other options writes
+    new rows instead of keeping the old profiles.
+
+    Args:
+        path: Video file
+        out_dir: ResultsStore directory
+        chunk_size: Frames decoded per chunk
+        queue_size: Maximum number of chunks waiting between stages
+        run, temp: Key fields of the rows, parsed from a `d{run}_T{temp}`
+            video name when not given
+        **options: Passed to stream_profile_chunks
+
+    Returns:
+        Number of frames written
+    """
+    options = analysis_options(**options)
+    tag = options_tag(options)
+    store = ResultsStore(out_dir)
+    writer = store.writer()
+    name = os.path.splitext(os.path.basename(path))[0]
+    fps = video_fps(path)
+    key_fields = parse_video_name(path)
+    if run is not None:
+        key_fields["run"] = run
+    if temp is not None:
+        key_fields["temp"] = temp
+
+    n_written = n_frames = 0
+    start = time.perf_counter()
+    chunks = iter_video_chunks(path, chunk_size)
+    try:
+        for first, profiles, (center, container_radius), confidence in stream_profile_chunks(
+                chunks, queue_size=queue_size, **options):
+            frames = first + np.arange(len(profiles))
+            keys = [f"{name}_f{frame:06d}{tag}" for frame in frames]
+            new = [i for i, key in enumerate(keys) if key not in store]
+            if new:
+                radius = options["radius_fraction"] * container_radius
+                writer.append_many(
+                    [keys[i] for i in new],
+                    profiles[new],
+                    fields=[{**key_fields, "frame": int(frames[i]), "radius": radius}
+                            for i in new],
+                    metadata=[{"video": path,
+                               "time_s": frames[i] / fps if fps else None,
+                               "center": list(center),
+                               "container_radius": container_radius,
+                               "confidence": confidence,
+                               "options": options}
+                              for i in new],
+                )
+                n_written += len(new)
+            n_frames += len(profiles)
+            rate = n_frames / (time.perf_counter() - start)
+            print(f"  {n_frames} frames, {rate:.0f} frames/s", end="\r")
+    finally:
+        writer.close()
+    print()
+    return n_written
+
+
+def space_time_diagram(store, run, temp=None, frames=None):
+    """
+    (frame x angle) diagram of one run from a store
+
+    Args:
+        store: ResultsStore filled by stream_video or the batch analyzer
+        run: Run number
+        temp: Optional temperature, if the run has several
+        frames: Optional (first, stop) frame range
+
+    Returns:
+        (frame_indices, diagram); the diagram is a view into the store when
+        the frames sit in one chunk in order
+    """
+    fields, diagram = store.stack(sort_by="frame", run=run, temp=temp, frames=frames)
+    return fields["frame"], diagram
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream angular profiles out of a video")
+    parser.add_argument("video", help="Video file")
+    parser.add_argument("--out", default="results", help="Results store directory")
+    parser.add_argument("--chunk", type=int, default=64, help="Frames decoded per chunk")
+    parser.add_argument("--queue", type=int, default=2, help="Chunks buffered between stages")
+    parser.add_argument("--bins", type=int, default=360, help="Number of angular bins")
+    parser.add_argument("--radius-fraction", type=float, default=0.8,
+                        help="Strip radius as a fraction of the container radius")
+    parser.add_argument("--strip-width", type=float, default=10, help="Strip width in pixels")
+    parser.add_argument("--circle", type=float, nargs=3, metavar=("X", "Y", "R"),
+                        help="Use a fixed container circle instead of detecting it")
+    parser.add_argument("--run", type=int, default=None,
+                        help="Run number (parsed from d{run}_T{temp} names by default)")
+    parser.add_argument("--temp", type=float, default=None, help="Temperature of the run")
+    args = parser.parse_args(argv)
+
+    circle = None
+    if args.circle:
+        x, y, r = args.circle
+        circle = ((x, y), r)
+
+    n_written = stream_video(
+        args.video, args.out,
+        chunk_size=args.chunk,
+        queue_size=args.queue,
+        n_bins=args.bins,
+        radius_fraction=args.radius_fraction,
+        strip_width=args.strip_width,
+        circle=circle,
+        run=args.run,
+        temp=args.temp,
+    )
+    print(f"✅ {n_written} frame profile(s) written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Temporal tracking of the container circle across the frames of a run
+
+Within a time series the container moves by a few pixels at most, so a full
+detection (Hough plus refinement) on every frame is wasted work. The tracker
+seeds each frame with the previous circle and only fits the rim in a narrow
+radial window around it. It falls back to detect_circle when the tracked fit
+fails, its residual jumps well above the recent level or the rim edge gets
+much weaker (the rim has left the window), which is what a bumped camera or
+a lost rim looks like.
+
+Every detection carries a confidence in [0, 1]: the fraction of rim rays that
+agree with the circle, scaled down when the residual or the edge strength is
+worse than the run's recent baseline.
+"""
+
+import math
+
+from .detection import Detection, detect_circle, fit_rim
+from .instrument import traced
+
+
+class CenterTracker:
+    """
+    Warm-started container detection for consecutive frames
+
+    Args:
+        circle: Optional (center, radius) to start from, e.g. the last good
+            circle saved for the run directory
+        window: Radial half-width in pixels searched around the previous rim
+        residual_jump: Escalate to a full detection when the fit residual
+            exceeds this multiple of the baseline residual
+        min_residual: Floor of the baseline in pixels, so a near-perfect fit
+            does not make every later frame look like a jump
+        strength_drop: Escalate when the rim edge strength falls below this
+            fraction of the baseline strength
+        min_inlier_fraction: Minimum fraction of agreeing rim rays
+        smoothing: Weight of the newest residual in the running baseline
+
+    Attributes:
+        circle: Last accepted (center, radius), or None
+        n_tracked: Frames handled by the warm-started fit
+        n_escalated: Frames that needed a full detection
+    """
+
+    def __init__(self, circle=None, window=10, residual_jump=3.0, min_residual=0.5,
+                 strength_drop=0.5, min_inlier_fraction=0.5, smoothing=0.2):
+        self.window = window
+        self.residual_jump = residual_jump
+        self.min_residual = min_residual
+        self.strength_drop = strength_drop
+        self.min_inlier_fraction = min_inlier_fraction
+        self.smoothing = smoothing
+        self.n_tracked = 0
+        self.n_escalated = 0
+        self.reset(circle)
+
+    def reset(self, circle=None):
+        """Forget the tracked state, optionally starting again from `circle`"""
+        self.circle = circle
+        self.baseline = None
+        self.baseline_strength = None
+
+    def _confidence(self, detection):
+        confidence = detection.inlier_fraction
+        if self.baseline is not None and detection.residual > self.baseline:
+            confidence *= self.baseline / detection.residual
+        if self.baseline_strength and detection.edge_strength < self.baseline_strength:
+            confidence *= detection.edge_strength / self.baseline_strength
+        return confidence
+
+    def _accept(self, detection):
+        detection.confidence = self._confidence(detection)
+        residual = max(detection.residual, self.min_residual)
+        if self.baseline is None or detection.method != "tracked":
+            self.baseline = residual
+            self.baseline_strength = detection.edge_strength
+        else:
+            self.baseline += self.smoothing * (residual - self.baseline)
+            self.baseline_strength += self.smoothing * (
+                detection.edge_strength - self.baseline_strength)
+        self.circle = detection.circle
+        return detection
+
+    def _track(self, image_gray):
+        (x, y), radius = self.circle
+        fit = fit_rim(image_gray, (x, y), radius - self.window, radius + self.window)
+        if fit is None:
+            return None
+        center, new_radius, residual, inlier_fraction, strength = fit
+        shift = math.hypot(center[0] - x, center[1] - y)
+        if (inlier_fraction < self.min_inlier_fraction
+                or shift > self.window
+                or abs(new_radius - radius) > self.window):
+            return None
+        if self.baseline is not None and residual > self.residual_jump * self.baseline:
+            return None
+        if self.baseline_strength and strength < self.strength_drop * self.baseline_strength:
+            return None
+        return Detection(center, new_radius, residual, inlier_fraction, "tracked",
+                         edge_strength=strength)
+
+    @traced("track_circle")
+    def update(self, image_gray, coarse_image=None):
+        """
+        Container circle of the next frame
+
+        Args:
+            image_gray: 2D uint8 grayscale frame
+            coarse_image: Optional pyramid level of the frame for the full
+                detection (see detect_circle)
+
+        Returns:
+            Detection with `confidence` set, or None if the container was not
+            found (the tracker then keeps its previous circle)
+        """
+        if self.circle is not None:
+            detection = self._track(image_gray)
+            if detection is not None:
+                self.n_tracked += 1
+                return self._accept(detection)
+
+        self.n_escalated += 1
+        detection = detect_circle(image_gray, coarse_image=coarse_image,
+                                  min_inlier_fraction=self.min_inlier_fraction)
+        if detection is None:
+            return None
+        return self._accept(detection)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Stage-by-stage benchmark of the analysis pipeline on synthetic frames
+
+For every image size a synthetic frame (benchmarks/synthetic.py) is written
+as a JPEG and pushed through the pipeline stages one at a time:
+
+    decode          full-resolution JPEG decode
+    decode_coarse   1/8-scale decode used by coarse detection
+    detect          container detection (coarse-to-fine)
+    track           warm-started detection from the previous circle
+    strip           strip geometry build + gather (the polar transform)
+    unwrap          full (radius x angle) resampling of the annulus
+    binning         angular bin statistics, per bin count
+    smoothing       circular Gaussian smoothing of the profile
+    fingers         FFT finger count + periodic peak detection
+
+Every stage is also checked against the known ground truth (center, radius,
+profile shape, finger count). Results can be written to JSON and compared
+with an earlier run to catch regressions between commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py --out bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+    python benchmarks/run_benchmarks.py --quick
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from analysis.binning import bin_statistics  # noqa: E402
+from analysis.detection import detect_circle  # noqa: E402
+from analysis.images import decode  # noqa: E402
+from analysis.peaks import find_periodic_peaks  # noqa: E402
+from analysis.polar_strip import clear_cache, get_strip_geometry  # noqa: E402
+from analysis.polar_unwrap import clear_cache as clear_unwrap_cache  # noqa: E402
+from analysis.polar_unwrap import polar_unwrap  # noqa: E402
+from analysis.spectrum import count_fingers  # noqa: E402
+from analysis.tracking import CenterTracker  # noqa: E402
+
+from synthetic import make_frame  # noqa: E402
+
+# (height, width): a video frame, a mid-size frame and the camera frames
+IMAGE_SIZES = ((720, 1280), (1500, 1800), (2950, 3552))
+BIN_COUNTS = (360, 3600)
+N_FINGERS = 8
+RADIUS_FRACTION = 0.8
+STRIP_WIDTH = 10
+NOISE = 8.0
+
+# Ground-truth tolerances. The profile may deviate from the model by 10% of
+# the finger amplitude plus 1.5x the noise left after averaging a bin
+CENTER_TOLERANCE = 1.5       # pixels
+RADIUS_TOLERANCE = 1.5       # pixels
+PROFILE_TOLERANCE = 0.1
+
+# Timing differences below this are noise, whatever the ratio
+MIN_DIFFERENCE_MS = 0.1
+
+
+def best_of(func, repeat=5, number=1):
+    """Fastest of `repeat` timings in milliseconds"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e3
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_size(shape, jpeg_dir, repeat):
+    """
+    Time and check every stage for one image size
+
+    Returns:
+        (timings, checks): dicts keyed by stage name
+    """
+    height, width = shape
+    frame = make_frame(shape, n_fingers=N_FINGERS, noise=NOISE, rng=height)
+    path = frame.save_jpeg(os.path.join(jpeg_dir, f"d0_T0_{height}.jpg"))
+    image = decode(path)
+    timings, checks = {}, {}
+
+    timings["decode"] = best_of(lambda: decode(path), repeat)
+    timings["decode_coarse"] = best_of(lambda: decode(path, level=3), repeat)
+
+    coarse = decode(path, level=3)
+    timings["detect"] = best_of(lambda: detect_circle(image, coarse_image=coarse), repeat)
+    detection = detect_circle(image, coarse_image=coarse)
+    if detection is None:
+        checks["detect"] = {"ok": False, "error": "no circle found"}
+        return timings, checks
+    center_error = float(np.hypot(detection.center[0] - frame.center[0],
+                                  detection.center[1] - frame.center[1]))
+    radius_error = abs(detection.radius - frame.radius)
+    checks["detect"] = {
+        "ok": bool(center_error <= CENTER_TOLERANCE and radius_error <= RADIUS_TOLERANCE),
+        "center_error_px": round(center_error, 3),
+        "radius_error_px": round(radius_error, 3),
+    }
+
+    tracker = CenterTracker(detection.circle)
+    timings["track"] = best_of(lambda: tracker.update(image), repeat)
+
+    # Geometry of the true circle, so later stages do not inherit detection error
+    radius = RADIUS_FRACTION * frame.radius
+
+    def strip_cold():
+        clear_cache()
+        return get_strip_geometry(image.shape, frame.center, radius, STRIP_WIDTH).gather(image)
+
+    timings["strip"] = best_of(strip_cold, repeat)
+    geometry = get_strip_geometry(image.shape, frame.center, radius, STRIP_WIDTH)
+    timings["strip_cached"] = best_of(lambda: geometry.gather(image), repeat, number=5)
+    strip = geometry.gather(image)
+
+    def unwrap_cold():
+        clear_unwrap_cache()
+        return polar_unwrap(image, frame.center, r_min=0.5 * frame.radius,
+                            r_max=frame.radius, n_theta=360)
+
+    timings["unwrap"] = best_of(unwrap_cold, repeat)
+
+    amplitude = frame.params.get("amplitude", 25)
+    for n_bins in BIN_COUNTS:
+        bins = geometry.angle_bins(n_bins)
+        timings[f"binning_{n_bins}"] = best_of(lambda: bin_statistics(strip, bins), repeat,
+                                               number=5)
+        profile = bin_statistics(strip, bins).mean
+        error = profile - frame.expected_profile(n_bins)
+        rms = float(np.sqrt(np.nanmean(error**2)))
+        noise_floor = NOISE / np.sqrt(len(strip) / n_bins)
+        checks[f"profile_{n_bins}"] = {
+            "ok": bool(rms <= PROFILE_TOLERANCE * amplitude + 1.5 * noise_floor),
+            "rms_error": round(rms, 3),
+        }
+
+    profile = bin_statistics(strip, geometry.angle_bins(BIN_COUNTS[0])).mean
+    timings["smoothing"] = best_of(
+        lambda: gaussian_filter1d(profile, sigma=2, mode="wrap"), repeat, number=20)
+    smooth = gaussian_filter1d(profile, sigma=2, mode="wrap")
+
+    def fingers():
+        return count_fingers(smooth), find_periodic_peaks(smooth, min_prominence=amplitude)
+
+    timings["fingers"] = best_of(fingers, repeat, number=20)
+    n_modes, peaks = fingers()
+    checks["fingers"] = {
+        "ok": bool(n_modes == N_FINGERS and peaks.counts[0] == N_FINGERS),
+        "mode": n_modes,
+        "peaks": int(peaks.counts[0]),
+    }
+    return timings, checks
+
+
+def run(sizes, repeat):
+    """All benchmarks as a JSON-serializable dict"""
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "timings_ms": {},
+        "checks": {},
+    }
+    with tempfile.TemporaryDirectory() as jpeg_dir:
+        for shape in sizes:
+            label = f"{shape[1]}x{shape[0]}"
+            print(f"\n{label}")
+            timings, checks = bench_size(shape, jpeg_dir, repeat)
+            for stage, ms in timings.items():
+                print(f"  {stage:<16} {ms:>10.2f} ms")
+            for name, check in checks.items():
+                details = ", ".join(f"{k}={v}" for k, v in check.items() if k != "ok")
+                print(f"  {'✅' if check['ok'] else '❌'} {name}: {details}")
+            results["timings_ms"][label] = {k: round(v, 4) for k, v in timings.items()}
+            results["checks"][label] = checks
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the timing ratio of every stage against a baseline run
+
+    Returns:
+        List of 'size/stage' names slower than `tolerance` times the baseline
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for label, timings in results["timings_ms"].items():
+        old_timings = baseline["timings_ms"].get(label, {})
+        for stage, ms in timings.items():
+            old = old_timings.get(stage)
+            if not old:
+                continue
+            ratio = ms / old
+            flag = ""
+            if ratio > tolerance and ms - old > MIN_DIFFERENCE_MS:
+                flag = "  ❌ slower"
+                regressions.append(f"{label}/{stage}")
+            elif ratio < 1 / tolerance:
+                flag = "  faster"
+            print(f"  {label:>10} {stage:<16} {old:>10.2f} -> {ms:>10.2f} ms "
+                  f"({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline")
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="Slowdown factor reported as a regression")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    parser.add_argument("--quick", action="store_true", help="Smallest image size only")
+    args = parser.parse_args(argv)
+
+    sizes = IMAGE_SIZES[:1] if args.quick else IMAGE_SIZES
+    results = run(sizes, args.repeat)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.out}")
+
+    failed = [f"{label}/{name}" for label, checks in results["checks"].items()
+              for name, check in checks.items() if not check["ok"]]
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    if failed:
+        print(f"\n❌ Ground-truth checks failed: {', '.join(failed)}")
+    if regressions:
+        print(f"\n❌ Slower than baseline: {', '.join(regressions)}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
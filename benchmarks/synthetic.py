@@ -0,0 +1,112 @@
+"""
+Synthetic experiment frames with a known container and finger pattern
+
+The angular intensity follows the model ResultsScene plots:
+
+    base_intensity + amplitude * sin(n_fingers * angle)
+                   + 0.3 * amplitude * sin(2 * n_fingers * angle - 0.5)
+
+painted inside a circular container on a dark background, plus Gaussian
+noise. Because center, radius and finger count are known exactly, the
+benchmarks can check every pipeline stage against ground truth.
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def finger_intensity(theta_deg, n_fingers=8, base_intensity=130, amplitude=25,
+                     harmonic=0.3, phase_deg=0.0):
+    """
+    Noise-free angular intensity of the ResultsScene model
+
+    Args:
+        theta_deg: Angles in degrees
+        n_fingers: Number of fingers around the container
+        base_intensity: Mean intensity
+        amplitude: Amplitude of the main mode
+        harmonic: Relative amplitude of the second harmonic
+        phase_deg: Rotation of the whole pattern in degrees
+
+    Returns:
+        Intensity array of the same shape as `theta_deg`
+    """
+    angle = np.radians(np.asarray(theta_deg) - phase_deg)
+    return (base_intensity
+            + amplitude * np.sin(n_fingers * angle)
+            + harmonic * amplitude * np.sin(2 * n_fingers * angle - 0.5))
+
+
+class SyntheticFrame:
+    """
+    Generated frame and its ground truth
+
+    Attributes:
+        image: 2D uint8 grayscale image
+        center: (x, y) container center in pixels
+        radius: Container radius in pixels
+        n_fingers: Number of fingers
+        params: Keyword arguments of finger_intensity used for the pattern
+    """
+
+    def __init__(self, image, center, radius, n_fingers, params):
+        self.image = image
+        self.center = center
+        self.radius = radius
+        self.n_fingers = n_fingers
+        self.params = params
+
+    def expected_profile(self, n_bins):
+        """Model intensity at the centers of `n_bins` angular bins"""
+        theta = (np.arange(n_bins) + 0.5) * (360.0 / n_bins)
+        return finger_intensity(theta, n_fingers=self.n_fingers, **self.params)
+
+    def save_jpeg(self, path, quality=92):
+        """Write the frame as a JPEG, like the camera does"""
+        Image.fromarray(self.image).save(path, quality=quality)
+        return path
+
+
+def make_frame(shape=(1200, 1500), n_fingers=8, center=None, radius=None,
+               noise=8.0, background=40, rng=None, **params):
+    """
+    Synthetic frame of a container with `n_fingers` fingers
+
+    Args:
+        shape: (height, width) of the image
+        n_fingers: Number of fingers
+        center: (x, y) container center, defaults to a point near the middle
+        radius: Container radius, defaults to 39% of the short side (the
+            proportion of the real frames)
+        noise: Standard deviation of the additive Gaussian noise
+        background: Intensity outside the container
+        rng: numpy Generator or seed
+        **params: base_intensity, amplitude, harmonic, phase_deg for
+            finger_intensity
+
+    Returns:
+        SyntheticFrame
+    """
+    rng = np.random.default_rng(rng)
+    height, width = shape
+    if center is None:
+        center = (width / 2 + rng.uniform(-0.02, 0.02) * width,
+                  height / 2 + rng.uniform(-0.02, 0.02) * height)
+    if radius is None:
+        radius = 0.39 * min(shape)
+
+    y, x = np.ogrid[:height, :width]
+    dx = (x - center[0]).astype(np.float32)
+    dy = (y - center[1]).astype(np.float32)
+    r = np.sqrt(dx * dx + dy * dy)
+    theta = np.degrees(np.arctan2(dy, dx)) % 360
+
+    inside = finger_intensity(theta, n_fingers=n_fingers, **params).astype(np.float32)
+    # Anti-aliased rim about two pixels wide
+    weight = np.clip((radius - r) / 2 + 0.5, 0, 1)
+    image = background + weight * (inside - background)
+    image += rng.normal(0, noise, shape).astype(np.float32)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+
+    return SyntheticFrame(image, (float(center[0]), float(center[1])), float(radius),
+                          n_fingers, params)
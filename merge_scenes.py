@@ -1,28 +1,291 @@
 #!/usr/bin/env python3
 """
 Merge all scene videos into a complete presentation
-Alternative to FFmpeg method - uses moviepy
+
+Every scene video is probed for its codec, resolution, frame rate, pixel
+format and audio. When all scenes match (the normal case, as manim renders
+them all with the same settings), they are joined with the FFmpeg concat
+demuxer using stream copy: no re-encoding, no quality loss, and it takes
+seconds. Scenes that do not match the majority are re-encoded on their own
+to the common format first; the rest are still copied. The concat demuxer
+keeps the parameter sets (SPS/PPS) of the first file, so a re-encoded H.264
+segment reuses the x264 settings written into the reference scene (read
+from its SEI: reference frames, B-frames, CABAC, 8x8 transform, ...) and
+its level, which makes its parameter sets match the copied scenes.
+
+Requires the `ffmpeg` executable (and `ffprobe` if available). The ffmpeg
+bundled with imageio-ffmpeg is used when none is on the PATH.
 """
 
-from moviepy.editor import VideoFileClip, concatenate_videoclips
+import argparse
+import json
 import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from fractions import Fraction
+
+DEFAULT_SCENES = [
+    "media/videos/scene1/{quality}/IntroSceneWithTitles.mp4",
+    "media/videos/scene2/{quality}/CircleDetectionScene.mp4",
+    "media/videos/scene3/{quality}/PolarTransformScene.mp4",
+    "media/videos/scene4/{quality}/ResultsScene.mp4",
+]
+
+# x264 options that shape the SPS/PPS (or the quality) of an H.264 stream,
+# copied from the reference scene into re-encoded segments
+X264_STREAM_OPTIONS = ("cabac", "ref", "bframes", "b_pyramid", "weightb", "weightp",
+                       "8x8dct", "constrained_intra", "interlaced", "keyint", "keyint_min",
+                       "crf")
+_X264_SEI = re.compile(rb"x264 - core \d+[^\x00]*? - options: ([^\x00]*)")
+
+# FFmpeg encoder for a probed codec name, used for re-encoded segments
+ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp9": "libvpx-vp9",
+    "av1": "libaom-av1",
+    "aac": "aac",
+    "opus": "libopus",
+    "mp3": "libmp3lame",
+}
+
+
+def find_ffmpeg():
+    """
+    Paths of the ffmpeg and ffprobe executables
+
+    Returns:
+        (ffmpeg, ffprobe); ffprobe is None when only ffmpeg is available
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        try:
+            import imageio_ffmpeg
+            ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+        except (ImportError, RuntimeError):
+            raise RuntimeError("ffmpeg not found; install it (see README) and retry")
+    ffprobe = shutil.which("ffprobe")
+    return ffmpeg, ffprobe
+
+
+class VideoInfo:
+    """
+    Stream properties of a video file
+
+    Attributes:
+        path: Video file
+        codec, profile, width, height, pix_fmt: Video stream properties
+        fps: Frame rate as a Fraction
+        audio: (codec, sample_rate, channels) of the audio stream, or None
+        duration: Duration in seconds
+        level: Codec level as reported by ffprobe (e.g. 40), or None
+    """
+
+    def __init__(self, path, codec, profile, width, height, pix_fmt, fps, audio, duration,
+                 level=None):
+        self.path = path
+        self.codec = codec
+        self.profile = profile
+        self.width = width
+        self.height = height
+        self.pix_fmt = pix_fmt
+        self.fps = fps
+        self.audio = audio
+        self.duration = duration
+        self.level = level
+
+    @property
+    def signature(self):
+        """Everything that must be equal for stream-copy concatenation"""
+        return (self.codec, self.profile, self.width, self.height, self.pix_fmt,
+                self.fps, self.audio)
+
+    def describe(self):
+        audio = "no audio" if self.audio is None else f"{self.audio[0]} {self.audio[1]} Hz"
+        return (f"{self.codec} {self.width}x{self.height} {self.pix_fmt} "
+                f"{float(self.fps):g} fps, {audio}")
+
+
+def _ffprobe(ffprobe, path):
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-of", "json",
+         "-show_entries",
+         "stream=codec_type,codec_name,profile,level,width,height,pix_fmt,avg_frame_rate,"
+         "r_frame_rate,sample_rate,channels:format=duration",
+         path],
+        capture_output=True, text=True, check=True,
+    )
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    video = next(s for s in streams if s["codec_type"] == "video")
+    audio = next((s for s in streams if s["codec_type"] == "audio"), None)
+    rate = video.get("avg_frame_rate") or "0/1"
+    if rate in ("0/0", "0/1"):
+        rate = video["r_frame_rate"]
+    return VideoInfo(
+        path,
+        video["codec_name"],
+        video.get("profile"),
+        int(video["width"]),
+        int(video["height"]),
+        video.get("pix_fmt"),
+        Fraction(rate),
+        None if audio is None else (audio["codec_name"], int(audio["sample_rate"]),
+                                    int(audio["channels"])),
+        float(data.get("format", {}).get("duration", 0.0)),
+        level=video.get("level") if video.get("level", -99) > 0 else None,
+    )
+
+
+_VIDEO_LINE = re.compile(
+    r"Video: (?P<codec>\w+)(?: \((?P<profile>[^)]*)\))?.*?, (?P<pix_fmt>\w+)(?:\([^)]*\))?, "
+    r"(?P<width>\d+)x(?P<height>\d+)"
+)
+_FPS = re.compile(r"(\d+(?:\.\d+)?) (?:fps|tbr)")
+_AUDIO_LINE = re.compile(r"Audio: (?P<codec>\w+).*?, (?P<rate>\d+) Hz, (?P<layout>[\w.]+)")
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_CHANNELS = {"mono": 1, "stereo": 2, "5.1": 6, "7.1": 8}
+
+
+def _ffmpeg_probe(ffmpeg, path):
+    """Fallback without ffprobe: parse the stream summary of `ffmpeg -i`"""
+    result = subprocess.run([ffmpeg, "-hide_banner", "-i", path],
+                            capture_output=True, text=True)
+    output = result.stderr
+    video = _VIDEO_LINE.search(output)
+    if video is None:
+        raise RuntimeError(f"No video stream found in {path}")
+    video_line = output[video.start():output.find("\n", video.start())]
+    fps = _FPS.search(video_line)
+    audio = _AUDIO_LINE.search(output)
+    duration = _DURATION.search(output)
+    seconds = 0.0
+    if duration:
+        hours, minutes, secs = duration.groups()
+        seconds = int(hours) * 3600 + int(minutes) * 60 + float(secs)
+    return VideoInfo(
+        path,
+        video["codec"],
+        video["profile"],
+        int(video["width"]),
+        int(video["height"]),
+        video["pix_fmt"],
+        Fraction(fps.group(1)).limit_denominator(1001) if fps else Fraction(0),
+        None if audio is None else (audio["codec"], int(audio["rate"]),
+                                    _CHANNELS.get(audio["layout"], 2)),
+        seconds,
+    )
+
+
+def probe(path, ffmpeg=None, ffprobe=None):
+    """VideoInfo of a video file, via ffprobe when available"""
+    if ffmpeg is None:
+        ffmpeg, ffprobe = find_ffmpeg()
+    if ffprobe is not None:
+        return _ffprobe(ffprobe, path)
+    return _ffmpeg_probe(ffmpeg, path)
+
+
+def x264_options(path, max_bytes=1 << 20):
+    """
+    x264 settings a video was encoded with, from the SEI x264 writes into it
+
+    Returns:
+        Dict of option name to value (empty for other encoders)
+    """
+    with open(path, "rb") as f:
+        match = _X264_SEI.search(f.read(max_bytes))
+    if match is None:
+        return {}
+    options = {}
+    for item in match.group(1).decode("ascii", "replace").split():
+        name, _, value = item.partition("=")
+        options[name] = value
+    return options
+
 
-def merge_presentation(quality='1080p60'):
+def reencode(ffmpeg, info, target, output, reference_options=None):
+    """
+    Re-encode one segment to the stream format of `target` (a VideoInfo)
+
+    Resolution is matched by scaling with letterboxing, the frame rate by
+    dropping/duplicating frames, and a missing audio track is filled with
+    silence so the segments can be copied together afterwards. H.264 is
+    encoded with the x264 options and level of the reference scene
+    (`reference_options`, from x264_options) so the parameter sets match.
+    """
+    command = [ffmpeg, "-y", "-v", "error", "-i", info.path]
+    if target.audio is not None and info.audio is None:
+        command += ["-f", "lavfi", "-i",
+                    f"anullsrc=r={target.audio[1]}:cl={'mono' if target.audio[2] == 1 else 'stereo'}",
+                    "-shortest"]
+    scale = (f"scale={target.width}:{target.height}:force_original_aspect_ratio=decrease,"
+             f"pad={target.width}:{target.height}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+    command += [
+        "-map", "0:v:0",
+        "-vf", f"{scale},fps={target.fps}",
+        "-c:v", ENCODERS.get(target.codec, target.codec),
+        "-pix_fmt", target.pix_fmt,
+        "-crf", "18", "-preset", "medium",
+    ]
+    if target.codec == "h264":
+        if (target.profile or "").lower() in ("baseline", "main", "high"):
+            command += ["-profile:v", target.profile.lower()]
+        params = [f"{name}={value}" for name, value in (reference_options or {}).items()
+                  if name in X264_STREAM_OPTIONS]
+        if target.level:
+            params.append(f"level={target.level / 10:g}")
+        if params:
+            command += ["-x264-params", ":".join(params)]
+    if target.audio is not None:
+        codec, rate, channels = target.audio
+        command += ["-map", "1:a:0" if info.audio is None else "0:a:0",
+                    "-c:a", ENCODERS.get(codec, codec), "-ar", str(rate), "-ac", str(channels)]
+    else:
+        command += ["-an"]
+    command.append(output)
+    subprocess.run(command, check=True)
+    return output
+
+
+def concat_copy(ffmpeg, paths, output):
+    """Join videos with identical streams through the concat demuxer, no re-encoding"""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_file = f.name
+    try:
+        subprocess.run(
+            [ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_file,
+             "-c", "copy", "-movflags", "+faststart", output],
+            check=True,
+        )
+    finally:
+        os.remove(list_file)
+    return output
+
+
+def merge_presentation(quality='1080p60', scenes=None, output_file="COMPLETE_PRESENTATION.mp4"):
     """
     Merge all scene videos into one complete presentation
-    
+
     Args:
         quality: Video quality folder ('480p15', '720p30', or '1080p60')
+        scenes: Optional list of video paths in presentation order
+            (render_all.py passes the scenes it discovered)
+        output_file: Merged video
+
+    Returns:
+        Path of the merged video, or None if scenes are missing
     """
-    
-    # Define scene paths
-    scenes = [
-        f"media/videos/scene1/{quality}/IntroSceneWithTitles.mp4",
-        f"media/videos/scene2/{quality}/CircleDetectionScene.mp4",
-        f"media/videos/scene3/{quality}/PolarTransformScene.mp4",
-        f"media/videos/scene4/{quality}/ResultsScene.mp4"
-    ]
-    
+    if scenes is None:
+        scenes = [scene.format(quality=quality) for scene in DEFAULT_SCENES]
+
     # Check if all files exist
     print("Checking scene files...")
     missing = []
@@ -32,74 +295,75 @@ def merge_presentation(quality='1080p60'):
             print(f"  ❌ Missing: {scene}")
         else:
             print(f"  ✓ Found: {scene}")
-    
+
     if missing:
         print(f"\n⚠️  {len(missing)} file(s) missing!")
         print("Please render all scenes first using:")
-        print(f"  manim -pqh scenes/scene1.py IntroSceneWithTitles")
-        print(f"  manim -pqh scenes/scene2.py CircleDetectionScene")
-        print(f"  manim -pqh scenes/scene3.py PolarTransformScene")
-        print(f"  manim -pqh scenes/scene4.py ResultsScene")
-        return
-    
-    # Load video clips
-    print("\nLoading video clips...")
-    clips = []
-    for i, scene in enumerate(scenes, 1):
-        print(f"  Loading scene {i}/4...")
-        clip = VideoFileClip(scene)
-        clips.append(clip)
-        print(f"    Duration: {clip.duration:.2f}s")
-    
-    # Concatenate clips
-    print("\nMerging videos...")
-    final_clip = concatenate_videoclips(clips, method="compose")
-    
-    total_duration = sum(clip.duration for clip in clips)
+        print("  python render_all.py")
+        print("or one by one:")
+        print("  manim -pqh scenes/scene1.py IntroSceneWithTitles")
+        print("  manim -pqh scenes/scene2.py CircleDetectionScene")
+        print("  manim -pqh scenes/scene3.py PolarTransformScene")
+        print("  manim -pqh scenes/scene4.py ResultsScene")
+        return None
+
+    ffmpeg, ffprobe = find_ffmpeg()
+
+    print("\nProbing video streams...")
+    infos = [probe(scene, ffmpeg, ffprobe) for scene in scenes]
+    for i, info in enumerate(infos, 1):
+        print(f"  Scene {i}/{len(infos)}: {info.describe()}, {info.duration:.2f}s")
+
+    # The most common format wins; only the odd ones out are re-encoded
+    target_signature = Counter(info.signature for info in infos).most_common(1)[0][0]
+    target = next(info for info in infos if info.signature == target_signature)
+
+    total_duration = sum(info.duration for info in infos)
     print(f"  Total duration: {total_duration:.2f}s ({total_duration/60:.2f} minutes)")
-    
-    # Export
-    output_file = "COMPLETE_PRESENTATION.mp4"
-    print(f"\nExporting to {output_file}...")
-    
-    fps = 60 if '60' in quality else (30 if '30' in quality else 15)
-    
-    final_clip.write_videofile(
-        output_file,
-        fps=fps,
-        codec='libx264',
-        audio_codec='aac',
-        temp_audiofile='temp-audio.m4a',
-        remove_temp=True,
-        preset='medium',
-        threads=4
-    )
-    
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        segments = []
+        reference_options = None
+        for i, info in enumerate(infos, 1):
+            if info.signature == target_signature:
+                segments.append(info.path)
+                continue
+            if reference_options is None:
+                reference_options = x264_options(target.path) if target.codec == "h264" else {}
+            print(f"\nRe-encoding scene {i} to {target.describe()}...")
+            segments.append(reencode(ffmpeg, info, target,
+                                     os.path.join(tmp_dir, f"segment{i}.mp4"),
+                                     reference_options))
+
+        print(f"\nJoining {len(segments)} scene(s) into {output_file} (stream copy)...")
+        concat_copy(ffmpeg, segments, output_file)
+
     print(f"\n✅ Success! Complete presentation saved as: {output_file}")
     print(f"   File size: {os.path.getsize(output_file) / (1024*1024):.2f} MB")
-    
-    # Clean up
-    for clip in clips:
-        clip.close()
-    final_clip.close()
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the scene videos into one presentation")
+    parser.add_argument("quality", nargs="?", default="1080p60",
+                        help="Quality folder: 480p15, 720p30 or 1080p60 (default)")
+    parser.add_argument("-o", "--output", default="COMPLETE_PRESENTATION.mp4",
+                        help="Merged video file")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
-    import sys
-    
-    # Check if quality argument provided
-    if len(sys.argv) > 1:
-        quality = sys.argv[1]
-    else:
-        quality = '1080p60'  # Default to high quality
-    
     print("="*70)
     print("  MANIM PRESENTATION MERGER")
     print("="*70)
-    print(f"\nQuality: {quality}")
+    print(f"\nQuality: {args.quality}")
     print("-"*70)
-    
-    merge_presentation(quality)
-    
+
+    output = merge_presentation(args.quality, output_file=args.output)
+
     print("\n" + "="*70)
     print("  Done!")
     print("="*70)
+    return 0 if output else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Render every scene in parallel and merge them into the presentation
+
+Replaces running `manim -pqh scenes/sceneN.py SceneName` four times in a row:
+
+- Scene classes are discovered in `scenes/` by parsing the files (nothing is
+  imported, so a broken scene cannot stop the others)
+- Every scene renders in its own manim process with its own media directory
+  (`media/.render/<file>_<Scene>/`), so partial movie files never collide and
+  manim's own caching keeps working between runs
+- Finished videos are copied to the usual `media/videos/<file>/<quality>/`
+- Scenes whose source, local imports and data files are unchanged since the
+  last successful render are skipped (for scenes showing analysis results,
+  the results store and the frames in the data directory count as data)
+- Tex expressions of all scenes are compiled in one LaTeX run before the
+  scenes start (tex_cache.py) and linked into every media directory
+- A failing scene is reported with its log and the others keep going
+- When every scene rendered (or was up to date) the videos are merged
+  (merge_scenes.py); a failed scene stops the merge
+
+With one core per scene the build takes about as long as the slowest scene.
+
+Usage:
+    python render_all.py                 # 1080p60, all scenes, then merge
+    python render_all.py -q l            # 480p15 preview
+    python render_all.py scene3 --force  # re-render scene3 only
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCENES_DIR = os.path.join(ROOT, "scenes")
+MEDIA_DIR = os.path.join(ROOT, "media")
+RENDER_DIR = os.path.join(MEDIA_DIR, ".render")
+STATE_FILE = os.path.join(RENDER_DIR, "state.json")
+
+QUALITIES = {
+    "l": "480p15",
+    "m": "720p30",
+    "h": "1080p60",
+    "p": "1440p60",
+    "k": "2160p60",
+}
+
+# Base classes that make a class a renderable scene
+SCENE_BASES = ("Scene", "MovingCameraScene", "ThreeDScene", "ZoomedScene",
+               "VectorScene", "LinearTransformationScene")
+
+# Environment variables that select what a scene shows
+SCENE_ENV = ("SC_RESULTS_FRAME", "SC_RESULTS_DIR", "SC_DATA_DIR")
+
+# Scenes importing this module read the results store and the data directory
+RESULTS_MODULE = os.path.join(ROOT, "analysis", "results.py")
+
+
+class SceneJob:
+    """
+    One scene class to render
+
+    Attributes:
+        path: Scene file
+        name: Scene class name
+        module: File name without extension, e.g. 'scene1'
+        lineno: Line of the class definition (keeps file order)
+    """
+
+    def __init__(self, path, name, lineno):
+        self.path = path
+        self.name = name
+        self.module = os.path.splitext(os.path.basename(path))[0]
+        self.lineno = lineno
+
+    @property
+    def key(self):
+        return f"{self.module}.{self.name}"
+
+    def media_dir(self):
+        """Private media directory of this scene"""
+        return os.path.join(RENDER_DIR, f"{self.module}_{self.name}")
+
+    def rendered_video(self, quality):
+        """Where manim writes the video inside the private media directory"""
+        return os.path.join(self.media_dir(), "videos", self.module, quality,
+                            f"{self.name}.mp4")
+
+    def output_video(self, quality):
+        """Shared location read by merge_scenes.py"""
+        return os.path.join(MEDIA_DIR, "videos", self.module, quality, f"{self.name}.mp4")
+
+
+def _is_scene_class(node):
+    for base in node.bases:
+        name = base.id if isinstance(base, ast.Name) else getattr(base, "attr", None)
+        if name in SCENE_BASES:
+            return True
+    return False
+
+
+def discover_scenes(scenes_dir=SCENES_DIR):
+    """
+    Scene classes defined in the `.py` files of a directory
+
+    Returns:
+        List of SceneJob, ordered by file name and position in the file
+    """
+    jobs = []
+    for name in sorted(os.listdir(scenes_dir)):
+        if not name.endswith(".py"):
+            continue
+        path = os.path.join(scenes_dir, name)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef) and _is_scene_class(node):
+                jobs.append(SceneJob(path, node.name, node.lineno))
+    return jobs
+
+
+def _module_file(module, package_dir=None):
+    """File of a project-local module name, or None for third-party modules"""
+    parts = module.split(".")
+    for base in filter(None, (package_dir, ROOT, SCENES_DIR)):
+        candidate = os.path.join(base, *parts)
+        if os.path.isfile(candidate + ".py"):
+            return candidate + ".py"
+        if os.path.isfile(os.path.join(candidate, "__init__.py")):
+            return os.path.join(candidate, "__init__.py")
+    return None
+
+
+def dependencies(path, seen=None):
+    """
+    Files a scene's output depends on: the file itself, the project modules it
+    imports (recursively) and data files named by string literals
+
+    Returns:
+        Set of absolute paths
+    """
+    seen = set() if seen is None else seen
+    path = os.path.abspath(path)
+    if path in seen:
+        return seen
+    seen.add(path)
+
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    package_dir = os.path.dirname(path)
+    for node in ast.walk(tree):
+        modules = []
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package_dir
+                for _ in range(node.level - 1):
+                    base = os.path.dirname(base)
+                target = _module_file(node.module, base) if node.module else None
+                if target is None:
+                    # `from . import name`: every name may be a submodule
+                    modules_here = [_module_file(alias.name, base) for alias in node.names]
+                    for target in filter(None, modules_here):
+                        dependencies(target, seen)
+                    target = os.path.join(base, "__init__.py")
+                if os.path.isfile(target):
+                    dependencies(target, seen)
+                continue
+            modules = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            candidate = os.path.join(ROOT, node.value)
+            if len(node.value) < 260 and "\n" not in node.value and os.path.isfile(candidate):
+                seen.add(os.path.abspath(candidate))
+            continue
+
+        for module in modules:
+            # Parent packages run their __init__ on import too
+            parts = module.split(".")
+            for i in range(1, len(parts) + 1):
+                target = _module_file(".".join(parts[:i]))
+                if target is not None:
+                    dependencies(target, seen)
+    return seen
+
+
+def manim_version():
+    try:
+        from importlib.metadata import version
+        return version("manim")
+    except Exception:
+        return "unknown"
+
+
+def results_state():
+    """
+    Digest of what analysis.results reads: the committed row counts of the
+    results store chunks and the size and modification time of the frames
+    """
+    hasher = hashlib.sha256()
+    results_dir = os.path.join(ROOT, os.environ.get("SC_RESULTS_DIR", "results"))
+    chunk_dir = os.path.join(results_dir, "chunks")
+    if os.path.isdir(chunk_dir):
+        for name in sorted(os.listdir(chunk_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(chunk_dir, name), "rb") as f:
+                    hasher.update(name.encode() + f.read())
+    data_dir = os.path.join(ROOT, os.environ.get("SC_DATA_DIR", "data"))
+    for dirpath, dirnames, filenames in os.walk(data_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            stat = os.stat(os.path.join(dirpath, name))
+            relpath = os.path.relpath(os.path.join(dirpath, name), data_dir)
+            hasher.update(f"{relpath}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return hasher.hexdigest()
+
+
+def scene_hash(job, quality, extra_args):
+    """Hash of everything that determines the rendered video"""
+    hasher = hashlib.sha256()
+    hasher.update(f"{job.key}|{quality}|{manim_version()}|{' '.join(extra_args)}".encode())
+    hasher.update("|".join(f"{name}={os.environ.get(name, '')}" for name in SCENE_ENV).encode())
+    paths = dependencies(job.path)
+    if RESULTS_MODULE in paths:
+        hasher.update(results_state().encode())
+    for path in sorted(paths):
+        hasher.update(os.path.relpath(path, ROOT).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    os.makedirs(RENDER_DIR, exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def render_scene(job, quality_flag, extra_args):
+    """
+    Render one scene in its own manim process
+
+    Returns:
+        (ok, seconds, log_path)
+    """
+    quality = QUALITIES[quality_flag]
+    os.makedirs(job.media_dir(), exist_ok=True)
+    log_path = os.path.join(job.media_dir(), f"render_{quality}.log")
+    command = [
+        sys.executable, "-m", "manim", "render",
+        f"-q{quality_flag}",
+        "--media_dir", job.media_dir(),
+        *extra_args,
+        job.path, job.name,
+    ]
+
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        log.write(" ".join(command) + "\n\n")
+        log.flush()
+        result = subprocess.run(command, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    seconds = time.perf_counter() - start
+
+    rendered = job.rendered_video(quality)
+    if result.returncode != 0 or not os.path.exists(rendered):
+        return False, seconds, log_path
+
+    output = job.output_video(quality)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp_path = output + ".tmp"
+    shutil.copyfile(rendered, tmp_path)
+    os.replace(tmp_path, output)
+    return True, seconds, log_path
+
+
+def _tail(path, n_lines=15):
+    try:
+        with open(path, errors="replace") as f:
+            return f.readlines()[-n_lines:]
+    except OSError:
+        return []
+
+
+def prepare_tex(jobs):
+    """Compile the Tex expressions of the scenes in one batch; manim compiles any left over"""
+    try:
+        import tex_cache
+        targets = {job.path: os.path.join(job.media_dir(), "Tex") for job in jobs}
+        found, compiled = tex_cache.precompile(targets)
+    except Exception as error:
+        print(f"⚠️  Tex pre-pass skipped ({error}), scenes compile their own expressions")
+        return
+    print(f"  ✓ Tex: {found} expression(s), {compiled} compiled in one batch")
+
+
+def render_all(quality_flag="h", only=None, force=False, workers=None, extra_args=()):
+    """
+    Render all (or the selected) scenes in parallel
+
+    Args:
+        quality_flag: manim quality letter, one of l, m, h, p, k
+        only: Optional list of names; a scene is selected when its file name
+            (e.g. 'scene3') or class name matches
+        force: Render even when nothing changed
+        workers: Scenes rendered at the same time, defaults to the CPU count
+        extra_args: Additional manim command-line arguments
+
+    Returns:
+        (jobs, failed): all selected SceneJobs and the ones that failed
+    """
+    quality = QUALITIES[quality_flag]
+    jobs = discover_scenes()
+    if only:
+        jobs = [job for job in jobs if job.module in only or job.name in only]
+    if not jobs:
+        print("❌ No scenes found")
+        return [], []
+
+    state = load_state()
+    todo, hashes = [], {}
+    for job in jobs:
+        state_key = f"{job.key}@{quality}"
+        hashes[job.key] = scene_hash(job, quality, extra_args)
+        up_to_date = (state.get(state_key) == hashes[job.key]
+                      and os.path.exists(job.output_video(quality)))
+        if up_to_date and not force:
+            print(f"  ✓ {job.key}: unchanged, skipped")
+        else:
+            todo.append(job)
+
+    failed = []
+    if todo:
+        prepare_tex(todo)
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        print(f"\nRendering {len(todo)} scene(s) at {quality} with {workers} process(es)...")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Threads only wait on the manim subprocesses doing the work
+            futures = {pool.submit(render_scene, job, quality_flag, list(extra_args)): job
+                       for job in todo}
+            for future in as_completed(futures):
+                job = futures[future]
+                ok, seconds, log_path = future.result()
+                if ok:
+                    state[f"{job.key}@{quality}"] = hashes[job.key]
+                    save_state(state)
+                    print(f"  ✅ {job.key} ({seconds:.1f}s)")
+                else:
+                    failed.append(job)
+                    print(f"  ❌ {job.key} failed after {seconds:.1f}s, log: {log_path}")
+                    for line in _tail(log_path):
+                        print(f"     {line.rstrip()}")
+        print(f"\nWall time: {time.perf_counter() - start:.1f}s")
+    return jobs, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render all scenes in parallel and merge them")
+    parser.add_argument("scenes", nargs="*",
+                        help="Scene files (e.g. scene3) or class names; all by default")
+    parser.add_argument("-q", "--quality", choices=sorted(QUALITIES), default="h",
+                        help="manim quality: l=480p15, m=720p30, h=1080p60 (default), "
+                             "p=1440p60, k=2160p60")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Scenes rendered at the same time (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Render unchanged scenes too")
+    parser.add_argument("--no-merge", action="store_true", help="Skip the merge step")
+    parser.add_argument("--manim-args", default="",
+                        help="Extra manim arguments, e.g. '--disable_caching'")
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("  MANIM PARALLEL RENDER")
+    print("=" * 70)
+
+    jobs, failed = render_all(args.quality, only=args.scenes, force=args.force,
+                              workers=args.workers, extra_args=args.manim_args.split())
+    if not jobs:
+        return 1
+    if failed:
+        print(f"\n⚠️  {len(failed)} scene(s) failed: {', '.join(job.key for job in failed)}")
+
+    if not args.no_merge and not args.scenes:
+        quality = QUALITIES[args.quality]
+        videos = [job.output_video(quality) for job in jobs]
+        if failed:
+            # Their videos on disk (if any) are from an older render
+            print("\n⚠️  Not merging: the presentation would contain outdated scenes")
+        elif all(os.path.exists(video) for video in videos):
+            from merge_scenes import merge_presentation
+            merge_presentation(quality, scenes=videos)
+        else:
+            print("\n⚠️  Not merging: some scene videos are missing")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
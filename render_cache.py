@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of rendered animation segments
+
+manim names every partial movie file (one per `play`/`wait`) after a hash
+of the camera, the animations and the mobjects on screen, and skips the
+animation when that file already exists in the scene's partial movie
+directory. That cache is local to one media directory and one quality, and
+the file list manim writes for FFmpeg holds absolute paths, so it breaks as
+soon as the project moves.
+
+This module adds a shared store next to it:
+
+- manim hashes arrays of more than 1000 elements through numpy's
+  summarized repr (corner values only), so a curve, image or point cloud
+  edited in the middle keeps its hash. Every segment name therefore also
+  carries a full digest of the point, color and pixel arrays on screen and
+  in the animations (content_digest).
+- Segments are stored under a key combining that name with the render
+  settings (resolution, frame rate, file format, background, manim
+  version, camera class) and a hash of the project's own drawing code
+  (RENDER_MODULES, CACHE_VERSION), in
+  `.cache/partials/objects/<key[:2]>/<key>.mp4`, with a small JSON sidecar
+  describing the segment. One store serves every scene,
+  quality and media directory (including render_all.py's private ones).
+- Before rendering an animation its segment is looked up in the store and
+  linked into the partial movie directory, so after a small edit only the
+  changed animations are rendered again.
+- The FFmpeg file lists are written with paths relative to the list file.
+- The store is bounded (SC_PARTIAL_CACHE_MB, 2048 MB by default); the least
+  recently used segments are evicted first.
+- `export`/`import` move a warmed store between machines (CI, laptops) as a
+  tar file with a relative manifest.
+
+Scenes opt in with the mixin:
+
+    from render_cache import PartialCacheMixin
+
+    class ResultsScene(PartialCacheMixin, Scene):
+        ...
+
+Usage:
+    python render_cache.py stats
+    python render_cache.py prune [--max-mb 500]
+    python render_cache.py export partials.tar
+    python render_cache.py import partials.tar
+"""
+
+import argparse
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("SC_PARTIAL_CACHE", os.path.join(ROOT, ".cache", "partials"))
+MAX_MB = float(os.environ.get("SC_PARTIAL_CACHE_MB", 2048))
+
+# Bump when a change to the way segments are rendered is not covered below
+CACHE_VERSION = 1
+
+# Project modules that change the pixels of a segment without changing
+# manim's animation hash (cameras, drawing and layering code, glyph loading)
+RENDER_MODULES = [
+    "render_cache.py",
+    "tex_cache.py",
+    "scenes/code_snippets.py",
+    "scenes/grids.py",
+    "scenes/pixel_cloud.py",
+    "scenes/static_layer.py",
+]
+
+# Mobject arrays whose full content goes into content_digest
+CONTENT_ARRAYS = ("points", "rgbas", "fill_rgbas", "stroke_rgbas",
+                  "background_stroke_rgbas", "pixel_array")
+
+MANIFEST = "manifest.json"
+_OBJECT_NAME = re.compile(r"^objects/([0-9a-f]{2})/(\1[0-9a-f]{62})(\.[a-z0-9]+)$")
+
+
+def cache_key(animation_hash, settings):
+    """
+    Store key of one partial movie file
+
+    Args:
+        animation_hash: manim's hash of the play call (camera, animations, mobjects)
+        settings: Dict of the render settings that change the encoded file
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps({"hash": animation_hash, **settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _animation_mobjects(animation):
+    """Mobjects an animation (or animation group) draws or moves towards"""
+    for name in ("mobject", "target_mobject"):
+        mobject = getattr(animation, name, None)
+        if mobject is not None:
+            yield mobject
+    for child in getattr(animation, "animations", None) or ():
+        yield from _animation_mobjects(child)
+
+
+def content_digest(mobjects, animations=()):
+    """
+    Digest of the complete array data of mobjects and animations
+
+    Args:
+        mobjects: Mobjects on screen
+        animations: Animations of the play call
+
+    Returns:
+        Hex SHA-256 digest over CONTENT_ARRAYS of every family member
+    """
+    import numpy as np
+
+    hasher = hashlib.sha256()
+    roots = list(mobjects)
+    for animation in animations:
+        roots.extend(_animation_mobjects(animation))
+    seen = set()
+    for root in roots:
+        family = root.get_family() if hasattr(root, "get_family") else [root]
+        for mobject in family:
+            if id(mobject) in seen:
+                continue
+            seen.add(id(mobject))
+            hasher.update(type(mobject).__name__.encode())
+            for name in CONTENT_ARRAYS:
+                array = getattr(mobject, name, None)
+                if not isinstance(array, np.ndarray):
+                    continue
+                array = np.ascontiguousarray(array)
+                hasher.update(f"{name}{array.dtype.str}{array.shape}".encode())
+                hasher.update(array.data if array.size else b"")
+    return hasher.hexdigest()
+
+
+class PartialStore:
+    """
+    Directory of partial movie files addressed by cache_key
+
+    Args:
+        root: Store directory
+        max_mb: Size budget in megabytes, enforced after every put
+    """
+
+    def __init__(self, root=CACHE_DIR, max_mb=MAX_MB):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def object_path(self, key, extension=".mp4"):
+        return os.path.join(self.root, "objects", key[:2], key + extension)
+
+    def entries(self):
+        """
+        All stored segments
+
+        Returns:
+            List of (key, path, size, mtime), least recently used first
+        """
+        entries = []
+        objects = os.path.join(self.root, "objects")
+        if not os.path.isdir(objects):
+            return entries
+        for prefix in os.listdir(objects):
+            directory = os.path.join(objects, prefix)
+            for name in os.listdir(directory):
+                key, extension = os.path.splitext(name)
+                if extension in (".json", ".tmp") or not extension:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((key, path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[3])
+        return entries
+
+    def size(self):
+        return sum(entry[2] for entry in self.entries())
+
+    def fetch(self, key, destination, extension=".mp4"):
+        """
+        Place a stored segment at `destination`
+
+        The file is hard-linked when possible (no copy, no extra space) and
+        marked as recently used.
+
+        Returns:
+            True if the segment was in the store
+        """
+        source = self.object_path(key, extension)
+        if not os.path.exists(source):
+            return False
+        _place(source, destination)
+        now = time.time()
+        os.utime(source, (now, now))
+        return True
+
+    def put(self, key, source, info=None, extension=".mp4"):
+        """
+        Add a rendered segment (no-op when the key is already stored)
+
+        Args:
+            key: cache_key of the segment
+            source: Rendered partial movie file
+            info: Optional JSON-serializable description kept in a sidecar
+        """
+        target = self.object_path(key, extension)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _place(source, target)
+        if info is not None:
+            _write_json(os.path.splitext(target)[0] + ".json", info)
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """
+        Delete least recently used segments until the store fits the budget
+
+        Returns:
+            (files removed, bytes freed)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(entry[2] for entry in entries)
+        removed = freed = 0
+        for key, path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            for stale in (path, os.path.splitext(path)[0] + ".json"):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def export(self, tar_path):
+        """
+        Write the whole store to a tar file with a relative manifest
+
+        Returns:
+            Number of segments exported
+        """
+        manifest = {}
+        with tarfile.open(tar_path, "w") as tar:
+            for key, path, size, _ in self.entries():
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                tar.add(path, arcname=name)
+                manifest[key] = {"file": name, "size": size,
+                                 "info": _read_json(os.path.splitext(path)[0] + ".json")}
+            data = json.dumps(manifest, indent=2, sort_keys=True).encode()
+            member = tarfile.TarInfo(MANIFEST)
+            member.size = len(data)
+            member.mtime = int(time.time())
+            tar.addfile(member, io.BytesIO(data))
+        return len(manifest)
+
+    def import_(self, tar_path):
+        """
+        Add the segments of an exported tar file, then enforce the size budget
+
+        Only members listed in the manifest and named like store objects are
+        extracted, so an archive cannot write outside the store.
+
+        Returns:
+            (segments added, segments already present)
+        """
+        added = present = 0
+        with tarfile.open(tar_path, "r") as tar:
+            manifest = json.load(tar.extractfile(MANIFEST))
+            for key, entry in manifest.items():
+                match = _OBJECT_NAME.match(entry["file"])
+                if match is None or match.group(2) != key:
+                    raise ValueError(f"Invalid entry in {tar_path}: {entry['file']}")
+                target = self.object_path(key, match.group(3))
+                if os.path.exists(target):
+                    present += 1
+                    continue
+                member = tar.getmember(entry["file"])
+                if not member.isfile():
+                    raise ValueError(f"Invalid entry in {tar_path}: {entry['file']}")
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = target + ".tmp"
+                with tar.extractfile(member) as src, open(tmp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(tmp_path, target)
+                if entry.get("info") is not None:
+                    _write_json(os.path.splitext(target)[0] + ".json", entry["info"])
+                added += 1
+        self.evict()
+        return added, present
+
+
+def _place(source, destination):
+    """Hard-link `source` to `destination` (copy across file systems), atomically"""
+    tmp_path = destination + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def render_code_hash():
+    """Hash of CACHE_VERSION and the source of RENDER_MODULES"""
+    hasher = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for name in RENDER_MODULES:
+        hasher.update(name.encode())
+        try:
+            with open(os.path.join(ROOT, name), "rb") as f:
+                hasher.update(f.read())
+        except OSError:
+            hasher.update(b"missing")
+    return hasher.hexdigest()
+
+
+def render_settings(camera=None):
+    """
+    Settings of the current manim config that change the encoded segment
+
+    Args:
+        camera: Camera of the renderer; its class is part of the settings
+    """
+    from manim import __version__, config
+
+    camera_class = type(camera) if camera is not None else None
+    return {
+        "width": config.pixel_width,
+        "height": config.pixel_height,
+        "fps": config.frame_rate,
+        "extension": config.movie_file_extension,
+        "transparent": config.transparent,
+        "background": str(config.background_color),
+        "renderer": str(config.renderer),
+        "manim": __version__,
+        "camera": None if camera_class is None
+                  else f"{camera_class.__module__}.{camera_class.__qualname__}",
+        "code": render_code_hash(),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def cached_file_writer_class():
+    """
+    SceneFileWriter subclass backed by the shared store
+
+    Built on first use so this module (and its CLI) works without manim.
+    """
+    from manim import __version__, config
+    from manim.scene.scene_file_writer import SceneFileWriter
+    from manim.utils.file_ops import write_to_movie
+
+    class CachedFileWriter(SceneFileWriter):
+        store = PartialStore()
+
+        def __init__(self, renderer, scene_name, **kwargs):
+            self.scene_name = scene_name
+            # Set by PartialCacheMixin; its mobjects feed content_digest
+            self.scene = None
+            self._content_hash = (None, None)
+            super().__init__(renderer, scene_name, **kwargs)
+
+        def _with_content(self, hash_invocation):
+            """manim's hash followed by the content_digest of the play call"""
+            if self.scene is None:
+                return hash_invocation
+            digest = content_digest(self.scene.mobjects, self.scene.animations or ())
+            self._content_hash = (hash_invocation, f"{hash_invocation}_{digest[:32]}")
+            return self._content_hash[1]
+
+        def is_already_cached(self, hash_invocation):
+            if not hasattr(self, "partial_movie_directory") or not write_to_movie():
+                return False
+            hash_invocation = self._with_content(hash_invocation)
+            local = str(self.partial_movie_directory
+                        / f"{hash_invocation}{config.movie_file_extension}")
+            if os.path.exists(local):
+                # Rendered into this media directory before the store had it: share it
+                self._put(local)
+                return True
+            return self.store.fetch(cache_key(hash_invocation, self._settings()), local,
+                                    config.movie_file_extension)
+
+        def add_partial_movie_file(self, hash_animation):
+            # Name the file like the is_already_cached lookup of the same call
+            manim_hash, full_hash = self._content_hash
+            if hash_animation is not None and hash_animation == manim_hash:
+                hash_animation = full_hash
+            self._content_hash = (None, None)
+            super().add_partial_movie_file(hash_animation)
+
+        def _settings(self):
+            return render_settings(getattr(self.renderer, "camera", None))
+
+        def close_movie_pipe(self):
+            super().close_movie_pipe()
+            self._put(self.partial_movie_file_path)
+
+        def _put(self, path):
+            animation_hash = os.path.splitext(os.path.basename(path))[0]
+            # --disable_caching names segments by position, not content
+            if animation_hash.startswith("uncached_") or not os.path.exists(path):
+                return
+            settings = self._settings()
+            self.store.put(cache_key(animation_hash, settings), path,
+                           info={"scene": self.scene_name, "hash": animation_hash, **settings},
+                           extension=config.movie_file_extension)
+
+        def combine_files(self, input_files, output_file, create_gif=False,
+                          includes_sound=False):
+            # manim's concat step, but the list holds paths relative to the
+            # list file, so it stays valid when the media directory moves
+            file_list = self.partial_movie_directory / "partial_movie_file_list.txt"
+            with file_list.open("w", encoding="utf-8") as fp:
+                fp.write("# This file is used internally by FFMPEG.\n")
+                for path in input_files:
+                    relative = os.path.relpath(path, self.partial_movie_directory)
+                    relative = relative.replace(os.sep, "/").replace("'", "'\\''")
+                    fp.write(f"file '{relative}'\n")
+            command = [
+                config.ffmpeg_executable, "-y", "-f", "concat", "-safe", "0",
+                "-i", str(file_list),
+                "-loglevel", config.ffmpeg_loglevel.lower(),
+                "-metadata", f"comment=Rendered with Manim Community v{__version__}",
+                "-nostdin",
+            ]
+            if create_gif:
+                fps = min(max(config.frame_rate, 1), 50)
+                command += ["-vf", f"fps={fps},split[s0][s1];[s0]palettegen=stats_mode=diff[p];"
+                                   "[s1][p]paletteuse=dither=bayer:bayer_scale=5:"
+                                   "diff_mode=rectangle"]
+            else:
+                command += ["-c", "copy"]
+            if not includes_sound:
+                command += ["-an"]
+            subprocess.run(command + [str(output_file)])
+
+    return CachedFileWriter
+
+
+class PartialCacheMixin:
+    """
+    Scene mixin that renders through the shared partial movie store
+
+    Put it before the manim scene class: `class S(PartialCacheMixin, Scene)`.
+    Only the Cairo renderer writes partial movie files, so other renderers
+    are left alone.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from manim import config
+        from manim.renderer.cairo_renderer import CairoRenderer
+
+        if isinstance(self.renderer, CairoRenderer) and not config.dry_run:
+            self.renderer._file_writer_class = cached_file_writer_class()
+            self.renderer.init_scene(self)
+            self.renderer.file_writer.scene = self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the shared partial movie cache")
+    parser.add_argument("--dir", default=CACHE_DIR, help=f"Store directory (default: {CACHE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show the number and size of cached segments")
+    prune = commands.add_parser("prune", help="Evict least recently used segments")
+    prune.add_argument("--max-mb", type=float, default=MAX_MB,
+                       help=f"Size to shrink the store to (default: {MAX_MB:g})")
+    export = commands.add_parser("export", help="Write the store to a tar file")
+    export.add_argument("tar")
+    import_ = commands.add_parser("import", help="Add the segments of an exported tar file")
+    import_.add_argument("tar")
+    args = parser.parse_args(argv)
+
+    store = PartialStore(args.dir)
+    if args.command == "stats":
+        entries = store.entries()
+        total = sum(entry[2] for entry in entries)
+        print(f"{len(entries)} segment(s), {total / (1024*1024):.1f} MB "
+              f"of {store.max_bytes / (1024*1024):.0f} MB in {store.root}")
+        scenes = {}
+        for key, path, size, _ in entries:
+            info = _read_json(os.path.splitext(path)[0] + ".json") or {}
+            label = f"{info.get('scene') or '?'} {info.get('width', '?')}x" \
+                    f"{info.get('height', '?')}@{info.get('fps', '?')}"
+            count, nbytes = scenes.get(label, (0, 0))
+            scenes[label] = (count + 1, nbytes + size)
+        for label, (count, nbytes) in sorted(scenes.items()):
+            print(f"  {label:<40} {count:>5} {nbytes / (1024*1024):>9.1f} MB")
+    elif args.command == "prune":
+        removed, freed = store.evict(int(args.max_mb * 1024 * 1024))
+        print(f"✅ Removed {removed} segment(s), {freed / (1024*1024):.1f} MB")
+    elif args.command == "export":
+        count = store.export(args.tar)
+        print(f"✅ Exported {count} segment(s) to {args.tar}")
+    else:
+        added, present = store.import_(args.tar)
+        print(f"✅ Imported {added} segment(s), {present} already cached")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
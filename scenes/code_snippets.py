@@ -0,0 +1,131 @@
+"""
+Slide code taken from the analysis package, with cached Code mobjects
+
+The code on the slides is read from the functions in `analysis/` with
+`inspect`, so it is always the code that actually runs. `snippet` returns a
+whole function (without decorators and docstring) or the lines between two
+markers inside it:
+
+    snippet(calculate_circle_from_points)
+    snippet(hough_circle, start="circles = cv2.HoughCircles", end=")")
+
+Building a Code mobject runs Pygments and lays out one Text per line, which
+makes it one of the slowest things a slide constructs. `code_block` stores
+the finished mobject in `.cache/code/`, keyed by a hash of the source text,
+the style arguments, the manim version and the renderer, so a block is only
+highlighted again when its source (or style) changes.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import textwrap
+
+from manim import Code, __version__, config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_CACHE_DIR = os.environ.get("SC_CODE_CACHE", os.path.join(ROOT, ".cache", "code"))
+
+# Look of every code block in the presentation
+CODE_STYLE = {
+    "language": "python",
+    "tab_width": 4,
+    "background": "window",
+    "formatter_style": "monokai",
+}
+
+# Finished blocks of this process, by cache key
+_blocks = {}
+
+
+def _function_lines(function):
+    """Source lines of a function without decorators and docstring"""
+    source = textwrap.dedent(inspect.getsource(inspect.unwrap(function)))
+    node = ast.parse(source).body[0]
+    lines = source.splitlines()
+    body = node.body
+    if (isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)):
+        skip = set(range(body[0].lineno - 1, body[0].end_lineno))
+        # Drop the blank line that separated the docstring from the code
+        if body[0].end_lineno < len(lines) and not lines[body[0].end_lineno].strip():
+            skip.add(body[0].end_lineno)
+    else:
+        skip = set()
+    return [line for i, line in enumerate(lines[node.lineno - 1:], node.lineno - 1)
+            if i not in skip]
+
+
+def snippet(function, start=None, end=None):
+    """
+    Source code of an analysis function, ready for a slide
+
+    Args:
+        function: Function or method (decorated functions are unwrapped)
+        start: Keep lines from the first one starting with this text (after
+            indentation); the whole function when None
+        end: Keep lines up to the first one from `start` on that starts
+            with this text
+
+    Returns:
+        Dedented source text
+    """
+    lines = _function_lines(function)
+    if start is not None:
+        first = next((i for i, line in enumerate(lines) if line.strip().startswith(start)), None)
+        if first is None:
+            raise ValueError(f"{function.__qualname__} has no line starting with {start!r}")
+        lines = lines[first:]
+    if end is not None:
+        last = next((i for i, line in enumerate(lines) if line.strip().startswith(end)), None)
+        if last is None:
+            raise ValueError(f"{function.__qualname__} has no line starting with {end!r}")
+        lines = lines[:last + 1]
+    return textwrap.dedent("\n".join(lines)).strip("\n")
+
+
+def code_key(code_string, style):
+    """Cache key of a Code mobject"""
+    payload = json.dumps({"code": code_string, "style": style, "manim": __version__,
+                          "renderer": str(config.renderer)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def code_block(code_string, **style):
+    """
+    Highlighted Code mobject for a piece of source, from the cache when possible
+
+    Args:
+        code_string: Source text, e.g. from snippet()
+        **style: Code arguments overriding CODE_STYLE
+
+    Returns:
+        New Code mobject (a copy, so it can be moved and scaled freely)
+    """
+    style = {**CODE_STYLE, **style}
+    key = code_key(code_string, style)
+    if key not in _blocks:
+        path = os.path.join(CODE_CACHE_DIR, key[:2], key + ".pickle")
+        try:
+            with open(path, "rb") as f:
+                _blocks[key] = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            _blocks[key] = Code(code_string=code_string, **style)
+            _store(path, _blocks[key])
+    return _blocks[key].copy()
+
+
+def _store(path, mobject):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(mobject, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        # Not picklable with this manim version: highlight again next time
+        os.remove(tmp_path)
+        return
+    os.replace(tmp_path, path)
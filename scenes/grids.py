@@ -0,0 +1,142 @@
+"""
+Cartesian and polar grids as single VMobjects
+
+A grid built from one Line or Circle per row, column, spoke and ring is a
+VGroup of separate mobjects, each drawn with its own Cairo path every
+frame. These grids put all lines into one VMobject with one subpath per
+line, generated from NumPy arrays, so the whole grid is stroked as a single
+path and moves, scales or transforms as one object. The cost hardly grows
+with the number of lines, so grids can be as dense as the image pixels.
+
+Transform between a CartesianGrid and a PolarGrid morphs subpath i of one
+into subpath i of the other. Cartesian lines are ordered column, row,
+column, row..., polar ones spokes first, then rings from the inside out.
+"""
+
+import numpy as np
+from manim import GRAY, ORIGIN, VMobject
+
+
+def line_curves(starts, ends):
+    """
+    Straight segments as cubic Bezier curves
+
+    Args:
+        starts, ends: (n, 3) arrays of segment end points
+
+    Returns:
+        (4n, 3) array of anchors and handles, one curve per segment
+    """
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    delta = ends - starts
+    curves = np.stack([starts, starts + delta / 3, starts + 2 * delta / 3, ends], axis=1)
+    return curves.reshape(-1, 3)
+
+
+def ring_curves(center, radii, n_segments=8, start_angle=0.0):
+    """
+    Full circles as closed chains of cubic Bezier arcs
+
+    Args:
+        center: Common center of the circles
+        radii: (n,) circle radii
+        n_segments: Arcs per circle (8 matches manim's Circle)
+        start_angle: Angle of the first anchor in radians
+
+    Returns:
+        (4 * n * n_segments, 3) array, circle after circle
+    """
+    radii = np.asarray(radii, dtype=float)[:, None]
+    step = 2 * np.pi / n_segments
+    angles = start_angle + step * np.arange(n_segments)
+    # Handle length of a cubic approximating a circular arc of angle `step`
+    handle = 4 / 3 * np.tan(step / 4)
+
+    start = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    end = np.stack([np.cos(angles + step), np.sin(angles + step)], axis=-1)
+    tangent_start = np.stack([-start[:, 1], start[:, 0]], axis=-1)
+    tangent_end = np.stack([-end[:, 1], end[:, 0]], axis=-1)
+    unit = np.stack([start, start + handle * tangent_start,
+                     end - handle * tangent_end, end], axis=1)      # (segments, 4, 2)
+
+    xy = radii[:, None, None] * unit[None]                          # (n, segments, 4, 2)
+    curves = np.zeros(xy.shape[:-1] + (3,))
+    curves[..., :2] = xy
+    return curves.reshape(-1, 3) + np.asarray(center, dtype=float)
+
+
+class CartesianGrid(VMobject):
+    """
+    Square-cell grid as one VMobject
+
+    Args:
+        n_cols: Number of cells across
+        n_rows: Number of cells down, defaults to n_cols
+        cell_size: Cell edge length in scene units
+        center: Grid center
+        **kwargs: VMobject style, e.g. color and stroke_width
+    """
+
+    def __init__(self, n_cols, n_rows=None, cell_size=1.0, center=ORIGIN, color=GRAY,
+                 stroke_width=1, **kwargs):
+        self.n_cols = n_cols
+        self.n_rows = n_cols if n_rows is None else n_rows
+        self.cell_size = cell_size
+        self.grid_center = np.asarray(center, dtype=float)
+        super().__init__(color=color, stroke_width=stroke_width, **kwargs)
+
+    def generate_points(self):
+        half_width = self.n_cols * self.cell_size / 2
+        half_height = self.n_rows * self.cell_size / 2
+        xs = np.arange(self.n_cols + 1) * self.cell_size - half_width
+        ys = np.arange(self.n_rows + 1) * self.cell_size - half_height
+
+        # Columns bottom to top, rows left to right: (n, 2 end points, 3)
+        columns = np.zeros((len(xs), 2, 3))
+        columns[:, :, 0] = xs[:, None]
+        columns[:, :, 1] = [-half_height, half_height]
+        rows = np.zeros((len(ys), 2, 3))
+        rows[:, :, 0] = [-half_width, half_width]
+        rows[:, :, 1] = ys[:, None]
+
+        # Alternate column and row while both last
+        n = min(len(xs), len(ys))
+        lines = np.concatenate([np.stack([columns[:n], rows[:n]], axis=1).reshape(-1, 2, 3),
+                                columns[n:], rows[n:]])
+        self.set_points(line_curves(lines[:, 0], lines[:, 1]) + self.grid_center)
+
+
+class PolarGrid(VMobject):
+    """
+    Spokes and concentric rings as one VMobject
+
+    Args:
+        radius: Outer radius (spoke length and largest ring)
+        n_spokes: Number of equally spaced radial lines
+        n_rings: Number of rings, at radius * i / n_rings for i = 1..n_rings
+        center: Grid center
+        inner_radius: Radius where the spokes start
+        start_angle: Angle of the first spoke in radians
+        ring_segments: Bezier arcs per ring
+        **kwargs: VMobject style, e.g. color and stroke_width
+    """
+
+    def __init__(self, radius, n_spokes=8, n_rings=4, center=ORIGIN, inner_radius=0.0,
+                 start_angle=0.0, ring_segments=8, color=GRAY, stroke_width=1, **kwargs):
+        self.radius = radius
+        self.n_spokes = n_spokes
+        self.n_rings = n_rings
+        self.grid_center = np.asarray(center, dtype=float)
+        self.inner_radius = inner_radius
+        self.start_angle = start_angle
+        self.ring_segments = ring_segments
+        super().__init__(color=color, stroke_width=stroke_width, **kwargs)
+
+    def generate_points(self):
+        angles = self.start_angle + 2 * np.pi * np.arange(self.n_spokes) / self.n_spokes
+        directions = np.column_stack([np.cos(angles), np.sin(angles), np.zeros_like(angles)])
+        spokes = line_curves(self.inner_radius * directions, self.radius * directions)
+        radii = self.radius * np.arange(1, self.n_rings + 1) / max(self.n_rings, 1)
+        rings = ring_curves(ORIGIN, radii, self.ring_segments)
+        self.set_points(np.concatenate([spokes, rings]) + self.grid_center)
@@ -1,8 +1,19 @@
 from manim import *
 import numpy as np
 from PIL import Image
+import sys
+from pathlib import Path
 
-class IntroSceneWithTitles(Scene):
+# Make the analysis package importable when manim runs this file directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis.images import load_preview
+from analysis.instrument import traced
+from render_cache import PartialCacheMixin
+from static_layer import StaticLayerMixin
+from tex_cache import GlyphCacheMixin
+
+class IntroSceneWithTitles(StaticLayerMixin, PartialCacheMixin, GlyphCacheMixin, Scene):
+    @traced(category="render")
     def construct(self):
         # Main title card
         main_title = Text("Analyzing Nitrogen-Water Instabilities", font_size=48, color=BLUE, weight=BOLD)
@@ -23,7 +34,9 @@ class IntroSceneWithTitles(Scene):
         
         # Load and prepare the experimental image
         img_path = "data/d4_T20_1.JPG"
-        img = ImageMobject(img_path)
+        # 1/2-scale decode (cached): the image is drawn 5 units tall, so the
+        # full 20 MP frame would only be downsampled again by the renderer
+        img = ImageMobject(load_preview(img_path, max_height=1080))
         
         # Scale image to fit nicely on screen
         img.height = 5
@@ -1,7 +1,19 @@
 from manim import *
 import numpy as np
+import sys
+from pathlib import Path
 
-class CircleDetectionScene(Scene):
+# Make the analysis package importable when manim runs this file directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis.circle import calculate_circle_from_points, hough_circle
+from analysis.instrument import traced
+from code_snippets import code_block, snippet
+from render_cache import PartialCacheMixin
+from static_layer import StaticLayerMixin
+from tex_cache import GlyphCacheMixin
+
+class CircleDetectionScene(StaticLayerMixin, PartialCacheMixin, GlyphCacheMixin, Scene):
+    @traced(category="render")
     def construct(self):
         # Title
         title = Text("Finding the Pattern Center", font_size=48, color=BLUE)
@@ -14,20 +26,9 @@ class CircleDetectionScene(Scene):
         method1_text.to_edge(UP)
         self.play(Write(method1_text), run_time=1)
         
-        # Show brief code snippet
-        code1_text = """circles = cv2.HoughCircles(
-    blurred_image, 
-    cv2.HOUGH_GRADIENT,
-    dp=1, minDist=50,
-    param1=100, param2=30,
-    minRadius=100, maxRadius=400
-)"""
-        code1 = Code(
-            code_string=code1_text,
-            language="python",
-            tab_width=4,
-            background="window",
-            formatter_style="monokai"
+        # Show brief code snippet (the call in analysis.circle.hough_circle)
+        code1 = code_block(
+            snippet(hough_circle, start="circles = cv2.HoughCircles", end=")")
         ).scale(0.7)
         
         self.play(FadeIn(code1), run_time=1)
@@ -159,33 +160,7 @@ class CircleDetectionScene(Scene):
         self.play(Write(code_title), run_time=1)
         
         # Show the actual code
-        python_code_text = """def calculate_circle_from_points(points):
-    p1, p2, p3 = points
-    
-    D = 2 * (p1[0] * (p2[1] - p3[1]) + 
-             p2[0] * (p3[1] - p1[1]) + 
-             p3[0] * (p1[1] - p2[1]))
-    
-    ux = ((p1[0]**2 + p1[1]**2) * (p2[1] - p3[1]) +
-          (p2[0]**2 + p2[1]**2) * (p3[1] - p1[1]) +
-          (p3[0]**2 + p3[1]**2) * (p1[1] - p2[1])) / D
-    
-    uy = ((p1[0]**2 + p1[1]**2) * (p3[0] - p2[0]) +
-          (p2[0]**2 + p2[1]**2) * (p1[0] - p3[0]) +
-          (p3[0]**2 + p3[1]**2) * (p2[0] - p1[0])) / D
-    
-    center = (int(ux), int(uy))
-    radius = int(np.sqrt((p1[0]-ux)**2 + (p1[1]-uy)**2))
-    
-    return center, radius"""
-        
-        python_code = Code(
-            code_string=python_code_text,
-            language="python",
-            tab_width=4,
-            background="window",
-            formatter_style="monokai"
-        ).scale(0.65).shift(DOWN * 0.3)
+        python_code = code_block(snippet(calculate_circle_from_points)).scale(0.65).shift(DOWN * 0.3)
         
         self.play(FadeIn(python_code, shift=UP), run_time=1.5)
         self.wait(3)  # NARRATION: "Here's the Python implementation using the circumcircle formula"
@@ -1,7 +1,27 @@
 from manim import *
 import numpy as np
+import sys
+from pathlib import Path
 
-class PolarTransformScene(Scene):
+# Make the analysis package importable when manim runs this file directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis.binning import angular_bin_indices, bin_statistics
+from analysis.instrument import traced
+from analysis.polar_strip import StripGeometry
+from code_snippets import code_block, snippet
+from grids import CartesianGrid, PolarGrid
+from pixel_cloud import FadeInPixels, PixelCloud, PixelCloudCamera, intensity_rgbas
+from render_cache import PartialCacheMixin
+from static_layer import StaticLayerMixin
+from tex_cache import GlyphCacheMixin
+
+class PolarTransformScene(StaticLayerMixin, PartialCacheMixin, GlyphCacheMixin, Scene):
+    def __init__(self, **kwargs):
+        # Draws the PixelClouds in one batch per frame
+        kwargs.setdefault("camera_class", PixelCloudCamera)
+        super().__init__(**kwargs)
+
+    @traced(category="render")
     def construct(self):
         # Title
         title = Text("From Pixels to Polar Coordinates", font_size=44, color=BLUE)
@@ -19,39 +39,17 @@ class PolarTransformScene(Scene):
         grid_size = 7
         cell_size = 0.6
         
-        # Create grid lines
-        grid = VGroup()
-        for i in range(grid_size + 1):
-            # Vertical lines
-            v_line = Line(
-                [i * cell_size - grid_size * cell_size / 2, -grid_size * cell_size / 2, 0],
-                [i * cell_size - grid_size * cell_size / 2, grid_size * cell_size / 2, 0],
-                color=GRAY, stroke_width=1
-            )
-            grid.add(v_line)
-            
-            # Horizontal lines
-            h_line = Line(
-                [-grid_size * cell_size / 2, i * cell_size - grid_size * cell_size / 2, 0],
-                [grid_size * cell_size / 2, i * cell_size - grid_size * cell_size / 2, 0],
-                color=GRAY, stroke_width=1
-            )
-            grid.add(h_line)
+        # Create grid lines (one path for all of them)
+        grid = CartesianGrid(grid_size, cell_size=cell_size, color=GRAY, stroke_width=1)
         
         # Create dots representing pixels (one per cell)
-        pixels = VGroup()
         np.random.seed(42)
-        for i in range(grid_size):
-            for j in range(grid_size):
-                x = (i + 0.5) * cell_size - grid_size * cell_size / 2
-                y = (j + 0.5) * cell_size - grid_size * cell_size / 2
-                # Vary dot size slightly to represent different intensities
-                intensity = np.random.uniform(0.5, 1.0)
-                dot = Dot([x, y, 0], radius=0.08 * intensity, color=interpolate_color(BLUE_E, WHITE, intensity))
-                pixels.add(dot)
+        # Vary dot size slightly to represent different intensities
+        intensities = np.random.uniform(0.5, 1.0, (grid_size, grid_size))
+        pixels = PixelCloud.from_grid(intensities, cell_size, radius=0.08)
         
         self.play(Create(grid), run_time=1.5)
-        self.play(FadeIn(pixels, lag_ratio=0.02), run_time=2)
+        self.play(FadeInPixels(pixels, lag_ratio=0.02), run_time=2)
         self.wait(2)  # NARRATION: "Arranged in a regular Cartesian grid"
         
         # ===== PART 2: Show circular strip passing through grid =====
@@ -80,14 +78,11 @@ class PolarTransformScene(Scene):
         self.wait(2)  # NARRATION: "But our circular strip doesn't align with the Cartesian grid"
         
         # Highlight pixels that fall in the strip
-        strip_pixels = VGroup()
-        for dot in pixels:
-            dist = np.linalg.norm(dot.get_center()[:2])
-            if radius - strip_width/2 <= dist <= radius + strip_width/2:
-                strip_pixels.add(dot)
+        dist = np.linalg.norm(pixels.points[:, :2], axis=1)
+        in_strip = (radius - strip_width/2 <= dist) & (dist <= radius + strip_width/2)
         
         self.play(
-            *[dot.animate.set_color(RED).scale(1.3) for dot in strip_pixels],
+            pixels.animate.highlight(in_strip, color=RED, scale=1.3),
             run_time=1.5
         )
         self.wait(2)  # NARRATION: "Making it difficult to extract accurate intensity values"
@@ -108,28 +103,6 @@ class PolarTransformScene(Scene):
         self.play(Write(subtitle3), run_time=1)
         self.wait(1.5)  # NARRATION: "So we transform to polar coordinates"
         
-        # Show transformation code
-        transform_code_text = """y, x = np.indices(image_gray.shape)
-
-r = np.sqrt((x - center[0])**2 + (y - center[1])**2)
-theta = np.arctan2(y - center[1], x - center[0])
-theta_deg = (np.degrees(theta) + 360) % 360
-
-half_width = strip_width / 2
-strip_mask = (r >= radius - half_width) & 
-             (r <= radius + half_width)
-
-theta_strip = theta_deg[strip_mask]
-intensity_strip = image_gray[strip_mask]"""
-        
-        transform_code = Code(
-            code_string=transform_code_text,
-            language="python",
-            tab_width=4,
-            background="window",
-            formatter_style="monokai"
-        ).scale(0.55).shift(DOWN * 0.5)
-        
         self.play(FadeOut(subtitle3), run_time=0.5)
         
         # ===== COORDINATE TRANSFORMATION WITH LABELED ANIMATION =====
@@ -137,26 +110,9 @@ intensity_strip = image_gray[strip_mask]"""
         transform_title.next_to(title, DOWN, buff=0.2)
         self.play(Write(transform_title), run_time=1)
         
-        # Show transformation code FIRST
-        transform_code_text = """y, x = np.indices(image_gray.shape)
-
-r = np.sqrt((x - center[0])**2 + (y - center[1])**2)
-theta = np.arctan2(y - center[1], x - center[0])
-theta_deg = (np.degrees(theta) + 360) % 360
-
-half_width = strip_width / 2
-strip_mask = (r >= radius - half_width) & 
-             (r <= radius + half_width)
-
-theta_strip = theta_deg[strip_mask]
-intensity_strip = image_gray[strip_mask]"""
-        
-        transform_code = Code(
-            code_string=transform_code_text,
-            language="python",
-            tab_width=4,
-            background="window",
-            formatter_style="monokai"
+        # Show transformation code FIRST (analysis.polar_strip.StripGeometry)
+        transform_code = code_block(
+            snippet(StripGeometry.__init__, start="dy = np.arange", end="self.theta_deg")
         ).scale(0.5).to_edge(LEFT, buff=0.3).shift(DOWN * 0.5)
         
         self.play(FadeIn(transform_code, shift=UP), run_time=1.5)
@@ -167,24 +123,8 @@ intensity_strip = image_gray[strip_mask]"""
         offset_right_grid = RIGHT * 3 + DOWN * 0.5
         cart_grid_size = 5
         cart_cell_size = 0.5
-        cart_grid_anim = VGroup()
-        
-        for i in range(cart_grid_size + 1):
-            # Vertical lines
-            v_line = Line(
-                offset_right_grid + [i * cart_cell_size - cart_grid_size * cart_cell_size / 2, -cart_grid_size * cart_cell_size / 2, 0],
-                offset_right_grid + [i * cart_cell_size - cart_grid_size * cart_cell_size / 2, cart_grid_size * cart_cell_size / 2, 0],
-                color=BLUE_D, stroke_width=2
-            )
-            cart_grid_anim.add(v_line)
-            
-            # Horizontal lines
-            h_line = Line(
-                offset_right_grid + [-cart_grid_size * cart_cell_size / 2, i * cart_cell_size - cart_grid_size * cart_cell_size / 2, 0],
-                offset_right_grid + [cart_grid_size * cart_cell_size / 2, i * cart_cell_size - cart_grid_size * cart_cell_size / 2, 0],
-                color=BLUE_D, stroke_width=2
-            )
-            cart_grid_anim.add(h_line)
+        cart_grid_anim = CartesianGrid(cart_grid_size, cell_size=cart_cell_size,
+                                       center=offset_right_grid, color=BLUE_D, stroke_width=2)
         
         # Axis labels: x at BOTTOM, y at LEFT
         x_axis_label = MathTex("x", color=WHITE).next_to(
@@ -197,22 +137,19 @@ intensity_strip = image_gray[strip_mask]"""
         self.play(Create(cart_grid_anim), Write(x_axis_label), Write(y_axis_label), run_time=1.5)
         self.wait(1.5)
         
-        # Create POLAR grid (target) with labels
-        polar_grid_anim = VGroup()
+        # Create POLAR grid (target) with labels; its 8 spokes + 4 rings pair
+        # up with the 12 lines of the Cartesian grid in the transform
         n_radial_labeled = 8
         n_circles_labeled = 4
         polar_radius_anim = 1.3
+        polar_grid_anim = PolarGrid(polar_radius_anim, n_spokes=n_radial_labeled,
+                                    n_rings=n_circles_labeled, center=offset_right_grid,
+                                    color=ORANGE, stroke_width=2)
         
-        # Radial lines with theta labels
+        # Theta labels on the radial lines
         theta_labels = VGroup()
         for i in range(n_radial_labeled):
             angle = i * 2 * np.pi / n_radial_labeled
-            line = Line(
-                offset_right_grid,
-                offset_right_grid + polar_radius_anim * np.array([np.cos(angle), np.sin(angle), 0]),
-                color=ORANGE, stroke_width=2
-            )
-            polar_grid_anim.add(line)
             
             # Label every other radial line to avoid crowding
             if i % 2 == 0:
@@ -220,12 +157,10 @@ intensity_strip = image_gray[strip_mask]"""
                 theta_label = MathTex(f"\\theta_{{{i//2 + 1}}}", color=ORANGE).move_to(label_pos).scale(0.5)
                 theta_labels.add(theta_label)
         
-        # Concentric circles with r labels
+        # r labels on the concentric circles
         r_labels = VGroup()
         for i in range(1, n_circles_labeled + 1):
             r = i * polar_radius_anim / n_circles_labeled
-            circle = Circle(radius=r, color=ORANGE, stroke_width=2).move_to(offset_right_grid)
-            polar_grid_anim.add(circle)
             
             # Label on the right side
             label_pos = offset_right_grid + RIGHT * (r + 0.15)
@@ -267,37 +202,17 @@ intensity_strip = image_gray[strip_mask]"""
         left_label.shift(LEFT * 3.5 + UP * 2.5)  # ABOVE the figure
         
         # Identical to the beginning - same size, same position
-        cart_grid_left = VGroup()
         grid_size = 7
         cell_size = 0.6
         offset_left = LEFT * 3.5
-        
-        for i in range(grid_size + 1):
-            v_line = Line(
-                offset_left + [i * cell_size - grid_size * cell_size / 2, -grid_size * cell_size / 2, 0],
-                offset_left + [i * cell_size - grid_size * cell_size / 2, grid_size * cell_size / 2, 0],
-                color=GRAY, stroke_width=1
-            )
-            cart_grid_left.add(v_line)
-            
-            h_line = Line(
-                offset_left + [-grid_size * cell_size / 2, i * cell_size - grid_size * cell_size / 2, 0],
-                offset_left + [grid_size * cell_size / 2, i * cell_size - grid_size * cell_size / 2, 0],
-                color=GRAY, stroke_width=1
-            )
-            cart_grid_left.add(h_line)
+        cart_grid_left = CartesianGrid(grid_size, cell_size=cell_size, center=offset_left,
+                                       color=GRAY, stroke_width=1)
         
         # Pixels - identical to beginning
-        pixels_cart_left = VGroup()
         np.random.seed(42)
-        for i in range(grid_size):
-            for j in range(grid_size):
-                x = (i + 0.5) * cell_size - grid_size * cell_size / 2
-                y = (j + 0.5) * cell_size - grid_size * cell_size / 2
-                intensity = np.random.uniform(0.5, 1.0)
-                dot = Dot(offset_left + [x, y, 0], radius=0.08 * intensity, 
-                         color=interpolate_color(BLUE_E, WHITE, intensity))
-                pixels_cart_left.add(dot)
+        intensities = np.random.uniform(0.5, 1.0, (grid_size, grid_size))
+        pixels_cart_left = PixelCloud.from_grid(intensities, cell_size, center=offset_left,
+                                                radius=0.08)
         
         # Circular strip - identical to beginning
         strip_radius_left = 1.8
@@ -313,18 +228,16 @@ intensity_strip = image_gray[strip_mask]"""
         ).shift(offset_left)
         
         # Highlight pixels in strip
-        strip_pixels_left = VGroup()
-        for dot in pixels_cart_left:
-            dist = np.linalg.norm((dot.get_center() - offset_left)[:2])
-            if strip_radius_left - strip_width_left/2 <= dist <= strip_radius_left + strip_width_left/2:
-                strip_pixels_left.add(dot)
+        dist = np.linalg.norm((pixels_cart_left.points - offset_left)[:, :2], axis=1)
+        in_strip_left = ((strip_radius_left - strip_width_left/2 <= dist)
+                         & (dist <= strip_radius_left + strip_width_left/2))
         
         self.play(Write(left_label), run_time=0.8)
         self.play(Create(cart_grid_left), run_time=1)
-        self.play(FadeIn(pixels_cart_left, lag_ratio=0.02), run_time=1.5)
+        self.play(FadeInPixels(pixels_cart_left, lag_ratio=0.02), run_time=1.5)
         self.play(Create(strip_outer_left), Create(strip_inner_left), FadeIn(strip_fill_left), run_time=1)
         self.play(
-            *[dot.animate.set_color(RED).scale(1.3) for dot in strip_pixels_left],
+            pixels_cart_left.animate.highlight(in_strip_left, color=RED, scale=1.3),
             run_time=1
         )
         self.wait(2)  # NARRATION: "On the left: the circular strip on Cartesian grid - poor alignment"
@@ -334,20 +247,12 @@ intensity_strip = image_gray[strip_mask]"""
         right_label.shift(RIGHT * 3.5 + UP * 2.5)  # ABOVE the figure
         
         offset_right = RIGHT * 3.5
-        polar_grid_right = VGroup()
         n_angle_bins = 12
         radius_display = 1.8
         
         # Radial lines
-        for i in range(n_angle_bins):
-            angle = i * 2 * np.pi / n_angle_bins
-            line = Line(
-                offset_right,
-                offset_right + radius_display * np.array([np.cos(angle), np.sin(angle), 0]),
-                color=BLUE_D,
-                stroke_width=1.5
-            )
-            polar_grid_right.add(line)
+        polar_grid_right = PolarGrid(radius_display, n_spokes=n_angle_bins, n_rings=0,
+                                     center=offset_right, color=BLUE_D, stroke_width=1.5)
         
         # Circular strip in polar
         strip_r_min = radius_display * 0.75
@@ -367,31 +272,20 @@ intensity_strip = image_gray[strip_mask]"""
         self.play(Create(strip_inner_right), Create(strip_outer_right), FadeIn(strip_fill_right), run_time=1)
         self.wait(1)
         
-        # Show pixels falling into polar cells
-        pixels_polar = VGroup()
+        # Show pixels falling into polar cells: 4-7 random pixels per bin
         np.random.seed(42)
+        pixel_bins = np.repeat(np.arange(n_angle_bins), np.random.randint(4, 8, n_angle_bins))
+        r = np.random.uniform(strip_r_min, strip_r_max, len(pixel_bins))
+        theta = (pixel_bins + np.random.uniform(0, 1, len(pixel_bins))) * 2 * np.pi / n_angle_bins
+        pixel_intensity = np.random.uniform(0.2, 1.0, len(pixel_bins))
+        
+        pixels_polar = PixelCloud(
+            offset_right + np.column_stack([r * np.cos(theta), r * np.sin(theta), np.zeros_like(r)]),
+            radii=0.06,
+            colors=intensity_rgbas(pixel_intensity, BLUE_E, YELLOW)
+        )
         
-        for i in range(n_angle_bins):
-            angle_start = i * 2 * np.pi / n_angle_bins
-            angle_end = (i + 1) * 2 * np.pi / n_angle_bins
-            
-            n_pixels = np.random.randint(4, 8)
-            for _ in range(n_pixels):
-                r = np.random.uniform(strip_r_min, strip_r_max)
-                theta = np.random.uniform(angle_start, angle_end)
-                
-                x = r * np.cos(theta)
-                y = r * np.sin(theta)
-                
-                intensity = np.random.uniform(0.2, 1.0)
-                pixel_dot = Dot(
-                    offset_right + np.array([x, y, 0]),
-                    radius=0.06,
-                    color=interpolate_color(BLUE_E, YELLOW, intensity)
-                )
-                pixels_polar.add(pixel_dot)
-        
-        self.play(FadeIn(pixels_polar, lag_ratio=0.02), run_time=2)
+        self.play(FadeInPixels(pixels_polar, lag_ratio=0.02), run_time=2)
         self.wait(2.5)  # NARRATION: "On the right: pixels naturally organize into angular bins"
         
         # ===== PART 5: Averaging/Binning =====
@@ -431,30 +325,19 @@ intensity_strip = image_gray[strip_mask]"""
         
         strip_r_avg = (strip_r_min + strip_r_max) / 2
         
-        # Store intensities for each bin to create variation
-        np.random.seed(42)
-        bin_intensities = np.random.uniform(0.3, 0.95, n_angle_bins)
+        # Bin the pixels exactly like the analysis does: angle of every
+        # pixel center once, then bincount means per angular bin
+        px, py = (pixels_polar.points - offset_middle)[:, :2].T
+        pixel_angles = np.degrees(np.arctan2(py, px)) % 360
+        angle_bins = angular_bin_indices(pixel_angles, n_angle_bins)
+        bin_stats = bin_statistics(pixel_intensity, angle_bins, n_angle_bins, minmax=False)
         
         for i in range(n_angle_bins):
-            angle_start = i * 2 * np.pi / n_angle_bins
-            angle_end = (i + 1) * 2 * np.pi / n_angle_bins
-            angle_center = (angle_start + angle_end) / 2
+            angle_center = (i + 0.5) * 2 * np.pi / n_angle_bins
             
-            # Find pixels in this angular bin
-            bin_pixels = []
-            for pixel in pixels_polar:
-                px, py = (pixel.get_center() - offset_middle)[:2]
-                pixel_angle = np.arctan2(py, px)
-                if pixel_angle < 0:
-                    pixel_angle += 2 * np.pi
-                
-                # Check if pixel is in this angular bin
-                if angle_start <= pixel_angle < angle_end:
-                    bin_pixels.append(pixel)
-            
-            if bin_pixels:
-                # Use the pre-generated intensity for this bin
-                avg_intensity = bin_intensities[i]
+            if bin_stats.count[i] > 0:
+                # Mean intensity of the pixels in this bin
+                avg_intensity = bin_stats.mean[i]
                 
                 # Color based on intensity
                 avg_color = interpolate_color(BLUE_E, YELLOW, avg_intensity)
@@ -491,7 +374,7 @@ intensity_strip = image_gray[strip_mask]"""
         )
         self.wait(2)  # NARRATION: "This variation represents the actual finger pattern"
         
-        # Show binned_statistic code
+        # Show the binning code (analysis.binning)
         # IMPORTANT: Fade out right_label (Polar Solution title) with the polar figure
         self.play(
             FadeOut(right_label),  # Title vanishes with the figure
@@ -508,26 +391,13 @@ intensity_strip = image_gray[strip_mask]"""
         code_title.next_to(title, DOWN, buff=0.5)
         self.play(Write(code_title), run_time=1)
         
-        binning_code_text = """from scipy import stats
-
-bin_means, bin_edges, _ = stats.binned_statistic(
-    theta_strip,
-    intensity_strip,
-    statistic='mean',
-    bins=n_bins,
-    range=(0, 360)
-)"""
-        
-        binning_code = Code(
-            code_string=binning_code_text,
-            language="python",
-            tab_width=4,
-            background="window",
-            formatter_style="monokai"
+        binning_code = code_block(
+            snippet(angular_bin_indices) + "\n\n"
+            + snippet(bin_statistics, start="sums = np.bincount", end="mean = sums / count")
         ).scale(0.7).shift(DOWN * 0.8)
         
         self.play(FadeIn(binning_code, shift=UP), run_time=1.5)
-        self.wait(3)  # NARRATION: "Using scipy's binned_statistic to compute the mean intensity per angular bin"
+        self.wait(3)  # NARRATION: "Each angle gets a bin index, and one bincount pass gives the mean intensity per angular bin"
         
         # Final fade
         self.play(*[FadeOut(mob) for mob in self.mobjects], run_time=1)
@@ -1,18 +1,53 @@
 from manim import *
+import math
 import numpy as np
+import os
+import sys
+from pathlib import Path
 
-class ResultsScene(Scene):
+# Make the analysis package importable when manim runs this file directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis.instrument import traced
+from analysis.results import ProfileResult
+from render_cache import PartialCacheMixin
+from static_layer import StaticLayerMixin
+from tex_cache import GlyphCacheMixin
+
+
+def nice_range(low, high, n_ticks=4):
+    """
+    Axis range covering [low, high] with about `n_ticks` round tick steps
+
+    Returns:
+        (start, stop, step) with step 1, 2 or 5 times a power of ten
+    """
+    span = (high - low) or abs(high) or 1.0
+    raw_step = span / n_ticks
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step)
+    return math.floor(low / step) * step, math.ceil(high / step) * step, step
+
+
+class ResultsScene(StaticLayerMixin, PartialCacheMixin, GlyphCacheMixin, Scene):
+    # Frame ('d4_T20_1') or run ('d4_T20') to show; SC_RESULTS_FRAME overrides it
+    result_id = "d4_T20_1"
+
+    @traced(category="render")
     def construct(self):
+        # Loaded from the results store (analyzed there on a miss) on first use
+        result = ProfileResult(os.environ.get("SC_RESULTS_FRAME", self.result_id))
+
         # Title
         title = Text("The Result: Intensity vs Angle", font_size=42, color=BLUE)
         self.play(Write(title), run_time=1.5)
         self.wait(1)
         self.play(title.animate.scale(0.65).to_edge(UP, buff=0.2), run_time=0.8)
 
-        # Create axes
+        # Create axes - the intensity range comes from the data
+        y_start, y_stop, y_step = nice_range(*result.value_range)
         axes = Axes(
             x_range=[0, 360, 60],
-            y_range=[50, 210, 50],
+            y_range=[y_start, y_stop + 0.2 * y_step, y_step],
             x_length=10,
             y_length=5,
             axis_config={
@@ -25,7 +60,7 @@ class ResultsScene(Scene):
                 "numbers_to_include": [0, 60, 120, 180, 240, 300, 360]
             },
             y_axis_config={
-                "numbers_to_include": [50, 100, 150, 200]
+                "numbers_to_include": np.arange(y_start, y_stop + y_step / 2, y_step)
             }
         ).shift(RIGHT * 0.8 + UP * 0.3)
         
@@ -37,31 +72,10 @@ class ResultsScene(Scene):
         self.play(Write(x_label), Write(y_label), run_time=1)
         self.wait(1)  # NARRATION: "Here's the final result - intensity as a function of angle"
         
-        # Generate realistic intensity data with oscillations (finger pattern)
-        np.random.seed(42)
-        n_points = 200
-        angles = np.linspace(0, 360, n_points)
-        
-        # Create oscillating pattern with ~8 fingers (peaks)
-        n_fingers = 8
-        base_intensity = 130
-        amplitude = 25
-        noise_level = 8
-        
-        # Main oscillation + harmonics + noise
-        intensity = (base_intensity + 
-                    amplitude * np.sin(n_fingers * angles * np.pi / 180) +
-                    amplitude * 0.3 * np.sin(2 * n_fingers * angles * np.pi / 180 - 0.5) +
-                    noise_level * np.random.randn(n_points))
-        
-        # Smooth the noise a bit
-        from scipy.ndimage import gaussian_filter1d
-        intensity = gaussian_filter1d(intensity, sigma=2)
-        
         # Create the plot
         plot = axes.plot_line_graph(
-            x_values=angles,
-            y_values=intensity,
+            x_values=result.angles,
+            y_values=result.profile,
             line_color=YELLOW,
             stroke_width=3,
             add_vertex_dots=False
@@ -71,29 +85,25 @@ class ResultsScene(Scene):
         self.play(Create(plot), run_time=4, rate_func=linear)
         self.wait(2)  # NARRATION: "Notice the oscillating pattern - these peaks represent the finger structures"
         
-        # Highlight a few peaks
-        peak_indices = []
-        for i in range(1, len(intensity) - 1):
-            if intensity[i] > intensity[i-1] and intensity[i] > intensity[i+1]:
-                if intensity[i] > base_intensity + amplitude * 0.3:  # Only significant peaks
-                    peak_indices.append(i)
-        
-        # Mark some peaks
+        # Mark the peaks - the curve is periodic, so a finger at 0/360 counts once
         peak_dots = VGroup()
-        for idx in peak_indices:  # Every other peak to avoid crowding
-            if idx < len(angles):
-                peak_dot = Dot(
-                    axes.c2p(angles[idx], intensity[idx]),
-                    color=RED,
-                    radius=0.08
-                )
-                peak_dots.add(peak_dot)
+        for angle, height in zip(result.peaks.angle_deg, result.peaks.height):
+            peak_dot = Dot(
+                axes.c2p(angle, height),
+                color=RED,
+                radius=0.08
+            )
+            peak_dots.add(peak_dot)
         
         self.play(FadeIn(peak_dots, lag_ratio=0.1), run_time=1.5)
         self.wait(1.5)  # NARRATION: "Each peak corresponds to a finger in the instability pattern"
         
-        # Add annotation
-        finger_count = Text(f"~{n_fingers} fingers detected", font_size=28, color=GREEN)
+        # Add annotation - one finger per marked peak, next to the strongest
+        # Fourier mode of the curve (they differ when fingers are uneven)
+        finger_count = VGroup(
+            Text(f"~{result.n_fingers} fingers detected", font_size=28, color=GREEN),
+            Text(f"Dominant Fourier mode: m = {result.dominant_mode}", font_size=22, color=GREEN_B),
+        ).arrange(DOWN, aligned_edge=RIGHT, buff=0.15)
         finger_count.to_edge(RIGHT, buff=1).shift(UP * 2)
         self.play(FadeIn(finger_count, shift=LEFT), run_time=1)
         self.wait(2)
@@ -0,0 +1,151 @@
+"""
+Smaller moving set for manim's static background layer
+
+With the Cairo renderer, every `play` splits the scene into moving and
+static mobjects, draws the static ones once into a background image and
+redraws only the moving ones on top of it for each frame. The split is
+coarse: to keep the stacking order, every mobject drawn after the first
+animated one counts as moving. A title that is animated once at the start
+of a slide makes the axes, code blocks and grids added later "moving" for
+the rest of the scene, and all of them are redrawn 60 times per second.
+
+StaticLayerMixin makes the split exact. A mobject is moving when an
+animation, an updater or the foreground list touches it (as before), or
+when it is drawn above a moving mobject *and* their bounding boxes overlap;
+everything else stays in the background image. Bounding boxes of the moving
+mobjects are checked again on every frame; when a moving mobject reaches a
+background mobject it has to stay below, that mobject joins the moving set
+and the background is drawn again. Frames are identical to manim's; only
+fewer paths are drawn per frame.
+
+    class ResultsScene(StaticLayerMixin, Scene):
+        ...
+
+Set `static_layer = False` on a scene class to get manim's behavior back.
+"""
+
+import numpy as np
+from manim import config
+from manim.utils.family import extract_mobject_family_members
+from manim.utils.iterables import list_update
+
+# Extra margin around bounding boxes, in pixels (anti-aliasing)
+PIXEL_MARGIN = 2
+
+
+def _margin(mobject):
+    """How far a mobject's drawing can reach beyond its points, in scene units"""
+    width = max(getattr(mobject, "stroke_width", 0) or 0,
+                getattr(mobject, "background_stroke_width", 0) or 0)
+    radii = getattr(mobject, "radii", None)
+    reach = 0.01 * float(np.max(width))
+    if radii is not None and len(radii):
+        reach += float(np.max(radii))
+    return reach + PIXEL_MARGIN * config.frame_width / config.pixel_width
+
+
+def bounding_boxes(mobjects):
+    """
+    Screen-space boxes of the mobjects' own points, padded by their stroke
+
+    Returns:
+        (n, 4) array of (x_min, y_min, x_max, y_max); mobjects without
+        points get an empty box that overlaps nothing
+    """
+    boxes = np.empty((len(mobjects), 4))
+    boxes[:, :2] = np.inf
+    boxes[:, 2:] = -np.inf
+    for i, mobject in enumerate(mobjects):
+        points = mobject.points
+        if len(points) == 0:
+            continue
+        margin = _margin(mobject)
+        boxes[i, :2] = points[:, :2].min(axis=0) - margin
+        boxes[i, 2:] = points[:, :2].max(axis=0) + margin
+    return boxes
+
+
+def _overlaps(boxes_a, boxes_b):
+    """(len(a), len(b)) matrix of box intersections"""
+    return ((boxes_a[:, None, 0] <= boxes_b[None, :, 2])
+            & (boxes_b[None, :, 0] <= boxes_a[:, None, 2])
+            & (boxes_a[:, None, 1] <= boxes_b[None, :, 3])
+            & (boxes_b[None, :, 1] <= boxes_a[:, None, 3]))
+
+
+class StaticLayerMixin:
+    """Scene mixin keeping every mobject the animations cannot affect in the background"""
+
+    static_layer = True
+
+    def get_moving_and_static_mobjects(self, animations):
+        if not self.static_layer:
+            return super().get_moving_and_static_mobjects(animations)
+
+        drawn = extract_mobject_family_members(
+            list_update(self.mobjects, self.foreground_mobjects),
+            use_z_index=self.renderer.camera.use_z_index,
+            only_those_with_points=True,
+        )
+        animated = [animation.mobject for animation in animations]
+        touched = set()
+        for mobject in self.get_mobject_family_members():
+            if (any(mobject is other for other in animated)
+                    or mobject.get_family_updaters()
+                    or any(mobject is other for other in self.foreground_mobjects)):
+                touched.update(id(member) for member in mobject.get_family())
+
+        self._layer_order = drawn
+        self._layer_moving = np.array([id(mobject) in touched for mobject in drawn], dtype=bool)
+        self._layer_static_boxes = bounding_boxes(drawn)
+        self._update_layers()
+        return self._split_layers()
+
+    def _split_layers(self):
+        moving = [m for m, is_moving in zip(self._layer_order, self._layer_moving) if is_moving]
+        static = [m for m, is_moving in zip(self._layer_order, self._layer_moving) if not is_moving]
+        return moving, static
+
+    def _update_layers(self):
+        """
+        Move static mobjects drawn above an overlapping moving one into the
+        moving set, until no static mobject is left above one it overlaps
+
+        Returns:
+            True if the moving set grew
+        """
+        grew = False
+        while True:
+            moving_index = np.flatnonzero(self._layer_moving)
+            static_index = np.flatnonzero(~self._layer_moving)
+            if len(moving_index) == 0:
+                return grew
+            # Only static mobjects above the lowest moving one can be affected
+            static_index = static_index[static_index > moving_index[0]]
+            if len(static_index) == 0:
+                return grew
+
+            moving_boxes = bounding_boxes([self._layer_order[i] for i in moving_index])
+            conflicts = (_overlaps(self._layer_static_boxes[static_index], moving_boxes)
+                         & (static_index[:, None] > moving_index[None, :]))
+            promoted = static_index[conflicts.any(axis=1)]
+            if len(promoted) == 0:
+                return grew
+            # A promoted mobject is redrawn on top, so it can conflict in turn
+            self._layer_moving[promoted] = True
+            grew = True
+
+    def update_to_time(self, t):
+        super().update_to_time(t)
+        if (not self.static_layer or getattr(self, "_layer_order", None) is None
+                or self.renderer.skip_animations):
+            return
+        if self._update_layers():
+            self.moving_mobjects, self.static_mobjects = self._split_layers()
+            self.renderer.save_static_frame_data(self, self.static_mobjects)
+
+    def play_internal(self, skip_rendering=False):
+        try:
+            super().play_internal(skip_rendering)
+        finally:
+            self._layer_order = None
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Batched LaTeX compilation and a binary cache of parsed SVG paths
+
+manim turns every MathTex/Tex expression into `<hash>.tex`, runs one LaTeX
+process and one dvisvgm process for it and stores `<hash>.svg` in the Tex
+directory; every Text becomes an SVG in the texts directory. Each SVG is
+then parsed from XML again in every process that shows it. render_all.py
+gives every scene its own media directory, so a cold build pays all of this
+once per scene.
+
+This module removes both costs:
+
+- A pre-pass reads the scene files (without importing them), gathers the
+  MathTex/Tex expressions they use, including f-strings inside `for ...
+  in range(...)` loops and the digits of numbered axes, and compiles all
+  missing ones in a single LaTeX run, one page per expression
+  (`standalone` in multi-page mode). dvisvgm splits the pages and every
+  page is stored under manim's own file name, `<hash>.svg`, in
+  `.cache/tex/`. From there the SVGs are linked into the Tex directory of
+  each scene, where manim finds them and skips compilation. Expressions
+  the pre-pass cannot see are still compiled by manim on demand.
+- The submobjects parsed from an SVG (points and colors) are stored as
+  `.npz` files in `.cache/svg_paths/`, keyed by the SVG content and the
+  parse options. Warm runs load the arrays instead of parsing the XML.
+
+render_all.py runs the pre-pass before rendering. Scenes opt in to the
+path cache with the mixin:
+
+    from tex_cache import GlyphCacheMixin
+
+    class ResultsScene(GlyphCacheMixin, Scene):
+        ...
+
+Usage:
+    python tex_cache.py precompile                       # all scenes, into media/Tex
+    python tex_cache.py precompile scenes/scene3.py --tex-dir media/Tex
+    python tex_cache.py stats
+"""
+
+import argparse
+import ast
+import glob
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCENES_DIR = os.path.join(ROOT, "scenes")
+TEX_CACHE_DIR = os.environ.get("SC_TEX_CACHE", os.path.join(ROOT, ".cache", "tex"))
+PATH_CACHE_DIR = os.environ.get("SC_SVG_PATH_CACHE", os.path.join(ROOT, ".cache", "svg_paths"))
+
+# Tex classes and their default environment and argument separator
+TEX_CLASSES = {
+    "MathTex": ("align*", " "),
+    "SingleStringMathTex": ("align*", " "),
+    "Tex": ("center", ""),
+}
+# Names that make manim typeset numbers digit by digit (one MathTex per character)
+NUMBER_HINTS = {"include_numbers", "numbers_to_include", "add_coordinates",
+                "DecimalNumber", "Integer"}
+NUMBER_CHARACTERS = list("0123456789-.")
+
+# Page environment of the batch document
+PAGE_ENV = "manimpage"
+_DOCUMENTCLASS = re.compile(r"\\documentclass\[([^\]]*)\]\{standalone\}")
+_PAGE_FILE = re.compile(r"-(\d+)\.svg$")
+
+
+class _TexCalls(ast.NodeVisitor):
+    """Collects the expressions of Tex calls in one module"""
+
+    def __init__(self, constants):
+        self.constants = constants
+        self.loops = []
+        self.expressions = []
+        self.numbers = False
+
+    def visit_For(self, node):
+        values = self._range_values(node.iter)
+        if isinstance(node.target, ast.Name) and values is not None:
+            self.loops.append((node.target.id, values))
+            self.generic_visit(node)
+            self.loops.pop()
+        else:
+            self.generic_visit(node)
+
+    def visit_Name(self, node):
+        self.numbers |= node.id in NUMBER_HINTS
+
+    def visit_Constant(self, node):
+        self.numbers |= node.value in NUMBER_HINTS
+
+    def visit_keyword(self, node):
+        self.numbers |= node.arg in NUMBER_HINTS
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        name = getattr(node.func, "id", getattr(node.func, "attr", None))
+        if name in TEX_CLASSES:
+            environment, separator = TEX_CLASSES[name]
+            options = {keyword.arg: keyword.value for keyword in node.keywords}
+            environment = self._constant(options.get("tex_environment"), environment)
+            separator = self._constant(options.get("arg_separator"), separator)
+            for strings in self._argument_values(node.args):
+                self._add(strings, separator, environment)
+        self.generic_visit(node)
+
+    def _add(self, strings, separator, environment):
+        # MathTex splits {{ ... }} groups and compiles the parts on their own too
+        parts = [part for string in strings for part in re.split("{{(.*?)}}", string) if part]
+        self.expressions.append((separator.join(parts), environment))
+        if len(parts) > 1:
+            self.expressions.extend((part, environment) for part in parts if part.strip())
+
+    def _constant(self, node, default):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        return default
+
+    def _range_values(self, node):
+        """Values of `range(...)` with constant bounds, else None"""
+        if not (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "range"):
+            return None
+        try:
+            return list(range(*(self._evaluate(arg, {}) for arg in node.args)))
+        except Exception:
+            return None
+
+    def _evaluate(self, node, bindings):
+        code = compile(ast.Expression(node), "<scene>", "eval")
+        return eval(code, {"__builtins__": {}}, {**self.constants, **bindings})
+
+    def _argument_values(self, args):
+        """Every combination of argument strings over the enclosing loops"""
+        if not args or not all(isinstance(arg, (ast.Constant, ast.JoinedStr)) for arg in args):
+            return []
+        names = [name for name, _ in self.loops]
+        combinations = itertools.product(*(values for _, values in self.loops))
+        results = []
+        for combination in combinations:
+            try:
+                strings = [self._evaluate(arg, dict(zip(names, combination))) for arg in args]
+            except Exception:
+                return results
+            if all(isinstance(string, str) for string in strings) and strings not in results:
+                results.append(strings)
+        return results
+
+
+def _module_constants(tree):
+    """Names assigned a single int, float or str literal anywhere in the module"""
+    constants = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, (int, float, str))):
+            constants[node.targets[0].id] = node.value.value
+    return constants
+
+
+def collect_expressions(path):
+    """
+    Tex expressions a scene file will typeset, found without importing it
+
+    Args:
+        path: Scene file
+
+    Returns:
+        List of unique (expression, environment) pairs in source order
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    visitor = _TexCalls(_module_constants(tree))
+    visitor.visit(tree)
+    expressions = visitor.expressions
+    if visitor.numbers:
+        expressions += [(character, "align*") for character in NUMBER_CHARACTERS]
+    return list(dict.fromkeys(expressions))
+
+
+def tex_sources(expressions, tex_template=None):
+    """
+    The .tex files manim would write for the expressions
+
+    Returns:
+        Dict of manim's file stem (hash) to the LaTeX source
+    """
+    from manim import config
+    from manim.mobject.text.tex_mobject import SingleStringMathTex
+    from manim.utils.tex_file_writing import tex_hash
+
+    if tex_template is None:
+        tex_template = config["tex_template"]
+    # Only the string handling of the class is needed, not a compiled mobject
+    modifier = SingleStringMathTex.__new__(SingleStringMathTex)
+    sources = {}
+    for expression, environment in expressions:
+        modified = modifier._get_modified_expression(expression)
+        if environment is not None:
+            source = tex_template.get_texcode_for_expression_in_env(modified, environment)
+        else:
+            source = tex_template.get_texcode_for_expression(modified)
+        sources[tex_hash(source)] = source
+    return sources
+
+
+def batch_document(sources):
+    """
+    One LaTeX document with a page per source, or None
+
+    All sources must share their preamble and use the `standalone` class
+    (manim's default templates do); the class is switched to multi-page
+    mode, which crops every page like a single document.
+    """
+    preambles, bodies = set(), []
+    for source in sources:
+        preamble, _, rest = source.partition("\\begin{document}")
+        body, found, _ = rest.rpartition("\\end{document}")
+        if not found:
+            return None
+        preambles.add(preamble)
+        bodies.append(body.strip("\n"))
+    if len(preambles) != 1:
+        return None
+    preamble = preambles.pop()
+    match = _DOCUMENTCLASS.search(preamble)
+    if match is None:
+        return None
+    options = ",".join(filter(None, [match.group(1), f"multi={PAGE_ENV}"]))
+    preamble = (preamble[:match.start()] + f"\\documentclass[{options}]{{standalone}}"
+                + preamble[match.end():])
+    pages = [f"\\begin{{{PAGE_ENV}}}\n{body}\n\\end{{{PAGE_ENV}}}" for body in bodies]
+    return preamble + "\\begin{document}\n" + "\n".join(pages) + "\n\\end{document}\n"
+
+
+def compile_batch(sources, cache_dir=TEX_CACHE_DIR, tex_template=None):
+    """
+    Compile the sources without an SVG in `cache_dir` in one LaTeX run
+
+    Args:
+        sources: Dict of file stem to LaTeX source (see tex_sources)
+        cache_dir: Directory of `<stem>.tex`/`<stem>.svg` files
+        tex_template: Template that produced the sources (for the compiler)
+
+    Returns:
+        Number of SVG files added
+    """
+    from manim import config
+    from manim.utils.tex_file_writing import tex_compilation_command
+    from pathlib import Path
+
+    if tex_template is None:
+        tex_template = config["tex_template"]
+    os.makedirs(cache_dir, exist_ok=True)
+    pending = [stem for stem in sources
+               if not os.path.exists(os.path.join(cache_dir, stem + ".svg"))]
+    if not pending:
+        return 0
+    document = batch_document([sources[stem] for stem in pending])
+    if document is None:
+        print("⚠️  Tex template is not a standalone document, expressions compile one by one")
+        return 0
+
+    batch_hash = hashlib.sha256(document.encode()).hexdigest()[:16]
+    batch_tex = Path(cache_dir) / f"batch_{batch_hash}.tex"
+    batch_tex.write_text(document, encoding="utf-8")
+    output_format = tex_template.output_format
+    try:
+        command = tex_compilation_command(tex_template.tex_compiler, output_format,
+                                          batch_tex, Path(cache_dir))
+        if os.system(command) != 0:
+            print(f"⚠️  LaTeX failed on the batch of {len(pending)} expression(s), "
+                  f"manim compiles them one by one (log: {batch_tex.with_suffix('.log')})")
+            return 0
+        subprocess.run(
+            ["dvisvgm", *(["--pdf"] if output_format == ".pdf" else []), "--page=1-",
+             "--no-fonts", "--verbosity=0",
+             f"--output={batch_tex.with_suffix('').as_posix()}-%p.svg",
+             batch_tex.with_suffix(output_format).as_posix()],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        pages = sorted(glob.glob(glob.escape(str(batch_tex.with_suffix(""))) + "-*.svg"),
+                       key=lambda page: int(_PAGE_FILE.search(page).group(1)))
+        if len(pages) != len(pending):
+            print(f"⚠️  Expected {len(pending)} page(s), dvisvgm wrote {len(pages)}; "
+                  f"manim compiles the expressions one by one")
+            return 0
+        for stem, page in zip(pending, pages):
+            with open(os.path.join(cache_dir, stem + ".tex"), "w", encoding="utf-8") as f:
+                f.write(sources[stem])
+            os.replace(page, os.path.join(cache_dir, stem + ".svg"))
+        return len(pending)
+    finally:
+        for path in glob.glob(glob.escape(str(batch_tex.with_suffix(""))) + "*"):
+            os.remove(path)
+
+
+def _link(source, destination):
+    """Hard-link `source` to `destination` (copy across file systems)"""
+    tmp_path = destination + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def precompile(targets, cache_dir=TEX_CACHE_DIR):
+    """
+    Compile the Tex expressions of scene files and hand them to manim
+
+    Args:
+        targets: Dict of scene file to the Tex directory its render uses
+            (None to only fill the cache)
+        cache_dir: Shared directory of compiled expressions
+
+    Returns:
+        (expressions, compiled): number of expressions found and compiled
+    """
+    stems_by_target = {}
+    sources = {}
+    for path in targets:
+        scene_sources = tex_sources(collect_expressions(path))
+        stems_by_target[path] = list(scene_sources)
+        sources.update(scene_sources)
+
+    compiled = compile_batch(sources, cache_dir)
+    for path, tex_dir in targets.items():
+        if tex_dir is None:
+            continue
+        os.makedirs(tex_dir, exist_ok=True)
+        for stem in stems_by_target[path]:
+            cached = os.path.join(cache_dir, stem + ".svg")
+            local = os.path.join(tex_dir, stem + ".svg")
+            if os.path.exists(cached) and not os.path.exists(local):
+                _link(cached, local)
+    return len(sources), compiled
+
+
+# Parsed SVG paths
+
+def path_cache_key(svg_mobject, file_path):
+    """Key of the submobjects parsed from an SVG file with the mobject's options"""
+    from manim import __version__, config
+
+    options = json.dumps([type(svg_mobject).__name__, svg_mobject.svg_default,
+                          svg_mobject.path_string_config, str(config.renderer), __version__],
+                         sort_keys=True, default=str)
+    hasher = hashlib.sha256(options.encode())
+    with open(file_path, "rb") as f:
+        hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def save_paths(path, mobjects):
+    """Write the points and colors of VMobjects to an .npz file"""
+    import numpy as np
+
+    def stacked(arrays):
+        counts = np.array([len(array) for array in arrays], dtype=np.int64)
+        return (np.concatenate(arrays) if arrays else np.zeros((0, 4))), counts
+
+    points, point_counts = stacked([mobject.points for mobject in mobjects])
+    fill, fill_counts = stacked([mobject.get_fill_rgbas() for mobject in mobjects])
+    stroke, stroke_counts = stacked([mobject.get_stroke_rgbas() for mobject in mobjects])
+    buffer = io.BytesIO()
+    np.savez(buffer, points=points, point_counts=point_counts,
+             fill=fill, fill_counts=fill_counts, stroke=stroke, stroke_counts=stroke_counts,
+             stroke_width=np.array([float(np.max(mobject.stroke_width)) for mobject in mobjects]))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+
+
+def load_paths(path):
+    """VMobjects written by save_paths, or None when the file is unusable"""
+    import numpy as np
+    from manim import VMobject
+
+    try:
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    def split(name):
+        return np.split(arrays[name], np.cumsum(arrays[name + "_counts"])[:-1])
+
+    mobjects = []
+    for points, fill, stroke, stroke_width in zip(split("points"), split("fill"),
+                                                  split("stroke"), arrays["stroke_width"]):
+        mobject = VMobject()
+        mobject.set_points(points)
+        mobject.fill_rgbas = fill
+        mobject.stroke_rgbas = stroke
+        mobject.stroke_width = float(stroke_width)
+        mobjects.append(mobject)
+    return mobjects
+
+
+def install_path_cache(cache_dir=PATH_CACHE_DIR):
+    """
+    Make SVGMobject (and so Tex, MathTex and Text) load parsed paths from
+    `cache_dir` and store newly parsed ones there; only with Cairo
+    """
+    from manim import RendererType, config
+    from manim.mobject.svg.svg_mobject import SVGMobject
+
+    if getattr(SVGMobject.generate_mobject, "path_cache", False):
+        return
+    parse = SVGMobject.generate_mobject
+
+    def generate_mobject(self):
+        if config.renderer != RendererType.CAIRO:
+            return parse(self)
+        key = path_cache_key(self, self.get_file_path())
+        path = os.path.join(cache_dir, key[:2], key + ".npz")
+        mobjects = load_paths(path) if os.path.exists(path) else None
+        if mobjects is None:
+            parse(self)
+            save_paths(path, self.submobjects)
+        else:
+            self.add(*mobjects)
+
+    generate_mobject.path_cache = True
+    SVGMobject.generate_mobject = generate_mobject
+
+
+class GlyphCacheMixin:
+    """
+    Scene mixin that loads Tex and Text paths from the binary path cache
+
+    Put it before the manim scene class: `class S(GlyphCacheMixin, Scene)`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        install_path_cache()
+        super().__init__(*args, **kwargs)
+
+
+def _size(directory):
+    files = [os.path.join(parent, name)
+             for parent, _, names in os.walk(directory) for name in names]
+    return len(files), sum(os.path.getsize(path) for path in files)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompile Tex expressions and inspect the caches")
+    commands = parser.add_subparsers(dest="command", required=True)
+    precompile_ = commands.add_parser("precompile",
+                                      help="Compile the Tex expressions of scenes in one LaTeX run")
+    precompile_.add_argument("scenes", nargs="*", help="Scene files (default: scenes/*.py)")
+    precompile_.add_argument("--tex-dir", default=os.path.join(ROOT, "media", "Tex"),
+                             help="manim Tex directory to link the SVGs into (default: media/Tex)")
+    commands.add_parser("stats", help="Show the size of the Tex and path caches")
+    args = parser.parse_args(argv)
+
+    if args.command == "precompile":
+        scenes = args.scenes or sorted(glob.glob(os.path.join(SCENES_DIR, "scene*.py")))
+        found, compiled = precompile({scene: args.tex_dir for scene in scenes})
+        print(f"✅ {found} expression(s) in {len(scenes)} scene file(s), "
+              f"{compiled} compiled, linked into {args.tex_dir}")
+    else:
+        for label, directory in (("Tex", TEX_CACHE_DIR), ("SVG paths", PATH_CACHE_DIR)):
+            count, nbytes = _size(directory)
+            print(f"{label:<10} {count:>6} file(s) {nbytes / (1024*1024):>8.1f} MB in {directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())